@@ -0,0 +1,260 @@
+# Benchmarks mod mockserver.py – uden netværk og reproducerbart
+#
+# Pr. script (run_all.TABLES) måles:
+#   e2e_cold_ms   hele fetch-funktionen med tom cache (metadata hentes), median efter en opvarmningskørsel
+#   e2e_ms        median af --repeat kørsler med metadata og /data-svar i disk-cachen
+#   meta_cold_ms  /tableinfo + MetaIndex med tom cache, median
+#   meta_warm_ms  MetaIndex fra disk-cachen
+#   select_ms     kompilering af scriptets SELECTION-spec (hvis det har en)
+#   parse_ms      pd.read_csv af scriptets /data-svar (CSV), median
+#   parse_lite_ms lite.Rows af samme svar, median
+#   parse_js_ms   jsonstat.parse af samme udvælgelse som JSONSTAT, median
+#   peak_kb       højeste Python-allokering (tracemalloc) under én kørsel
+# Med --large også de syntetiske <TABEL>_XL-varianter: hele tabellen via BULK-streaming og
+# via planner.fetch_planned (CSV i bidder under cellegrænsen).
+#
+#   python3 bench.py                          # alle scripts, 5 gentagelser
+#   python3 bench.py folk1am pris111 -r 10
+#   python3 bench.py --json bench.json        # gem resultatet
+#   python3 bench.py --baseline bench.json    # sammenlign; exit 1 ved regression
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import incremental
+import jsonstat
+import lite
+import metaindex
+import mockserver
+import planner
+import scheduler
+import selection
+import statbank
+from run_all import TABLES
+
+TOLERANCE = 0.25          # tilladt relativ forværring mod baseline
+MIN_DELTA = {"ms": 5.0, "kb": 256.0}   # absolutte forskelle under dette ignoreres (støj)
+
+
+@contextlib.contextmanager
+def mock_environment(latency_ms=0.0, lite_mode=False, xl_cells=None):
+    """Mockserver + tom, midlertidig cache-mappe; statbank peger på serveren så længe blokken kører."""
+    saved = (statbank.BASE, statbank.CACHE_DIR, statbank.LITE, incremental.INCREMENTAL, mockserver.XL_CELLS,
+             scheduler.RATE)
+    if xl_cells is not None:
+        mockserver.XL_CELLS = xl_cells
+        mockserver._meta_cache.clear()
+    srv = mockserver.start(latency=latency_ms / 1000)
+    cache_dir = tempfile.mkdtemp(prefix="dst-bench-")
+    statbank.BASE, statbank.CACHE_DIR = srv.url, cache_dir
+    statbank.LITE, incremental.INCREMENTAL = lite_mode, False
+    scheduler.RATE = 0   # mockserveren drosler ikke; mål koden, ikke kaldbudgettet
+    try:
+        yield srv
+    finally:
+        srv.shutdown()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        (statbank.BASE, statbank.CACHE_DIR, statbank.LITE, incremental.INCREMENTAL, mockserver.XL_CELLS,
+         scheduler.RATE) = saved
+        mockserver._meta_cache.clear()
+
+
+def _reset_memory():
+    metaindex._indexes.clear()
+    selection._compiled.clear()
+
+
+def _reset_disk():
+    _reset_memory()
+    for name in os.listdir(statbank.CACHE_DIR):
+        shutil.rmtree(os.path.join(statbank.CACHE_DIR, name), ignore_errors=True)
+
+
+def _timed(func, *args, **kwargs):
+    """(resultat, ms) – stdout fra func slugges."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        t0 = time.perf_counter()
+        out = func(*args, **kwargs)
+        return out, (time.perf_counter() - t0) * 1000
+
+
+def _traced(func, *args, **kwargs):
+    """Højeste tracemalloc-allokering (KB) under func."""
+    tracemalloc.start()
+    try:
+        _timed(func, *args, **kwargs)
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def _median(func, repeat, *args):
+    return statistics.median(_timed(func, *args)[1] for _ in range(repeat))
+
+
+def _spec(module):
+    spec = getattr(module, "SELECTION", None)
+    if spec is None and hasattr(module, "_selection"):
+        spec = module._selection("da")
+    return spec
+
+
+def bench_script(srv, name, repeat=5):
+    module_name, func_name = TABLES[name]
+    module = importlib.import_module(module_name)
+    func = getattr(module, func_name)
+    res = {}
+
+    # ende-til-ende, kold og varm (efter én kasseret kørsel, så importer ikke tælles med)
+    _timed(func, lang="da")
+    srv.log.clear()
+
+    def _cold():
+        _reset_disk()
+        return func(lang="da")
+    res["e2e_cold_ms"] = _median(_cold, repeat)
+    data_calls = [c for c in srv.log if "data" in c["path"].split("/")]
+    if not data_calls:
+        raise RuntimeError(f"{name} lavede intet /data-kald mod mockserveren.")
+    last = data_calls[-1]
+    parts = last["path"].split("/")
+    after = parts[parts.index("data") + 1:]
+    table = (last["body"].get("table") or after[0]).upper()
+    variables = last["body"]["variables"]
+
+    def _warm():
+        _reset_memory()
+        return func(lang="da")
+    res["e2e_ms"] = _median(_warm, repeat)
+    res["peak_kb"] = _traced(_warm)
+
+    # metadata-opløsning
+    def _meta_cold():
+        _reset_disk()
+        return metaindex.meta_index(table)
+    res["meta_cold_ms"] = _median(_meta_cold, repeat)
+    meta = metaindex.meta_index(table)
+
+    def _meta_warm():
+        _reset_memory()
+        return metaindex.meta_index(table)
+    res["meta_warm_ms"] = _median(_meta_warm, repeat)
+    spec = _spec(module)
+    if spec is not None:
+        res["select_ms"] = _median(selection.compile_selection, repeat, meta, spec)
+
+    # parsing af scriptets eget udtræk (CSV)
+    import pandas as pd
+
+    text, _ = _timed(lambda: statbank.post_data(table, variables, fmt="CSV").text)
+    res["parse_ms"] = _median(lambda: pd.read_csv(io.StringIO(text), sep=";"), repeat)
+    res["parse_lite_ms"] = _median(lite.Rows, repeat, text)
+    content, _ = _timed(lambda: statbank.post_data(table, variables, fmt="JSONSTAT").content)
+    res["parse_js_ms"] = _median(jsonstat.parse, repeat, content)
+    res["rows"] = len(lite.Rows(text))
+    return res
+
+
+def bench_large(srv, table):
+    """Hele <TABEL>_XL via BULK-streaming og via planner (CSV-bidder). Én kørsel hver."""
+    import bulk
+
+    xl = table + mockserver.XL_SUFFIX
+    meta = mockserver.tableinfo(xl)
+    variables = [{"code": v["id"], "values": ["*"]} for v in meta["variables"]]
+    res = {"cells": planner.estimate_cells(metaindex.meta_index(xl), variables)}
+    res["rows"], res["bulk_ms"] = _timed(bulk.fetch_bulk, xl, variables, lambda chunk: None)
+    res["bulk_peak_kb"] = _traced(bulk.fetch_bulk, xl, variables, lambda chunk: None)
+    _, res["planned_ms"] = _timed(planner.fetch_planned, xl, variables,
+                                  lambda v: statbank.data_frame(xl, v))
+    return res
+
+
+def run(names=None, repeat=5, large=False, latency_ms=0.0, lite_mode=False, xl_cells=None):
+    names = [n.lower() for n in (names or TABLES)]
+    unknown = [n for n in names if n not in TABLES]
+    if unknown:
+        raise ValueError(f"Ukendte tabeller: {', '.join(unknown)} (vælg blandt {', '.join(TABLES)})")
+    out = {"meta": {"python": platform.python_version(), "platform": platform.platform(),
+                    "repeat": repeat, "latency_ms": latency_ms, "lite": lite_mode},
+           "scripts": {}, "large": {}}
+    with mock_environment(latency_ms, lite_mode, xl_cells) as srv:
+        for name in names:
+            out["scripts"][name] = bench_script(srv, name, repeat)
+        if large:
+            for table in mockserver.fixture_tables():
+                out["large"][table] = bench_large(srv, table)
+    return out
+
+
+def print_report(result):
+    m = result["meta"]
+    print(f"[bench] Python {m['python']}, {m['repeat']} gentagelser, latens {m['latency_ms']:.0f} ms"
+          f"{', let tilstand' if m['lite'] else ''}")
+    cols = ["e2e_cold_ms", "e2e_ms", "meta_cold_ms", "meta_warm_ms", "select_ms",
+            "parse_ms", "parse_lite_ms", "parse_js_ms", "peak_kb", "rows"]
+    print(f"  {'script':<10}" + "".join(f"{c:>14}" for c in cols))
+    for name, r in result["scripts"].items():
+        print(f"  {name:<10}" + "".join(f"{r[c]:>14.1f}" if c in r else f"{'-':>14}" for c in cols))
+    if result["large"]:
+        cols = ["cells", "rows", "bulk_ms", "bulk_peak_kb", "planned_ms"]
+        print(f"\n  {'tabel (_XL)':<10}" + "".join(f"{c:>14}" for c in cols))
+        for table, r in result["large"].items():
+            print(f"  {table:<10}" + "".join(f"{r[c]:>14.1f}" for c in cols))
+
+
+def compare(result, baseline, tolerance=TOLERANCE):
+    """Liste af regressioner: (gruppe, navn, metrik, baseline, nu)."""
+    out = []
+    for group in ("scripts", "large"):
+        for name, cur in result.get(group, {}).items():
+            base = baseline.get(group, {}).get(name)
+            if not base:
+                continue
+            for metric, value in cur.items():
+                unit = "ms" if metric.endswith("_ms") else "kb" if metric.endswith("_kb") else None
+                old = base.get(metric)
+                if unit is None or old is None:
+                    continue
+                if value > old * (1 + tolerance) and value - old > MIN_DELTA[unit]:
+                    out.append((group, name, metric, old, value))
+    return out
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Benchmarks mod den lokale mockserver.")
+    ap.add_argument("tables", nargs="*", help=f"scripts (default: alle): {', '.join(TABLES)}")
+    ap.add_argument("-r", "--repeat", type=int, default=5)
+    ap.add_argument("--large", action="store_true", help="også de syntetiske _XL-varianter")
+    ap.add_argument("--xl-cells", type=int, default=None, help=f"celler pr. _XL-tabel (default {mockserver.XL_CELLS:,})")
+    ap.add_argument("--latency", type=float, default=0.0, help="simuleret svartid pr. kald i ms")
+    ap.add_argument("--lite", action="store_true", help="kør scripts i let tilstand (DST_LITE)")
+    ap.add_argument("--json", help="gem resultatet som JSON")
+    ap.add_argument("--baseline", help="tidligere --json-resultat at sammenligne med")
+    ap.add_argument("--tolerance", type=float, default=TOLERANCE, help="tilladt relativ forværring (0.25 = 25%%)")
+    args = ap.parse_args()
+
+    result = run(args.tables, repeat=args.repeat, large=args.large, latency_ms=args.latency,
+                 lite_mode=args.lite, xl_cells=args.xl_cells)
+    print_report(result)
+    if args.json:
+        statbank._write_json_atomic(args.json, result)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            regressions = compare(result, json.load(fh), args.tolerance)
+        print(f"\n[bench] sammenlignet med {args.baseline} (tolerance {args.tolerance:.0%})")
+        for group, name, metric, old, new in regressions:
+            print(f"  REGRESSION {name:<10} {metric:<14} {old:10.1f} -> {new:10.1f}")
+        if regressions:
+            sys.exit(1)
+        print("  ingen regressioner")
@@ -0,0 +1,75 @@
+# Streaming af store udtræk i BULK-format med chunket CSV-parsing
+#
+# Svaret læses direkte fra socket'en i bidder af chunk_rows rækker, så fx FOLK1AM
+# for alle OMRÅDE x KØN x ALDER kan hentes med et fast, begrænset hukommelsesforbrug.
+#   python3 bulk.py FOLK1AM OMRÅDE='*' KØN='*' ALDER='*' Tid=2024M01,2024M02 --out folk1am.csv
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+from statbank import stream_data
+
+CHUNK_ROWS = 100_000
+
+
+def iter_chunks(table, variables, lang="da", chunk_rows=CHUNK_ROWS):
+    """
+    Generator af DataFrames med højst chunk_rows rækker. Label-kolonner er koder (str),
+    værdikolonnen (sidste) er float med NaN for manglende/fortrolige værdier.
+    """
+    r = stream_data(table, variables, lang=lang, fmt="BULK")
+    try:
+        reader = pd.read_csv(r.raw, sep=";", dtype=str, encoding="utf-8-sig",
+                             chunksize=chunk_rows, keep_default_na=False)
+        for chunk in reader:
+            value_col = chunk.columns[-1]
+            chunk[value_col] = pd.to_numeric(chunk[value_col].str.replace(",", ".", regex=False),
+                                             errors="coerce")
+            yield chunk
+    finally:
+        r.close()
+
+
+def fetch_bulk(table, variables, sink, lang="da", chunk_rows=CHUNK_ROWS):
+    """Send hver bid til sink(chunk). Returnerer antal rækker i alt."""
+    rows = 0
+    for chunk in iter_chunks(table, variables, lang=lang, chunk_rows=chunk_rows):
+        sink(chunk)
+        rows += len(chunk)
+    return rows
+
+
+def csv_sink(path, sep=";"):
+    """Sink der skriver bidderne fortløbende til én CSV-fil (header kun første gang)."""
+    state = {"first": True}
+    if os.path.exists(path):
+        os.remove(path)
+
+    def _sink(chunk):
+        chunk.to_csv(path, sep=sep, index=False, mode="w" if state["first"] else "a",
+                     header=state["first"])
+        state["first"] = False
+    return _sink
+
+
+def _parse_var(arg):
+    code, _, values = arg.partition("=")
+    if not values:
+        raise ValueError(f"Forventede KODE=værdi1,værdi2 – fik '{arg}'.")
+    return {"code": code, "values": values.split(",")}
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Stream et stort StatBank-udtræk (BULK) til CSV.")
+    ap.add_argument("table")
+    ap.add_argument("variables", nargs="+", help="KODE=værdi1,værdi2 (brug * for alle)")
+    ap.add_argument("--out", required=True, help="CSV-fil der skrives til")
+    ap.add_argument("--lang", default="da")
+    ap.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = ap.parse_args()
+
+    n = fetch_bulk(args.table, [_parse_var(v) for v in args.variables], csv_sink(args.out),
+                   lang=args.lang, chunk_rows=args.chunk_rows)
+    print(f"[bulk] {args.table}: {n} rækker skrevet til {args.out}", file=sys.stderr)
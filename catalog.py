@@ -0,0 +1,292 @@
+# Katalog over alle StatBank-tabeller med et lokalt, inverteret fuldtekstindeks (da + en)
+#
+# crawl() går /subjects (emnetræet) og /tables (alle tabeller med 'updated') igennem og henter
+# /tableinfo for hver tabel på begge sprog med en begrænset pulje af samtidige kald. Variabel-
+# og værditekster tokeniseres til et inverteret indeks (ord -> dokumenter), som gemmes i
+# DST_CACHE_DIR/catalog/. En ny crawl genbruger tabeller, hvis 'updated' er uændret, så kun
+# nye og ændrede tabeller hentes. Tidsvariablernes værdier indekseres ikke (kun første/seneste).
+#
+# Søgninger kører offline på millisekunder: alle ord skal findes i samme tekst (på ét sprog);
+# 'ord*' matcher præfikser, og var=/table= afgrænser til variabler/tabeller.
+#
+#   python3 catalog.py crawl -j 8
+#   python3 catalog.py search "samme måned året før pct" --var ENHED
+#   python3 catalog.py search "sæsonkorrigeret" --tables
+import argparse
+import asyncio
+import bisect
+import os
+import pickle
+import re
+import time
+from collections import namedtuple
+
+import scheduler
+import statbank
+from spans import span
+
+LANGS = ("da", "en")
+CONCURRENCY = int(os.environ.get("DST_CATALOG_JOBS", 8))
+_WORD = re.compile(r"\w+")
+
+Hit = namedtuple("Hit", "table var id text lang")
+
+
+def tokens(text):
+    return _WORD.findall(str(text).lower())
+
+
+def _path():
+    d = os.path.join(statbank.CACHE_DIR, "catalog")
+    os.makedirs(d, exist_ok=True)
+    return os.path.join(d, "index.pkl")
+
+
+# --- crawl ---------------------------------------------------------------------------
+
+def _walk(subjects, path=()):
+    """(tabel-id, emnesti) for alle tabeller i emnetræet fra /subjects."""
+    for s in subjects:
+        here = path + (s.get("description") or str(s.get("id")),)
+        for t in s.get("tables") or []:
+            yield str(t["id"]).upper(), " / ".join(here)
+        yield from _walk(s.get("subjects") or [], here)
+
+
+def listing(lang="da"):
+    """({TABEL: /tables-post}, {TABEL: emnesti}) for hele StatBank (to kald)."""
+    tables = statbank._json("POST", "/tables", body={"lang": lang, "format": "JSON", "includeInactive": False})
+    subjects = statbank._json("POST", "/subjects", body={
+        "lang": lang, "format": "JSON", "recursive": True, "includeTables": True, "omitSubjectsWithoutTables": True,
+    })
+    return {str(t["id"]).upper(): t for t in tables}, dict(_walk(subjects))
+
+
+async def _fetch_all(jobs, concurrency):
+    """{(tabel, sprog): metadata eller undtagelse} – højst concurrency kald ad gangen."""
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(table, lang):
+        async with sem:
+            return await asyncio.to_thread(
+                statbank._json, "GET", f"/tableinfo/{table}", params={"contentType": "JSON", "lang": lang})
+
+    results = await asyncio.gather(*(one(t, l) for t, l in jobs), return_exceptions=True)
+    return dict(zip(jobs, results))
+
+
+def _entry(metas, info, subject):
+    """Katalogpost for én tabel ud fra dens metadata på hvert sprog."""
+    base = metas[LANGS[0]] if LANGS[0] in metas else next(iter(metas.values()))
+    variables = {}
+    time_var = None
+    for i, var in enumerate(base["variables"]):
+        code = var["id"]
+        if var.get("time") and time_var is None:
+            time_var = code
+        texts = {lang: m["variables"][i].get("text", code) for lang, m in metas.items()}
+        ids = [str(v["id"]) for v in var["values"]]
+        values = {lang: [str(v.get("text") or "") for v in m["variables"][i]["values"]] for lang, m in metas.items()}
+        variables[code] = {"text": texts, "ids": ids, "values": values,
+                           "elimination": bool(var.get("elimination")), "time": bool(var.get("time"))}
+    return {
+        "text": {lang: m.get("text", "") for lang, m in metas.items()},
+        "unit": base.get("unit"),
+        "updated": info.get("updated") or base.get("updated"),
+        "subject": subject,
+        "first": info.get("firstPeriod"),
+        "latest": info.get("latestPeriod"),
+        "time_var": time_var,
+        "variables": variables,
+    }
+
+
+def crawl(concurrency=None, refresh=False):
+    """
+    Hent hele kataloget og byg indekset. Tabeller med uændret 'updated' genbruges fra det
+    forrige indeks (medmindre refresh=True). Returnerer Catalog.
+    """
+    concurrency = CONCURRENCY if concurrency is None else concurrency
+    old = {} if refresh else (load(missing_ok=True) or Catalog({})).tables
+    with span("catalog", step="listing") as sp:
+        infos, subjects = listing(LANGS[0])
+        for t in subjects:
+            infos.setdefault(t, {"id": t})
+        sp["tables"] = len(infos)
+
+    keep = {t: old[t] for t, info in infos.items()
+            if t in old and info.get("updated") and old[t]["updated"] == info.get("updated")}
+    todo = sorted(t for t in infos if t not in keep)
+    print(f"[catalog] {len(infos)} tabeller: {len(keep)} uændrede, {len(todo)} hentes ({concurrency} ad gangen)")
+    with span("catalog", step="tableinfo", tables=len(todo)) as sp:
+        with scheduler.priority("bulk"):   # interaktive kald springer foran i det fælles budget
+            fetched = asyncio.run(_fetch_all([(t, lang) for t in todo for lang in LANGS], concurrency))
+        failed = sorted({t for (t, _), r in fetched.items() if isinstance(r, Exception)})
+        sp["failed"] = len(failed)
+    for t in failed:
+        err = next(r for (tt, _), r in fetched.items() if tt == t and isinstance(r, Exception))
+        print(f"[catalog] {t}: {type(err).__name__}: {err}")
+
+    tables = dict(keep)
+    for t in todo:
+        metas = {lang: fetched[(t, lang)] for lang in LANGS if not isinstance(fetched[(t, lang)], Exception)}
+        if metas:
+            tables[t] = _entry(metas, infos[t], subjects.get(t))
+    cat = Catalog(tables)
+    with open(_path() + ".tmp", "wb") as fh:
+        pickle.dump({"built": time.time(), "tables": tables, "docs": cat.docs, "text": cat._text,
+                     "terms": cat.terms}, fh, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(_path() + ".tmp", _path())
+    print(f"[catalog] {len(tables)} tabeller indekseret -> {_path()}")
+    return cat
+
+
+# --- indeks og søgning ---------------------------------------------------------------
+
+class Catalog:
+    """
+    Inverteret indeks pr. sprog: ord -> sorteret liste af dokument-numre. Et dokument er en
+    tabeltitel (var=None), en variabeltekst (id=None) eller en værditekst.
+    """
+
+    def __init__(self, tables, state=None):
+        self.tables = tables
+        if state is not None:                # færdigt indeks fra disken – intet genopbygges
+            self.docs, self._text, self.terms = state["docs"], state["text"], state["terms"]
+            self._sorted = {lang: sorted(t) for lang, t in self.terms.items()}
+            return
+        self.docs = []                       # (tabel, var, id)
+        self._text = []                      # {sprog: tekst} pr. dokument
+        self.terms = {lang: {} for lang in LANGS}
+        for table, entry in sorted(tables.items()):
+            self._add((table, None, None), entry["text"])
+            for code, var in entry["variables"].items():
+                self._add((table, code, None), {lang: f"{code} {t}" for lang, t in var["text"].items()})
+                if var["time"]:
+                    continue
+                for i, value_id in enumerate(var["ids"]):
+                    self._add((table, code, value_id), {lang: v[i] for lang, v in var["values"].items()})
+        self._sorted = {lang: sorted(t) for lang, t in self.terms.items()}
+
+    def _add(self, doc, texts):
+        n = len(self.docs)
+        self.docs.append(doc)
+        self._text.append(texts)
+        for lang, text in texts.items():
+            postings = self.terms.setdefault(lang, {})
+            for tok in set(tokens(text)):
+                postings.setdefault(tok, []).append(n)
+
+    def __len__(self):
+        return len(self.tables)
+
+    def _postings(self, lang, word):
+        """Dokumenter med ordet (eller et ord med præfikset, hvis word ender på '*')."""
+        terms = self.terms.get(lang, {})
+        if not word.endswith("*"):
+            return set(terms.get(word, ()))
+        prefix, keys = word[:-1], self._sorted.get(lang, [])
+        out = set()
+        for k in keys[bisect.bisect_left(keys, prefix):]:
+            if not k.startswith(prefix):
+                break
+            out.update(terms[k])
+        return out
+
+    def search(self, query, var=None, table=None, lang=None, values=True, limit=None):
+        """
+        Hits (tabel, var, id, tekst, sprog) hvor alle ord i query står i samme tekst.
+        var/table: variabel-id eller tabel-id (eller regex, fx var='ENHED|UNIT').
+        values=False: kun tabeltitler og variabeltekster.
+        """
+        words = [w + ("*" if w_raw.endswith("*") else "") for w_raw in query.split()
+                 for w in tokens(w_raw)]
+        if not words:
+            raise ValueError("Tom søgning.")
+        var_rx = None if var is None else re.compile(rf"^(?:{var})$", re.IGNORECASE)
+        table_rx = None if table is None else re.compile(rf"^(?:{table})$", re.IGNORECASE)
+        hits = []
+        for lg in ([lang] if lang else LANGS):
+            found = None
+            for w in sorted(words, key=lambda w: len(self.terms.get(lg, {}).get(w, ()))):
+                p = self._postings(lg, w)
+                found = p if found is None else found & p
+                if not found:
+                    break
+            for n in sorted(found or ()):
+                t, v, i = self.docs[n]
+                if (var_rx and (v is None or not var_rx.match(v))) or (table_rx and not table_rx.match(t)):
+                    continue
+                if i is not None and not values:
+                    continue
+                hits.append(Hit(t, v, i, self._text[n][lg], lg))
+        # samme dokument fundet på begge sprog: behold første
+        seen, out = set(), []
+        for h in hits:
+            if (h.table, h.var, h.id) not in seen:
+                seen.add((h.table, h.var, h.id))
+                out.append(h)
+        return out[:limit] if limit else out
+
+    def find_tables(self, query, **kw):
+        """Sorterede tabel-id'er med mindst ét hit."""
+        return sorted({h.table for h in self.search(query, **kw)})
+
+    def describe(self, table, lang="da"):
+        entry = self.tables[table.upper()]
+        return f"{table.upper()}: {entry['text'].get(lang) or next(iter(entry['text'].values()))}"
+
+
+_loaded = {}
+
+
+def load(missing_ok=False):
+    """Catalog fra disken (cachet i processen, indtil filen ændres)."""
+    path = _path()
+    try:
+        mtime = os.path.getmtime(path)
+    except FileNotFoundError:
+        if missing_ok:
+            return None
+        raise RuntimeError("Intet katalog endnu – kør først: python3 catalog.py crawl") from None
+    if _loaded.get("mtime") != mtime:
+        with open(path, "rb") as fh:
+            state = pickle.load(fh)
+            _loaded.update(mtime=mtime, catalog=Catalog(state["tables"], state))
+    return _loaded["catalog"]
+
+
+def search(query, **kw):
+    return load().search(query, **kw)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Katalog og fuldtekstsøgning over alle StatBank-tabeller.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    c = sub.add_parser("crawl", help="hent /subjects, /tables og alle /tableinfo")
+    c.add_argument("-j", "--jobs", type=int, default=None, help=f"samtidige kald (default {CONCURRENCY})")
+    c.add_argument("--refresh", action="store_true", help="hent alle tabeller, også uændrede")
+    s = sub.add_parser("search", help="søg i det lokale katalog (offline)")
+    s.add_argument("query")
+    s.add_argument("--var", help="kun variabler med dette id (regex)")
+    s.add_argument("--table", help="kun tabeller med dette id (regex)")
+    s.add_argument("--lang", choices=LANGS, default=None)
+    s.add_argument("--tables", action="store_true", help="kun tabel-id'er")
+    s.add_argument("--limit", type=int, default=50)
+    args = ap.parse_args()
+
+    if args.cmd == "crawl":
+        crawl(args.jobs, refresh=args.refresh)
+    else:
+        cat = load()
+        t0 = time.perf_counter()
+        hits = cat.search(args.query, var=args.var, table=args.table, lang=args.lang)
+        ms = (time.perf_counter() - t0) * 1000
+        if args.tables:
+            for t in sorted({h.table for h in hits}):
+                print(cat.describe(t, args.lang or "da"))
+        else:
+            for h in hits[:args.limit]:
+                where = f"{h.var}={h.id}" if h.id is not None else (h.var or "(titel)")
+                print(f"{h.table:<10} {where:<24} {h.text}")
+        print(f"[catalog] {len(hits)} hits i {len(cat)} tabeller ({ms:.1f} ms)")
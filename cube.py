@@ -0,0 +1,239 @@
+# Hele dimensioner i ét kald -> tæt N-dimensionel NumPy-kube med label-indeks pr. akse
+#
+# I stedet for ét kald pr. kombination (én varegruppe, én sektor ...) hentes fx alle PRIS111-
+# varegrupper eller alle LBESK04-sektorer i ét kald: JSONSTAT (læst direkte til NumPy, se
+# jsonstat.py) under cellegrænsen, ellers streamet BULK. Værdierne placeres i et forudallokeret
+# float64-array [variabel1, variabel2, ..., tid] (NaN = manglende/fortrolig), så udsnit, summer
+# og sammenligninger af serier er vektoriserede operationer.
+#
+#   python3 cube.py PRIS111 VAREGR='*' ENHED=100 Tid=2024M01,2024M02 --sum VAREGR
+import argparse
+
+from metaindex import meta_index
+
+
+class Cube:
+    """
+    values[i, j, ...] hører til labels[dims[0]][i], labels[dims[1]][j], ...
+    labels er værdi-id'er; texts er de tilhørende tekster fra metadata.
+    """
+
+    def __init__(self, table, dims, labels, values, texts=None, time_dim=None):
+        self.table = table
+        self.dims = list(dims)
+        self.labels = {d: list(labels[d]) for d in self.dims}
+        self.texts = {d: list((texts or {}).get(d) or labels[d]) for d in self.dims}
+        self.values = values
+        self.time_dim = time_dim if time_dim in self.dims else None
+        self._pos = {d: {v: i for i, v in enumerate(self.labels[d])} for d in self.dims}
+
+    # --- opslag ---------------------------------------------------------------------
+    def _dim(self, name):
+        for d in self.dims:
+            if d.upper() == str(name).upper():
+                return d
+        raise KeyError(f"{self.table} har ingen akse '{name}' (akser: {', '.join(self.dims)}).")
+
+    def axis(self, name):
+        return self.dims.index(self._dim(name))
+
+    def positions(self, name, ids):
+        """Positioner for ids langs aksen name (KeyError for ukendte id'er)."""
+        d = self._dim(name)
+        missing = [i for i in ids if str(i) not in self._pos[d]]
+        if missing:
+            raise KeyError(f"Ukendte værdier for {d}: {', '.join(map(str, missing[:5]))}")
+        return [self._pos[d][str(i)] for i in ids]
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def __repr__(self):
+        axes = ", ".join(f"{d}={len(self.labels[d])}" for d in self.dims)
+        return f"Cube({self.table}: {axes})"
+
+    # --- udsnit og aggregering --------------------------------------------------------
+    def sel(self, selection=None, **kw):
+        """
+        Udsnit efter id'er: sel(VAREGR=["011100", "011200"]) bevarer aksen, sel(ENHED="100")
+        fjerner den. Aksenavne er uafhængige af store/små bogstaver.
+        """
+        import numpy as np
+
+        selection = dict(selection or {}, **kw)
+        index = [slice(None)] * len(self.dims)
+        dims, labels, texts = list(self.dims), dict(self.labels), dict(self.texts)
+        for name, ids in selection.items():
+            d = self._dim(name)
+            k = self.dims.index(d)
+            if isinstance(ids, (list, tuple, np.ndarray)):
+                pos = self.positions(d, ids)
+                index[k] = pos
+                labels[d] = [self.labels[d][p] for p in pos]
+                texts[d] = [self.texts[d][p] for p in pos]
+            else:
+                index[k] = self.positions(d, [ids])[0]
+                dims.remove(d)
+        # ét listeindeks ad gangen (NumPy ville ellers parre lister i stedet for at krydse dem)
+        values = self.values
+        for k in reversed(range(len(index))):
+            if not isinstance(index[k], slice):
+                values = np.take(values, index[k], axis=k)
+        return Cube(self.table, dims, labels, values, texts, self.time_dim)
+
+    def reduce(self, func, *names):
+        """Anvend func (fx np.nansum) langs akserne names; de forsvinder fra kuben."""
+        axes = tuple(sorted(self.axis(n) for n in names))
+        dims = [d for k, d in enumerate(self.dims) if k not in axes]
+        values = func(self.values, axis=axes) if axes else self.values
+        return Cube(self.table, dims, self.labels, values, self.texts, self.time_dim)
+
+    def sum(self, *names):
+        import numpy as np
+
+        return self.reduce(np.nansum, *names)
+
+    def mean(self, *names):
+        import numpy as np
+
+        return self.reduce(np.nanmean, *names)
+
+    def series(self, **fixed):
+        """{label-tuple: 1D-array langs tidsaksen} for alle kombinationer af de øvrige akser."""
+        import numpy as np
+
+        c = self.sel(**fixed) if fixed else self
+        if c.time_dim is None:
+            raise ValueError(f"{self.table}: kuben har ingen tidsakse.")
+        t = c.axis(c.time_dim)
+        moved = np.moveaxis(c.values, t, -1)
+        rest = [d for d in c.dims if d != c.time_dim]
+        flat = moved.reshape(-1, moved.shape[-1])
+        keys = np.ndindex(*moved.shape[:-1]) if rest else [()]
+        return {tuple(c.labels[d][i] for d, i in zip(rest, key)): flat[n]
+                for n, key in enumerate(keys)}
+
+    def to_frame(self, texts=False):
+        """Lang DataFrame (én kolonne pr. akse + INDHOLD) – pandas importeres først her."""
+        import numpy as np
+        import pandas as pd
+
+        src = self.texts if texts else self.labels
+        grids = np.meshgrid(*[np.asarray(src[d], dtype=object) for d in self.dims], indexing="ij")
+        data = {d: g.ravel() for d, g in zip(self.dims, grids)}
+        data["INDHOLD"] = np.asarray(self.values).ravel()
+        return pd.DataFrame(data)
+
+
+def axes(meta, variables):
+    """[(variabel, [id'er])] for udvælgelsen i metadataens rækkefølge ('*' = alle værdier)."""
+    chosen = {}
+    for v in variables:
+        code = meta.var(v["code"])
+        if code is None:
+            raise ValueError(f"{meta.table} har ingen variabel '{v['code']}'.")
+        vals = [str(x) for x in v["values"]]
+        chosen[code] = meta.ids(code) if "*" in vals else vals
+    return [(code, chosen[code]) for code in meta.variables if code in chosen]
+
+
+def widen(variables, *codes):
+    """Kopi af en payload, hvor variablerne codes hentes med alle værdier ('*')."""
+    wide = {str(c).upper() for c in codes}
+    return [dict(v, values=["*"]) if str(v["code"]).upper() in wide else v for v in variables]
+
+
+def empty_cube(table, meta, variables):
+    """Kube med NaN i alle celler for udvælgelsen (til at fylde data ind i)."""
+    import numpy as np
+
+    dims = axes(meta, variables)
+    shape = tuple(len(ids) for _, ids in dims)
+    labels = {code: ids for code, ids in dims}
+    texts = {code: [meta.label(code, i) for i in ids] for code, ids in dims}
+    return Cube(table.upper(), [c for c, _ in dims], labels, np.full(shape, np.nan), texts, meta.time_var)
+
+
+def fill(cube, columns, values):
+    """
+    Placér rækker i kuben: columns = {akse: array af id'er}, values = float-array.
+    Positionerne findes vektoriseret (pandas.Categorical); rækker med ukendte id'er ignoreres.
+    """
+    import numpy as np
+    import pandas as pd
+
+    codes = []
+    for d in cube.dims:
+        col = columns.get(d)
+        if col is None:
+            raise ValueError(f"Svaret mangler aksen {d}.")
+        codes.append(pd.Categorical(col, categories=cube.labels[d]).codes)
+    codes = np.vstack(codes) if codes else np.empty((0, len(values)), dtype=np.int64)
+    ok = (codes >= 0).all(axis=0)
+    cube.values[tuple(codes[:, ok])] = np.asarray(values, dtype=np.float64)[ok]
+    return int(ok.sum())
+
+
+def fetch_cube(table, variables, lang="da", fmt=None):
+    """
+    Hent udvælgelsen (værdier eller '*' pr. variabel) i ét kald og saml den til en Cube med
+    en akse pr. valgt variabel i metadataens rækkefølge. fmt=None: JSONSTAT, når udvælgelsen
+    er under cellegrænsen, ellers BULK (streamet, ingen cellegrænse). Id'erne i svaret matches
+    direkte mod metadataens værdi-id'er.
+    """
+    import planner
+    from spans import span
+
+    meta = meta_index(table, lang=lang)
+    cube = empty_cube(table, meta, variables)
+    payload = [{"code": d, "values": ["*"] if cube.labels[d] == meta.ids(d) else cube.labels[d]}
+               for d in cube.dims]
+    fmt = (fmt or ("JSONSTAT" if cube.values.size <= planner.CELL_LIMIT else "BULK")).upper()
+    print(f"[cube] {table}: {cube!r} = {cube.values.size:,} celler ({fmt})")
+    if fmt == "JSONSTAT":
+        import jsonstat
+        import statbank
+
+        r = statbank.post_data(table, payload, lang=lang, fmt="JSONSTAT")
+        with span("parse", table=table.upper(), fmt="JSONSTAT", profile=True) as sp:
+            sp["rows"] = jsonstat.fill_cube(cube, r.content)
+        return cube
+    if fmt != "BULK":
+        raise ValueError(f"fetch_cube understøtter JSONSTAT og BULK, ikke {fmt}.")
+
+    import bulk
+
+    with span("parse", table=table.upper(), fmt="BULK", profile=True) as sp:
+        filled = 0
+        for chunk in bulk.iter_chunks(table, payload, lang=lang):
+            by_dim = {}
+            for col in chunk.columns[:-1]:
+                d = meta.var(col)
+                if d in cube.labels:
+                    by_dim[d] = chunk[col].to_numpy()
+            filled += fill(cube, by_dim, chunk[chunk.columns[-1]].to_numpy())
+        sp["rows"] = filled
+    return cube
+
+
+if __name__ == "__main__":
+    import numpy as np
+
+    from bulk import _parse_var
+
+    ap = argparse.ArgumentParser(description="Hent hele dimensioner til en NumPy-kube.")
+    ap.add_argument("table")
+    ap.add_argument("variables", nargs="+", help="KODE=værdi1,værdi2 (brug * for alle)")
+    ap.add_argument("--sum", nargs="*", default=[], help="akser der summeres væk")
+    ap.add_argument("--fmt", choices=["JSONSTAT", "BULK"], type=str.upper, default=None,
+                    help="default: JSONSTAT under cellegrænsen, ellers BULK")
+    ap.add_argument("--lang", default="da")
+    args = ap.parse_args()
+
+    cube = fetch_cube(args.table, [_parse_var(v) for v in args.variables], lang=args.lang, fmt=args.fmt)
+    if args.sum:
+        cube = cube.sum(*args.sum)
+    print(cube)
+    with np.printoptions(precision=2, suppress=True, threshold=200):
+        print(cube.values)
@@ -0,0 +1,107 @@
+# Indholdsadresseret disk-cache for /data-svar
+#
+# Nøgle = sha256 af kanonisk (tabel, sprog, format, udvælgelse), hvor variablerne sorteres efter
+# kode. Filnavnet indeholder også tabellens 'updated'-stempel, så et nyt udgivelsestidspunkt
+# automatisk gør de gamle svar ugyldige (de slettes ved næste skrivning for tabellen):
+#   DST_CACHE_DIR/data/<TABEL>-<sprog>-<updated>-<nøgle>.<format>
+# Stemplet følger metadata-cachen (DST_META_TTL), så et uændret svar kræver ingen netværkskald.
+# Cachen holdes under DST_DATA_MAX_BYTES ved at slette de mindst nyligt brugte svar (atime).
+# Slås fra med DST_DATA_CACHE=0. Streamede BULK-udtræk caches ikke.
+import hashlib
+import json
+import os
+import threading
+
+import statbank
+
+DATA_CACHE = os.environ.get("DST_DATA_CACHE", "1").lower() not in ("0", "false", "nej", "no")
+DATA_MAX_BYTES = int(os.environ.get("DST_DATA_MAX_BYTES", 256 * 1024 * 1024))
+
+FORMATS = (".csv", ".jsonstat", ".json", ".xlsx", ".sdmxcompact", ".sdmxgeneric", ".px", ".tsv")
+
+
+def _data_dir():
+    path = os.path.join(statbank.CACHE_DIR, "data")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def canonical(table, variables, lang="da", fmt="CSV"):
+    """
+    Kanonisk JSON for et /data-kald. Variablerne sorteres efter kode; værdiernes rækkefølge
+    bevares, da den er en del af forespørgslen.
+    """
+    sel = sorted((str(v["code"]).upper(), [str(x) for x in v["values"]]) for v in variables)
+    return json.dumps([table.upper(), lang, fmt.upper(), sel], ensure_ascii=False, separators=(",", ":"))
+
+
+def data_key(table, variables, lang="da", fmt="CSV"):
+    return hashlib.sha256(canonical(table, variables, lang, fmt).encode("utf-8")).hexdigest()
+
+
+class CachedResponse:
+    """Det af requests.Response, som post_data/data_jsonstat-kalderne bruger."""
+
+    status_code = 200
+
+    def __init__(self, content, url, encoding):
+        self.content = content
+        self.url = url
+        self.encoding = encoding
+        self.headers = {}
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or "utf-8", "replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def lookup(table, variables, lang="da", fmt="CSV"):
+    """
+    (sti, CachedResponse eller None). sti gives videre til store(), hvis svaret skal hentes;
+    den er None, når cachen er slået fra, eller tabellen ikke har et 'updated'-stempel.
+    """
+    if not DATA_CACHE:
+        return None, None
+    stamp = statbank.updated_stamp(table, lang)
+    if stamp == statbank._stamp(None):
+        return None, None
+    name = f"{table.upper()}-{lang}-{stamp}-{data_key(table, variables, lang, fmt)[:32]}.{fmt.lower()}"
+    path = os.path.join(_data_dir(), name)
+    try:
+        with open(path, "rb") as fh:
+            header = json.loads(fh.readline())
+            content = fh.read()
+    except (FileNotFoundError, ValueError):
+        return path, None
+    os.utime(path)   # atime = sidst brugt (LRU)
+    return path, CachedResponse(content, header["url"], header.get("encoding"))
+
+
+def store(path, content, url, encoding=None):
+    """Gem et svar under stien fra lookup(); svar for tidligere 'updated'-stempler slettes."""
+    if path is None:
+        return
+    d, name = os.path.split(path)
+    table, lang, stamp = name.split("-")[:3]
+    prefix = f"{table}-{lang}-"
+    for f in os.listdir(d):
+        if f.startswith(prefix) and not f.startswith(f"{prefix}{stamp}-"):
+            try:
+                os.remove(os.path.join(d, f))
+            except FileNotFoundError:
+                pass
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(json.dumps({"url": url, "encoding": encoding}).encode("utf-8") + b"\n")
+        fh.write(content)
+    os.replace(tmp, path)
+    statbank._evict(DATA_MAX_BYTES, d, FORMATS)
@@ -0,0 +1,178 @@
+# Afledte serier beregnet lokalt fra indeksniveauet – i stedet for et kald pr. enhed
+#
+# Hent indeksniveauet én gang (fx PRIS111 ENHED=100) og beregn år-til-år, periode-til-periode,
+# omregnet basisår og kvartals-/årsgennemsnit med NumPy over hele arrays. Perioderne ligger langs
+# sidste akse (eller kubens tidsakse); måneds- (2024M01), kvartals- (2024K1/2024Q1),
+# halvårs- (2024H1) og års-id'er (2024) understøttes. Huller i tidsaksen håndteres: en ændring
+# beregnes kun, hvor perioden netop lag perioder tidligere findes.
+#
+#   python3 derive.py PRIS111 VAREGR=000000 ENHED=100 --yoy --mom --rebase 2021 --to K
+import argparse
+
+from periods import PER_YEAR, frequency, label as _label, ordinals, ratio
+
+
+def _lagged(values, periods, lag):
+    """(nu, før): values og værdien lag perioder tidligere (NaN hvor den periode mangler)."""
+    import numpy as np
+
+    values = np.asarray(values, dtype=np.float64)
+    _, ords = ordinals(periods)
+    order = np.argsort(ords, kind="stable")
+    pos = np.searchsorted(ords[order], ords - lag)
+    pos = np.clip(pos, 0, len(ords) - 1)
+    found = ords[order][pos] == ords - lag
+    prev = np.take(values, order[pos], axis=-1)
+    prev[..., ~found] = np.nan
+    return values, prev
+
+
+def change(values, periods, lag=1, pct=True):
+    """Ændring mod lag perioder tidligere: i procent (pct=True) eller absolut."""
+    import numpy as np
+
+    now, prev = _lagged(values, periods, lag)
+    if not pct:
+        return now - prev
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (now / prev - 1.0) * 100.0
+
+
+def yoy(values, periods, pct=True):
+    """Ændring i forhold til samme periode året før (som StatBanks 'Ændring ... året før (pct.)')."""
+    return change(values, periods, lag=PER_YEAR[frequency(periods)], pct=pct)
+
+
+def pop(values, periods, pct=True):
+    """Ændring i forhold til perioden før (måned-til-måned, kvartal-til-kvartal ...)."""
+    return change(values, periods, lag=1, pct=pct)
+
+
+def rebase(values, periods, base, level=100.0):
+    """
+    Omregn indeks, så base = level. base er en periode ('2024M01') eller et år ('2021'),
+    hvor gennemsnittet af årets perioder bruges (som DST's 'Indeks (2021=100)').
+    """
+    import numpy as np
+
+    values = np.asarray(values, dtype=np.float64)
+    base = str(base)
+    if base in periods:
+        ref = np.take(values, [list(periods).index(base)], axis=-1)
+    else:
+        idx = [i for i, p in enumerate(periods) if str(p)[:4] == base]
+        if not idx:
+            raise ValueError(f"Basisperioden {base} findes ikke i tidsaksen.")
+        ref = np.nanmean(np.take(values, idx, axis=-1), axis=-1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return values / ref * level
+
+
+def aggregate(values, periods, to="Y", how="mean", complete=True):
+    """
+    (perioder, values) samlet til lavere frekvens: to = 'K'/'Q', 'H' eller 'Y'.
+    how = 'mean', 'sum' eller 'last'. complete=True: kun perioder med alle delperioder.
+    """
+    import numpy as np
+
+    if how not in ("mean", "sum", "last"):
+        raise ValueError(f"Ukendt how='{how}' (mean, sum eller last).")
+    to = {"Q": "K"}.get(to.upper(), to.upper())
+    freq, ords = ordinals(periods)
+    step = ratio(freq, to)
+    values = np.asarray(values, dtype=np.float64)
+    groups = ords // step
+    uniq, inverse = np.unique(groups, return_inverse=True)
+    counts = np.bincount(inverse, minlength=len(uniq))
+
+    shape = values.shape[:-1] + (len(uniq),)
+    if how == "last":
+        order = np.lexsort((ords, inverse))
+        last = order[np.cumsum(counts) - 1]
+        out = np.take(values, last, axis=-1)
+    else:
+        # gruppesummer som ét matrixprodukt med en 0/1-matrix [periode x gruppe]
+        flat = values.reshape(-1, values.shape[-1])
+        ok = ~np.isnan(flat)
+        member = np.zeros((len(ords), len(uniq)))
+        member[np.arange(len(ords)), inverse] = 1.0
+        sums = np.where(ok, flat, 0.0) @ member
+        n = ok @ member
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out = sums / n if how == "mean" else np.where(n > 0, sums, np.nan)
+        out = out.reshape(shape)
+    keep = counts == step if complete else np.ones(len(uniq), dtype=bool)
+    return [_label(to, g) for g in uniq[keep]], out[..., keep]
+
+
+# --- på kuber (cube.py) -------------------------------------------------------------
+
+def _along_time(cube, func):
+    import numpy as np
+
+    if cube.time_dim is None:
+        raise ValueError(f"{cube.table}: kuben har ingen tidsakse.")
+    t = cube.axis(cube.time_dim)
+    periods, values = func(np.moveaxis(cube.values, t, -1), cube.labels[cube.time_dim])
+    return periods, np.moveaxis(values, -1, t)
+
+
+def derive_cube(cube, kind, **kw):
+    """
+    Ny Cube med den afledte serie: kind = 'yoy', 'pop', 'rebase' (base=...) eller
+    'aggregate' (to=..., how=...). Tidsaksen er uændret, undtagen ved 'aggregate'.
+    """
+    from cube import Cube
+
+    funcs = {"yoy": yoy, "pop": pop, "rebase": rebase}
+    if kind == "aggregate":
+        periods, values = _along_time(cube, lambda v, p: aggregate(v, p, **kw))
+    elif kind in funcs:
+        periods, values = _along_time(cube, lambda v, p: (p, funcs[kind](v, p, **kw)))
+    else:
+        raise ValueError(f"Ukendt afledning '{kind}' (yoy, pop, rebase, aggregate).")
+    labels = dict(cube.labels, **{cube.time_dim: periods})
+    texts = dict(cube.texts, **{cube.time_dim: periods})
+    return Cube(cube.table, cube.dims, labels, values, texts, cube.time_dim)
+
+
+if __name__ == "__main__":
+    import numpy as np
+
+    from bulk import _parse_var
+    from cube import fetch_cube
+    from metaindex import meta_index
+
+    ap = argparse.ArgumentParser(description="Hent indeksniveauet én gang og afled serier lokalt.")
+    ap.add_argument("table")
+    ap.add_argument("variables", nargs="+", help="KODE=værdi1,værdi2 (brug * for alle); tid = alle, hvis udeladt")
+    ap.add_argument("--yoy", action="store_true", help="ændring i pct. mod samme periode året før")
+    ap.add_argument("--mom", "--pop", dest="pop", action="store_true", help="ændring i pct. mod perioden før")
+    ap.add_argument("--rebase", help="nyt basisår eller -periode (= 100)")
+    ap.add_argument("--to", help="saml til K, H eller Y (gennemsnit)")
+    ap.add_argument("--lang", default="da")
+    args = ap.parse_args()
+
+    variables = [_parse_var(v) for v in args.variables]
+    # tidsvariablen kan ikke elimineres: udeladt = alle perioder (ét kald)
+    tv = meta_index(args.table, lang=args.lang).time_var
+    if tv and all(str(v["code"]).upper() != tv.upper() for v in variables):
+        variables.append({"code": tv, "values": ["*"]})
+    cube = fetch_cube(args.table, variables, lang=args.lang)
+    views = {"indeks": cube}
+    if args.yoy:
+        views["år-til-år %"] = derive_cube(cube, "yoy")
+    if args.pop:
+        views["periode-til-periode %"] = derive_cube(cube, "pop")
+    if args.rebase:
+        views[f"indeks ({args.rebase}=100)"] = derive_cube(cube, "rebase", base=args.rebase)
+    if args.to:
+        views[f"gennemsnit pr. {args.to}"] = derive_cube(cube, "aggregate", to=args.to)
+    with np.printoptions(precision=2, suppress=True):
+        for name, c in views.items():
+            print(f"\n[{name}]")
+            for key, series in c.series().items():
+                label = " | ".join(key) or c.table
+                print(f"  {label}")
+                for period, value in zip(c.labels[c.time_dim], series):
+                    print(f"    {period}: {value:.2f}")
@@ -1,25 +1,33 @@
-from denstatbank import StatBankClient
+from lite import fetch_selection
+from sinks import emit
+from metaindex import meta_index
+from spans import span, traced
+from statbank import data_jsonstat
 
-sbc = StatBankClient(lang='da')
+@traced('FOLK1AM')
+def fetch_folk1am_from_2024(lang="da"):
+    with span("resolve"):
+        # Hent metadata for tabellen (indekseret én gang pr. tabel)
+        meta = meta_index('FOLK1AM', lang=lang)
 
-# Hent metadata for tabellen
-meta = sbc.tableinfo('FOLK1AM', variables_df=True)
+        # Tidskoder (id) fra 2024M01 og frem (binær søgning i periodeindekset)
+        times_from_2024 = meta.periods('TID').since('2024M01')
 
-# Filtrér tidskoder (id) fra 2024M01 og frem
-tid_df = meta[meta['variable'].str.lower() == 'tid']
-all_times = tid_df['id'].tolist()
-times_from_2024 = [t for t in all_times if t >= '2024M01']
+    with span("payload"):
+        vars_min = [
+            {'code': 'OMRÅDE', 'values': ['000']},    # Hele landet
+            {'code': 'KØN',    'values': ['TOT']},    # Begge køn
+            {'code': 'ALDER',  'values': ['IALT']},   # I alt
+            {'code': 'TID',    'values': times_from_2024}
+        ]
 
-vars_min = [
-    sbc.variable_dict('OMRÅDE', ['000']),    # Hele landet
-    sbc.variable_dict('KØN',    ['TOT']),    # Begge køn
-    sbc.variable_dict('ALDER',  ['IALT']),   # I alt
-    sbc.variable_dict('TID',    times_from_2024)
-]
+    # DataFrame via JSON-stat (jsonstat.py) – eller lister via stdlib csv i let tilstand (DST_LITE=1)
+    df = fetch_selection('FOLK1AM', vars_min, 'TID',
+                         lambda v: data_jsonstat('FOLK1AM', v, lang=lang), lang=lang)
 
-df = sbc.data('FOLK1AM', variables=vars_min)
+    with span("output"):
+        emit(df, 'FOLK1AM')
+    return df
 
-serie = df.iloc[:, 0]
-
-for tid, value in serie.items():
-    print(f"{tid}: {value:,}".replace(",", "."))
\ No newline at end of file
+if __name__ == "__main__":
+    fetch_folk1am_from_2024(lang="da")
@@ -0,0 +1,105 @@
+# Inkrementel hentning: hent kun de perioder, vi ikke allerede har liggende lokalt
+#
+# Den lokale kopi gemmes pr. tabel + sprog + udvælgelse (alle ikke-tids-variabler),
+# så en månedlig kørsel kun beder StatBank om den/de nye perioder.
+# Slås til med DST_INCREMENTAL=1 (eller run_all.py --incremental).
+import json
+import os
+
+import statbank
+from planner import fetch_planned
+
+INCREMENTAL = os.environ.get("DST_INCREMENTAL", "0").lower() in ("1", "true", "ja", "yes")
+
+
+def _series_dir():
+    path = os.path.join(statbank.CACHE_DIR, "series")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _time_values(variables, time_code):
+    for v in variables:
+        if str(v["code"]).upper() == time_code.upper():
+            return list(v["values"])
+    raise ValueError(f"Tidsvariablen '{time_code}' er ikke med i udvælgelsen.")
+
+
+def period_column(df, time_code):
+    """Periode-id pr. række – fra kolonnen eller indeks-niveauet med tidsvariablens navn."""
+    for c in df.columns:
+        if str(c).upper() == time_code.upper():
+            return df[c].astype(str)
+    for i, name in enumerate(df.index.names):
+        if str(name).upper() == time_code.upper():
+            return df.index.get_level_values(i).astype(str).to_series(index=df.index)
+    raise ValueError(f"Fandt ikke tidsvariablen '{time_code}' i data.")
+
+
+def _merge(old, new):
+    import pandas as pd
+
+    if len(new.columns) == len(old.columns):
+        new = new.set_axis(old.columns, axis=1)   # datasættets label kan variere mellem kald
+    both = pd.concat([old, new])
+    if isinstance(both.index, pd.RangeIndex) or both.index.names == [None]:
+        keys = list(both.columns[:-1])   # alle label-kolonner; sidste kolonne er værdien
+        both = both.drop_duplicates(subset=keys, keep="last").reset_index(drop=True)
+    else:
+        both = both[~both.index.duplicated(keep="last")]
+    return both
+
+
+def load_local(key):
+    """(DataFrame, perioder) for nøglen, eller (None, []) hvis intet er gemt."""
+    import pandas as pd
+
+    base = os.path.join(_series_dir(), key)
+    if not (os.path.exists(base + ".pkl") and os.path.exists(base + ".json")):
+        return None, []
+    with open(base + ".json", encoding="utf-8") as fh:
+        state = json.load(fh)
+    return pd.read_pickle(base + ".pkl"), state["periods"]
+
+
+def save_local(key, df, periods):
+    base = os.path.join(_series_dir(), key)
+    tmp = f"{base}.{os.getpid()}.pkl.tmp"
+    df.to_pickle(tmp)
+    os.replace(tmp, base + ".pkl")
+    statbank._write_json_atomic(base + ".json", {"periods": periods, "last_period": periods[-1] if periods else None})
+
+
+def fetch_incremental(table, variables, time_code, fetch, lang="da", enabled=None):
+    """
+    Hent `variables` via fetch(variables) -> DataFrame, men kun for de perioder der
+    ikke allerede ligger lokalt. Nye rækker flettes ind i den lokale kopi, og der
+    returneres rækkerne for de ønskede perioder. Selve hentningen går gennem
+    planner.fetch_planned, så store udvælgelser deles op under cellegrænsen.
+    """
+    enabled = INCREMENTAL if enabled is None else enabled
+    if not enabled:
+        return fetch_planned(table, variables, fetch, lang=lang)
+
+    wanted = _time_values(variables, time_code)
+    key = statbank.selection_key(table, variables, time_code, lang)
+    local, held = load_local(key)
+    held_set = set(held)
+    missing = [t for t in wanted if t not in held_set]
+
+    if missing or local is None:
+        sel = [dict(v, values=missing) if str(v["code"]).upper() == time_code.upper() else v
+               for v in variables]
+        new = fetch_planned(table, sel, fetch, lang=lang)
+        print(f"[incremental] {table}: {len(missing)} nye perioder hentet, {len(wanted) - len(missing)} fra lokal kopi")
+        if new is not None and not new.empty:
+            local = new if local is None else _merge(local, new)
+            held = sorted(held_set | set(period_column(new, time_code)))
+            save_local(key, local, held)
+    else:
+        print(f"[incremental] {table}: ingen nye perioder – bruger lokal kopi")
+
+    if local is None:
+        return None
+    wanted_set = set(wanted)
+    return local[period_column(local, time_code).isin(wanted_set).values]
@@ -0,0 +1,119 @@
+# JSON-stat direkte til NumPy – uden DataFrame-mellemtrin og uden et Python-objekt pr. celle
+#
+# Et JSONSTAT-svar er metadata (dimensioner, kategorier) plus ét langt "value"-array i
+# rækkefølge med sidste dimension hurtigst. Metadatadelen er lille og læses med json; selve
+# value-arrayet skæres ud af de rå bytes og læses i C af np.fromstring til et float64-
+# (eller int64-, hvis alle tal er heltal) buffer, der reshapes til dimensionernes størrelser.
+# Svar, hvor "value" ikke er et simpelt array (fx sparse objekt-form), læses med json som før.
+import json
+import re
+
+_VALUE = re.compile(rb'"value"\s*:\s*\[')
+_NOT_INT = re.compile(rb"[.eEn]")   # decimaltegn, eksponent eller null/nan
+
+
+def _dataset(obj):
+    return obj.get("dataset", obj)
+
+
+def _split(raw):
+    """(svaret som dict med tomt value-array, value-bytes) – value-bytes er None, hvis ikke fundet."""
+    m = _VALUE.search(raw)
+    if m is None:
+        return json.loads(raw), None
+    end = raw.find(b"]", m.end())
+    if end < 0:
+        return json.loads(raw), None
+    rest = raw[:m.end()] + raw[end:]
+    return json.loads(rest), raw[m.end():end]
+
+
+def _numbers(buf, n):
+    import numpy as np
+
+    if not buf.strip():
+        values = np.empty(0)
+    else:
+        values = np.fromstring(buf.replace(b"null", b"nan").decode("ascii"), sep=",")
+    if len(values) != n:
+        raise ValueError(f"JSON-stat: {len(values)} værdier, forventede {n}.")
+    if not _NOT_INT.search(buf):
+        return values.astype(np.int64)
+    return values
+
+
+def dimensions(ds):
+    """[(id, [kategori-id'er i indeksrækkefølge], [tekster])] i datasættets dimensionsrækkefølge."""
+    dim = ds["dimension"]
+    out = []
+    for code in dim["id"]:
+        cat = dim[code]["category"]
+        index = cat.get("index")
+        if index is None:
+            ids = list(cat.get("label", {}))
+        elif isinstance(index, dict):
+            ids = sorted(index, key=index.get)
+        else:
+            ids = list(index)
+        labels = cat.get("label", {})
+        out.append((code, ids, [labels.get(i, i) for i in ids]))
+    return out
+
+
+def parse(raw):
+    """
+    (datasæt uden værdier, dimensioner, ndarray med shape = dimensionsstørrelser).
+    raw er svarets bytes (eller et allerede parset dict).
+    """
+    import numpy as np
+
+    if isinstance(raw, (bytes, bytearray)):
+        obj, buf = _split(bytes(raw))
+    else:
+        obj, buf = raw, None
+    ds = _dataset(obj)
+    dims = dimensions(ds)
+    shape = tuple(len(ids) for _, ids, _ in dims)
+    n = int(np.prod(shape)) if shape else 1
+    if buf is not None:
+        values = _numbers(buf, n)
+    else:
+        # sparse form {"indeks": værdi} eller allerede parset liste
+        values = np.full(n, np.nan)
+        v = ds.get("value") or []
+        if isinstance(v, dict):
+            for k, x in v.items():
+                values[int(k)] = np.nan if x is None else x
+        else:
+            values[:] = np.array(v, dtype=np.float64)
+    return ds, dims, values.reshape(shape)
+
+
+def to_frame(raw, codes):
+    """
+    DataFrame i samme form som denstatbank.utils.data_dict_to_df: én værdikolonne (datasættets
+    label) med et MultiIndex af kategoritekster for de dimensioner, der står i codes (små bogstaver).
+    """
+    import pandas as pd
+
+    ds, dims, values = parse(raw)
+    codes = [c.lower() for c in codes]
+    keep = [(code.lower(), texts) for code, _, texts in dims if code.lower() in codes]
+    df = pd.DataFrame({ds.get("label"): values.ravel()})
+    if keep:
+        df.index = pd.MultiIndex.from_product([t for _, t in keep], names=[k for k, _ in keep])
+    return df
+
+
+def fill_cube(cube, raw):
+    """Placér et JSON-stat-svar i en (tom) cube.Cube; dimensionerne matches på id. Returnerer antal celler."""
+    import numpy as np
+
+    _, dims, values = parse(raw)
+    src = [cube.dims.index(cube._dim(code)) for code, _, _ in dims]
+    if sorted(src) != list(range(len(cube.dims))):
+        raise ValueError(f"JSON-stat-svarets dimensioner passer ikke til {cube!r}.")
+    pos = [cube.positions(code, ids) for code, ids, _ in dims]
+    order = np.argsort(src)
+    cube.values[np.ix_(*[pos[i] for i in order])] = np.transpose(values, order)
+    return int(values.size)
@@ -1,48 +1,28 @@
 # pip install requests pandas
-import requests
-import pandas as pd
-from io import StringIO
-
-BASE = "https://api.statbank.dk/v1"
+from query import Table
+from sinks import emit
+from spans import span, traced
 
+@traced("LBESK04")
 def fetch_lbesk04_from_2024(lang="da"):
-    # 1) Hent metadata og find tidsvariablen (LBESK04 bruger 'Tid')
-    meta = requests.get(
-        f"{BASE}/tableinfo/LBESK04",
-        params={"contentType": "JSON", "lang": lang},
-        timeout=30
-    ).json()
+    # 'Sektorer i alt', alle måneder fra 2024M01 og frem – filtrene skubbes ned i payloaden
+    query = Table("LBESK04", lang=lang).where(SEKTOR="1000").since("2024M01")
 
-    tidsvar = next(v for v in meta["variables"] if v.get("time"))
-    all_months = [val["id"] for val in tidsvar["values"]]
-    months = [m for m in all_months if m >= "2024M01"]
+    with span("resolve"):
+        # 1) Planen (metadata -> payload) – genbrugt fra cachen, så længe tabellen er uændret
+        plan = query.plan()
+        months = next(v["values"] for v in plan["variables"] if v["code"] == plan["time_var"])
 
-    print(f"[tableinfo] tidsvariabel = {tidsvar['id']}, antal måneder valgt = {len(months)}")
+        print(f"[tableinfo] tidsvariabel = {plan['time_var']}, antal måneder valgt = {len(months)}")
 
     # 2) Hent data (CSV) via POST med alle måneder eksplicit
-    url = f"{BASE}/data/LBESK04/CSV"
-    payload = {
-        "table": "LBESK04",
-        "format": "CSV",
-        "variables": [
-            {"code": "SEKTOR", "values": ["1000"]},    # 'Sektorer i alt'
-            {"code": tidsvar["id"], "values": months}  # alle måneder fra 2024M01 og frem
-        ]
-    }
-    r = requests.post(url, params={"lang": lang}, json=payload, timeout=60)
-    print("[data] URL:", r.url)
-    if r.status_code >= 400:
-        print("[data] Fejltekst:", r.text[:1000])
-        r.raise_for_status()
-
-    df = pd.read_csv(StringIO(r.text), sep=";")
+    df = query.collect()
 
-    # 3) Print ALT, uden truncation
-    print("\n[Data – alle rækker]")
-    with pd.option_context("display.max_columns", None,
-                           "display.max_rows", None,
-                           "display.width", 200):
-        print(df)
+    with span("output"):
+        # 3) Print ALT, uden truncation
+        print("\n[Data – alle rækker]")
+        emit(df, "LBESK04", view="table")
+    return df
 
 if __name__ == "__main__":
-    fetch_lbesk04_from_2024(lang="da")
\ No newline at end of file
+    fetch_lbesk04_from_2024(lang="da")
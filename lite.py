@@ -0,0 +1,223 @@
+# Let tilstand til små udtræk: stdlib csv + almindelige lister, pandas først når det skal bruges
+#
+# Slås til med DST_LITE=1 (eller run_all.py --lite). Metadata og data hentes så med http.client
+# (statbank.light_request), CSV læses med csv-modulet, og scripts får et Rows-objekt tilbage
+# i stedet for et DataFrame. pandas importeres først, hvis nogen kalder Rows.to_frame().
+# Store udtræk, inkrementel hentning og det lokale lager bruger fortsat den almindelige vej.
+#
+#   DST_LITE=1 python3 folk1am.py
+#   python3 lite.py                       # mål importtiden for alle scripts mod budgettet
+#   python3 lite.py folk1am --budget 30
+import csv
+import io
+import os
+import re
+import sys
+import time
+
+import incremental
+import planner
+import statbank
+from metaindex import meta_index
+from spans import span
+from store import save_frame
+
+IMPORT_BUDGET_MS = float(os.environ.get("DST_IMPORT_BUDGET_MS", 50))
+HEAVY = ("pandas", "numpy", "requests", "denstatbank", "asyncio")
+
+
+def _number(raw):
+    """CSV-værdi -> int/float ('1,5' og '1.5' -> 1.5); manglende ('..', '') -> nan."""
+    s = raw.strip().replace(",", ".")
+    try:
+        return int(s)
+    except ValueError:
+        try:
+            return float(s)
+        except ValueError:
+            return float("nan")
+
+
+class Rows:
+    """
+    Et lille udtræk som almindelige lister: columns (CSV-overskrift), labels (tuple pr. række)
+    og values (tal pr. række). items() giver (labels, værdi) som serie.items() på et DataFrame.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        reader = csv.reader(io.StringIO(text), delimiter=";")
+        self.columns = next(reader, [])
+        self.labels = []
+        self.values = []
+        for rec in reader:
+            if not rec:
+                continue
+            self.labels.append(tuple(rec[:-1]))
+            self.values.append(_number(rec[-1]))
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def empty(self):
+        return not self.values
+
+    def items(self):
+        return zip(self.labels, self.values)
+
+    def to_frame(self):
+        """Som pd.read_csv(..., sep=';') på svaret – importerer pandas først nu."""
+        import pandas as pd
+
+        return pd.read_csv(io.StringIO(self.text), sep=";")
+
+    def to_string(self, float_format=None):
+        """Simpel tabeludskrift (højrestillede værdier) uden pandas."""
+        fmt = float_format or str
+        body = [list(l) + [fmt(v) if isinstance(v, float) else str(v)] for l, v in self.items()]
+        widths = [max(len(str(r[i])) for r in [self.columns] + body) for i in range(len(self.columns))]
+        lines = ["  ".join(str(c).ljust(w) for c, w in zip(self.columns, widths))]
+        for r in body:
+            lines.append("  ".join([c.ljust(w) for c, w in zip(r[:-1], widths)] + [r[-1].rjust(widths[-1])]))
+        return "\n".join(lines)
+
+    def __str__(self):
+        return self.to_string()
+
+
+def fetch_rows(table, variables, lang="da", timeout=60):
+    """POST /data/{table}/CSV med http.client (eller fra datacache.py) og læs svaret til Rows."""
+    import datacache
+
+    path, cached = statbank.cached_data(table, variables, lang, "CSV")
+    if cached is not None:
+        status, content, url = cached.status_code, cached.content, cached.url
+        print("[data] URL:", url, "(lokal cache)")
+    else:
+        with span("http", table=table.upper(), fmt="CSV", profile=True) as sp:
+            status, content, url = statbank.light_request(
+                "POST", f"/data/{table}/CSV", params={"lang": lang},
+                body={"table": table, "format": "CSV", "variables": variables}, timeout=timeout, sp=sp,
+            )
+            sp["status"] = status
+            sp["bytes"] = len(content)
+        print("[data] URL:", url)
+        if status == 200:
+            datacache.store(path, content, url, "utf-8")
+    text = content.decode("utf-8-sig")
+    if status >= 400:
+        print("[data] Fejltekst:", text[:1000])
+        raise RuntimeError(f"StatBank svarede {status} for {url}.")
+    with span("parse", fmt="CSV", profile=True) as sp:
+        rows = Rows(text)
+        sp["rows"] = len(rows)
+    return rows
+
+
+def fetch_selection(table, variables, time_code, fetch_frame, lang="da"):
+    """
+    Hent udvælgelsen. I let tilstand og for udvælgelser under cellegrænsen uden inkrementel
+    kopi: Rows via fetch_rows. Ellers den almindelige vej – fetch_incremental(fetch_frame)
+    -> DataFrame, som også gemmes i det lokale lager.
+    """
+    if (statbank.LITE and not incremental.INCREMENTAL
+            and planner.estimate_cells(meta_index(table, lang=lang), variables) <= planner.CELL_LIMIT):
+        return fetch_rows(table, variables, lang=lang)
+    df = incremental.fetch_incremental(table, variables, time_code, fetch_frame, lang=lang)
+    save_frame(table, variables, time_code, df, lang=lang)
+    return df
+
+
+def items(df):
+    """(labels, værdi)-par for første værdikolonne – fra et DataFrame eller Rows."""
+    return df.items() if isinstance(df, Rows) else df.iloc[:, 0].items()
+
+
+# --- importtid -----------------------------------------------------------------------
+
+_IMPORTTIME = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( +)(\S+)")
+
+
+def import_time(module, lite=True):
+    """
+    Mål importen af module i en frisk proces (python -X importtime).
+    Returnerer {"module", "ms", "process_ms", "heaviest": [(navn, ms)], "heavy": [tunge pakker]},
+    hvor heaviest er de dyreste eksterne moduler, som repoets egne moduler importerer.
+    """
+    import subprocess
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, DST_LITE="1" if lite else "0")
+    t0 = time.perf_counter()
+    p = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                       capture_output=True, text=True, env=env, cwd=here)
+    process_ms = (time.perf_counter() - t0) * 1000
+    if p.returncode != 0:
+        raise RuntimeError(f"Kunne ikke importere {module}:\n{p.stderr[-1000:]}")
+
+    # underimporter står før deres forælder; dybde = (indrykning - 1) / 2
+    entries, children, pending = [], [], {}
+    for line in p.stderr.splitlines():
+        m = _IMPORTTIME.match(line)
+        if not m:
+            continue
+        depth = (len(m[3]) - 1) // 2
+        entries.append((m[4], int(m[2]) / 1000))
+        children.append(pending.pop(depth + 1, []))
+        pending.setdefault(depth, []).append(len(entries) - 1)
+        if depth == 0 and m[4] == module:
+            break
+    else:
+        raise RuntimeError(f"Fandt ikke {module} i importtime-output.")
+
+    def _local(name):
+        return os.path.exists(os.path.join(here, name.split(".")[0] + ".py"))
+
+    heaviest, seen, stack = [], set(), [len(entries) - 1]
+    while stack:
+        for i in children[stack.pop()]:
+            if _local(entries[i][0]):
+                stack.append(i)
+            elif entries[i][0] not in seen:
+                seen.add(entries[i][0])
+                heaviest.append(entries[i])
+    root = len(entries) - 1
+    subtree, stack = set(), [root]
+    while stack:
+        i = stack.pop()
+        subtree.add(entries[i][0].split(".")[0])
+        stack.extend(children[i])
+    return {"module": module, "ms": entries[root][1], "process_ms": process_ms,
+            "heaviest": sorted(heaviest, key=lambda e: -e[1])[:5],
+            "heavy": [h for h in HEAVY if h in subtree]}
+
+
+def report(modules, budget_ms=None, lite=True):
+    """Udskriv importtiden pr. modul mod budgettet. Returnerer True hvis alle holder budgettet."""
+    budget_ms = IMPORT_BUDGET_MS if budget_ms is None else budget_ms
+    print(f"[lite] importtid med DST_LITE={'1' if lite else '0'} (budget {budget_ms:.0f} ms)")
+    ok = True
+    for module in modules:
+        r = import_time(module, lite=lite)
+        within = r["ms"] <= budget_ms
+        ok &= within
+        heaviest = ", ".join(f"{n} {ms:.1f}" for n, ms in r["heaviest"][:3])
+        heavy = f"  tunge: {', '.join(r['heavy'])}" if r["heavy"] else ""
+        print(f"  {'OK  ' if within else 'OVER'} {module:<10} {r['ms']:7.1f} ms  "
+              f"(proces {r['process_ms']:.0f} ms)  {heaviest}{heavy}")
+    return ok
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from run_all import TABLES
+
+    ap = argparse.ArgumentParser(description="Mål importtiden for scripts i let tilstand.")
+    ap.add_argument("modules", nargs="*", help="moduler (default: alle scripts i run_all)")
+    ap.add_argument("--budget", type=float, default=None, help=f"ms pr. modul (default {IMPORT_BUDGET_MS:.0f})")
+    ap.add_argument("--full", action="store_true", help="mål uden DST_LITE (den almindelige vej)")
+    args = ap.parse_args()
+    modules = args.modules or list(dict.fromkeys(m for m, _ in TABLES.values()))
+    sys.exit(0 if report(modules, args.budget, lite=not args.full) else 1)
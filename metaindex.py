@@ -0,0 +1,138 @@
+# Forudberegnet indeks over en tabels metadata (/tableinfo)
+#
+# Bygges én gang pr. tabel og erstatter gentagne boolske maske-scanninger over hele
+# metadata-DataFrame'en: variabel -> ordnede id'er/tekster, O(1) id -> tekst og
+# forud-lowercasede tekster. Søgninger kører kun over den ene variabels værdier.
+import re
+
+import statbank
+
+_FLAGS = re.IGNORECASE
+
+
+def _rx(pattern):
+    return pattern if isinstance(pattern, re.Pattern) else re.compile(pattern, _FLAGS)
+
+
+class MetaIndex:
+    def __init__(self, meta):
+        self.table = meta.get("id")
+        self.updated = meta.get("updated")
+        self.variables = []          # variabel-id'er i metadataens rækkefølge
+        self.var_text = {}
+        self.time_var = None
+        self._ids = {}
+        self._texts = {}
+        self._lower = {}
+        self._label = {}
+        self._upper_var = {}
+        self._periods = {}
+        for var in meta["variables"]:
+            code = var["id"]
+            self.variables.append(code)
+            self.var_text[code] = var.get("text", code)
+            self._upper_var[code.upper()] = code
+            if var.get("time") and self.time_var is None:
+                self.time_var = code
+            ids = [str(v["id"]) for v in var["values"]]
+            texts = [str(v.get("text") or "") for v in var["values"]]
+            self._ids[code] = ids
+            self._texts[code] = texts
+            self._lower[code] = [t.lower() for t in texts]
+            self._label[code] = dict(zip(ids, texts))
+
+    # --- opslag ---------------------------------------------------------------------
+    def var(self, name):
+        """Det faktiske variabel-id for name (uafhængigt af store/små bogstaver), ellers None."""
+        return self._upper_var.get(str(name).upper())
+
+    def ids(self, var):
+        return self._ids[self.var(var)]
+
+    def texts(self, var):
+        return self._texts[self.var(var)]
+
+    def lower_texts(self, var):
+        return self._lower[self.var(var)]
+
+    def label(self, var, id_, default=None):
+        """Tekst for id_ under var (O(1)); ellers default (eller id_ selv)."""
+        return self._label[self.var(var)].get(str(id_), id_ if default is None else default)
+
+    def has(self, var, id_):
+        return str(id_) in self._label[self.var(var)]
+
+    def periods(self, var=None, freq=None):
+        """periods.PeriodIndex over tidsvariablens id'er (default time_var) – bygget én gang."""
+        from periods import PeriodIndex
+
+        code = self.var(var or self.time_var)
+        key = (code, freq)
+        if key not in self._periods:
+            self._periods[key] = PeriodIndex(self._ids[code], freq)
+        return self._periods[key]
+
+    # --- søgning --------------------------------------------------------------------
+    def find_var(self, candidates):
+        """Første præcise variabel-match (uden hensyn til case), ellers første delstrengs-match; ellers None."""
+        for c in candidates:
+            v = self.var(c)
+            if v is not None:
+                return v
+        for c in candidates:
+            cu = c.upper()
+            for v in self.variables:
+                if cu in v.upper():
+                    return v
+        return None
+
+    def search(self, var, *patterns, fields=("text",)):
+        """
+        Id'er under var (i metadataens rækkefølge), hvor mindst ét af mønstrene
+        matcher (re.search, uden hensyn til case) mindst ét af felterne 'id'/'text'.
+        """
+        var = self.var(var)
+        rxs = [_rx(p) for p in patterns]
+        cols = [self._ids[var] if f == "id" else self._texts[var] for f in fields]
+        return [i for i, *vals in zip(self._ids[var], *cols)
+                if any(rx.search(v) for rx in rxs for v in vals)]
+
+    def first(self, var, *patterns, fields=("text",)):
+        """Første id fra search(...), eller None."""
+        hits = self.search(var, *patterns, fields=fields)
+        return hits[0] if hits else None
+
+    def count_matches(self, pattern, field="text"):
+        """{variabel: antal værdier der matcher} for variabler med mindst ét match."""
+        rx = _rx(pattern)
+        out = {}
+        for var in self.variables:
+            vals = self._ids[var] if field == "id" else self._texts[var]
+            n = sum(1 for v in vals if rx.search(v))
+            if n:
+                out[var] = n
+        return out
+
+    def best_var(self, pattern, field="text"):
+        """Variablen med flest matchende værdier (ved lighed: første i metadata), ellers None."""
+        counts = self.count_matches(pattern, field=field)
+        return max(counts, key=counts.get) if counts else None
+
+
+_indexes = {}
+
+
+def meta_index(table, lang="da"):
+    """MetaIndex for tabellen – bygget én gang pr. proces og tabel-version (fra disk-cachen)."""
+    meta = statbank.tableinfo(table, lang=lang)
+    key = (table.upper(), lang, meta.get("updated"))
+    idx = _indexes.get(key)
+    if idx is None:
+        idx = _indexes[key] = MetaIndex(meta)
+    return idx
+
+
+def forget(table, lang="da", keep=None):
+    """Glem indekser for tabellen bortset fra versionen `keep` ('updated') – til lange kørsler."""
+    for key in [k for k in _indexes if k[:2] == (table.upper(), lang) and k[2] != keep]:
+        del _indexes[key]
@@ -0,0 +1,384 @@
+# Lokal stand-in for api.statbank.dk/v1 – til benchmarks og kørsler uden netværk
+#
+# Metadata afspilles fra fixtures/tableinfo/<TABEL>-<sprog>.json. /data-svar afspilles fra
+# fixtures/data/<TABEL>-<nøgle>.json, hvis netop den udvælgelse er optaget; ellers dannes de
+# deterministisk ud fra metadata (samme udvælgelse giver altid samme tal). /tables og /subjects
+# afledes af metadata. Hver tabel findes også som en syntetisk stor variant <TABEL>_XL, hvor den
+# største ikke-tids-variabel er forlænget, så hele tabellen fylder mindst XL_CELLS celler.
+#
+#   python3 mockserver.py                          # http://127.0.0.1:8765/v1
+#   python3 mockserver.py --port 9000 --latency 40 # 40 ms svartid pr. kald
+#   python3 mockserver.py --record                 # proxy mod det rigtige API; gem svarene som fixtures
+#   python3 mockserver.py --fail-rate 0.2 --fail-status 429 --retry-after 1   # fejlinjektion
+#   python3 mockserver.py --slow-rate 0.05 --slow-ms 2000                      # sjældne, langsomme svar
+#
+# Peg scripts på serveren med DST_BASE=http://127.0.0.1:8765/v1.
+import hashlib
+import itertools
+import json
+import math
+import os
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+UPSTREAM = "https://api.statbank.dk/v1"
+CELL_LIMIT = 1_000_000   # som StatBank: gælder ikke for BULK
+XL_CELLS = 2_000_000
+XL_SUFFIX = "_XL"
+
+
+# --- fixtures ------------------------------------------------------------------------
+
+def _read_json(path):
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _write_json(path, obj):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(obj, fh, ensure_ascii=False, indent=1)
+        fh.write("\n")
+    os.replace(tmp, path)
+
+
+def fixture_tables():
+    """Tabel-id'er med optaget metadata (uden _XL-varianterne)."""
+    d = os.path.join(FIXTURES_DIR, "tableinfo")
+    return sorted({f.rsplit("-", 1)[0] for f in os.listdir(d) if f.endswith(".json")})
+
+
+def _xl(meta, cells=None):
+    """Syntetisk stor variant: den største ikke-tids-variabel forlænges til ca. `cells` celler i alt."""
+    cells = XL_CELLS if cells is None else cells
+    meta = json.loads(json.dumps(meta))
+    meta["id"] = meta["id"] + XL_SUFFIX
+    meta["text"] = meta["text"] + " (syntetisk stor variant)"
+    others = [v for v in meta["variables"] if not v.get("time")]
+    if not others:
+        return meta
+    total = math.prod(len(v["values"]) for v in meta["variables"])
+    var = max(others, key=lambda v: len(v["values"]))
+    base = var["values"]
+    wanted = math.ceil(cells * len(base) / total)
+    var["values"] = base + [{"id": f"{base[i % len(base)]['id']}_{i // len(base)}",
+                             "text": f"{base[i % len(base)]['text']} ({i // len(base)})"}
+                            for i in range(len(base), wanted)]
+    return meta
+
+
+_meta_cache = {}
+
+
+def tableinfo(table, lang="da"):
+    """Metadata for tabellen (eller _XL-varianten); None hvis der ikke er nogen fixture."""
+    table = table.upper()
+    key = (table, lang)
+    if key not in _meta_cache:
+        base = table[:-len(XL_SUFFIX)] if table.endswith(XL_SUFFIX) else table
+        d = os.path.join(FIXTURES_DIR, "tableinfo")
+        path = next((p for p in (os.path.join(d, f"{base}-{lang}.json"), os.path.join(d, f"{base}-da.json"))
+                     if os.path.exists(p)), None)
+        meta = None if path is None else _read_json(path)
+        if meta is not None and base != table:
+            meta = _xl(meta)
+        _meta_cache[key] = meta
+    return _meta_cache[key]
+
+
+def data_key(table, fmt, lang, variables):
+    raw = json.dumps([table.upper(), fmt.upper(), lang,
+                      sorted([str(v["code"]).upper(), list(map(str, v["values"]))] for v in variables)],
+                     ensure_ascii=False)
+    return f"{table.upper()}-{hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]}"
+
+
+def _recorded(key):
+    path = os.path.join(FIXTURES_DIR, "data", f"{key}.json")
+    return _read_json(path) if os.path.exists(path) else None
+
+
+# --- syntetiske /data-svar -----------------------------------------------------------
+
+class RequestError(Exception):
+    pass
+
+
+def _dims(meta, variables):
+    """[(variabel, [(id, tekst), ...]), ...] i tabellens rækkefølge for udvælgelsen."""
+    sel = {str(v["code"]).upper(): [str(x) for x in v["values"]] for v in variables}
+    known = {v["id"].upper() for v in meta["variables"]}
+    unknown = [c for c in sel if c not in known]
+    if unknown:
+        raise RequestError(f"Ukendt variabel: {', '.join(unknown)}")
+    dims = []
+    for var in meta["variables"]:
+        ids = sel.get(var["id"].upper())
+        if ids is None:
+            if not var.get("elimination", True):
+                raise RequestError(f"Variablen {var['id']} kan ikke elimineres.")
+            continue
+        text = {v["id"]: v["text"] for v in var["values"]}
+        if "*" in ids:
+            ids = [v["id"] for v in var["values"]]
+        missing = [i for i in ids if i not in text]
+        if missing:
+            raise RequestError(f"Ukendt værdi for {var['id']}: {', '.join(missing[:5])}")
+        dims.append((var, [(i, text[i]) for i in ids]))
+    return dims
+
+
+def _value(combo, time_pos):
+    """Deterministisk tal for en celle: niveau pr. serie + jævn trend over tid + lidt støj."""
+    series = "|".join(i for k, (i, _) in enumerate(combo) if k != time_pos)
+    level = 50 + zlib.crc32(series.encode("utf-8")) % 950
+    t = combo[time_pos][0] if time_pos is not None else ""
+    step = zlib.crc32(t.encode("utf-8")) % 100 / 100
+    trend = sum(ord(c) for c in t[:4]) if t else 0
+    return round(level * (1 + trend / 10_000) + step, 1)
+
+
+def _combos(dims):
+    time_pos = next((k for k, (v, _) in enumerate(dims) if v.get("time")), None)
+    for combo in itertools.product(*[vals for _, vals in dims]):
+        yield combo, _value(combo, time_pos)
+
+
+def _csv_lines(dims, bulk=False):
+    yield ";".join(v["id"].upper() for v, _ in dims) + ";INDHOLD\n"
+    for combo, value in _combos(dims):
+        labels = ";".join(i if bulk else t for i, t in combo)
+        yield f"{labels};{str(value).replace('.', ',') if bulk else value}\n"
+
+
+def _jsonstat(meta, dims):
+    dimension = {v["id"]: {"label": v["text"],
+                           "category": {"index": {i: k for k, (i, _) in enumerate(vals)},
+                                        "label": {i: t for i, t in vals}}}
+                 for v, vals in dims}
+    dimension["id"] = [v["id"] for v, _ in dims]
+    dimension["size"] = [len(vals) for _, vals in dims]
+    dimension["role"] = {"time": [v["id"] for v, _ in dims if v.get("time")]}
+    return {"dataset": {"label": meta["text"], "source": "Danmarks Statistik (mockserver)",
+                        "updated": meta.get("updated"), "dimension": dimension,
+                        "value": [value for _, value in _combos(dims)]}}
+
+
+# --- HTTP ----------------------------------------------------------------------------
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "StatBankMock/1.0"
+    disable_nagle_algorithm = True   # ellers ~40 ms delayed-ACK-pause pr. keep-alive-kald
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self._handle(None)
+
+    def do_POST(self):
+        n = int(self.headers.get("Content-Length", 0) or 0)
+        raw = self.rfile.read(n) if n else b""
+        try:
+            self._handle(json.loads(raw) if raw else {})
+        except json.JSONDecodeError:
+            self._send(400, {"errorTypeCode": "BAD-REQUEST", "message": "Ugyldig JSON i forespørgslen."})
+
+    def _send(self, status, body, ctype="application/json; charset=utf-8", headers=None):
+        if not isinstance(body, (bytes, str)):
+            body = json.dumps(body, ensure_ascii=False)
+        data = body.encode("utf-8") if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream(self, lines, ctype="text/csv; charset=utf-8", flush_bytes=64 * 1024):
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        buf, size = [], 0
+        for line in lines:
+            b = line.encode("utf-8")
+            buf.append(b)
+            size += len(b)
+            if size >= flush_bytes:
+                chunk = b"".join(buf)
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                buf, size = [], 0
+        if buf:
+            chunk = b"".join(buf)
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _handle(self, body):
+        srv = self.server
+        url = urlsplit(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        parts = [p for p in url.path.split("/") if p]
+        if parts[:1] == ["v1"]:
+            parts = parts[1:]
+        body = body or {}
+        lang = query.get("lang") or body.get("lang") or "da"
+        with srv.lock:
+            srv.log.append({"method": self.command, "path": url.path, "query": query, "body": body})
+        if srv.latency:
+            time.sleep(srv.latency)
+        with srv.lock:
+            fail, slow = srv.faults.random() < srv.fail_rate, srv.faults.random() < srv.slow_rate
+        if slow:
+            time.sleep(srv.slow_ms / 1000)
+        if fail:
+            headers = {"Retry-After": str(srv.retry_after)} if srv.retry_after is not None else None
+            return self._send(srv.fail_status, {"errorTypeCode": "MOCK-FAULT",
+                                                "message": f"Injiceret fejl ({srv.fail_status})."},
+                              headers=headers)
+        if not parts:
+            return self._send(404, {"errorTypeCode": "NOT-FOUND", "message": "Ukendt sti."})
+        if srv.record:
+            return self._proxy(parts, query, body, lang)
+
+        try:
+            if parts[0] == "tableinfo":
+                table = parts[1] if len(parts) > 1 else body.get("table", "")
+                meta = tableinfo(table, lang)
+                if meta is None:
+                    return self._send(400, {"errorTypeCode": "TABLE-NOTFOUND",
+                                            "message": f"Tabellen {table} findes ikke."})
+                return self._send(200, meta)
+            if parts[0] == "tables":
+                ids = body.get("tablesId") or ([t.strip() for t in query["tablesId"].split(",")]
+                                               if "tablesId" in query else None)
+                ids = ids or fixture_tables()
+                return self._send(200, [self._table_entry(t, lang) for t in ids if tableinfo(t, lang)])
+            if parts[0] == "subjects":
+                return self._send(200, [{"id": "00", "description": "Alle tabeller (mockserver)",
+                                         "active": True, "hasSubjects": False, "subjects": [],
+                                         "tables": [{"id": t} for t in fixture_tables()]}])
+            if parts[0] == "data":
+                return self._data(parts, query, body, lang)
+        except RequestError as ex:
+            return self._send(400, {"errorTypeCode": "EXTRACT-NOTVALID", "message": str(ex)})
+        return self._send(404, {"errorTypeCode": "NOT-FOUND", "message": f"Ukendt sti: {url.path}"})
+
+    def _table_entry(self, table, lang):
+        meta = tableinfo(table, lang)
+        return {"id": meta["id"], "text": meta["text"], "unit": meta.get("unit"),
+                "updated": meta.get("updated"), "firstPeriod": meta.get("firstPeriod"),
+                "latestPeriod": meta.get("latestPeriod"), "active": True,
+                "variables": [v["text"] for v in meta["variables"]]}
+
+    def _data(self, parts, query, body, lang):
+        table = (parts[1] if len(parts) > 1 else body.get("table", "")).upper()
+        fmt = (parts[2] if len(parts) > 2 else body.get("format") or query.get("format") or "CSV").upper()
+        variables = body.get("variables") or []
+        rec = _recorded(data_key(table, fmt, lang, variables))
+        if rec is not None:
+            return self._send(rec.get("status", 200), rec["body"], rec.get("content_type", "text/csv; charset=utf-8"))
+
+        meta = tableinfo(table, lang)
+        if meta is None:
+            raise RequestError(f"Tabellen {table} findes ikke.")
+        dims = _dims(meta, variables)
+        cells = math.prod(len(vals) for _, vals in dims)
+        if fmt == "BULK":
+            return self._stream(_csv_lines(dims, bulk=True))
+        if cells > CELL_LIMIT:
+            raise RequestError(f"Udtrækket er for stort ({cells:,} celler); grænsen er {CELL_LIMIT:,}. "
+                               "Brug formatet BULK eller del udtrækket op.")
+        if fmt == "CSV":
+            return self._send(200, "".join(_csv_lines(dims)), "text/csv; charset=utf-8")
+        if fmt in ("JSONSTAT", "JSONSTAT2"):
+            return self._send(200, _jsonstat(meta, dims))
+        raise RequestError(f"Formatet {fmt} understøttes ikke af mockserveren.")
+
+    def _proxy(self, parts, query, body, lang):
+        """Optagelse: send kaldet videre til det rigtige API og gem svaret som fixture."""
+        import urllib.error
+        import urllib.request
+
+        target = f"{self.server.upstream}/{'/'.join(parts)}"
+        if query:
+            from urllib.parse import urlencode
+            target += "?" + urlencode(query)
+        req = urllib.request.Request(target, method=self.command,
+                                     data=json.dumps(body).encode("utf-8") if self.command == "POST" else None,
+                                     headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(req, timeout=120) as r:
+                status, ctype, content = r.status, r.headers.get("Content-Type", ""), r.read()
+        except urllib.error.HTTPError as ex:
+            status, ctype, content = ex.code, ex.headers.get("Content-Type", ""), ex.read()
+        if status == 200 and parts[0] == "tableinfo":
+            meta = json.loads(content)
+            _write_json(os.path.join(FIXTURES_DIR, "tableinfo", f"{meta['id'].upper()}-{lang}.json"), meta)
+        elif status == 200 and parts[0] == "data":
+            table = (parts[1] if len(parts) > 1 else body.get("table", "")).upper()
+            fmt = (parts[2] if len(parts) > 2 else body.get("format", "CSV")).upper()
+            key = data_key(table, fmt, lang, body.get("variables") or [])
+            _write_json(os.path.join(FIXTURES_DIR, "data", f"{key}.json"),
+                        {"request": {"table": table, "format": fmt, "lang": lang,
+                                     "variables": body.get("variables") or []},
+                         "status": status, "content_type": ctype,
+                         "body": content.decode("utf-8-sig", "replace")})
+        return self._send(status, content, ctype or "application/octet-stream")
+
+
+def start(port=0, latency=0.0, record=False, upstream=UPSTREAM, fail_rate=0.0, fail_status=503,
+          retry_after=None, slow_rate=0.0, slow_ms=0.0, seed=0):
+    """
+    Start serveren i en baggrundstråd. Returnerer serveren; server.url er API-roden
+    (fx http://127.0.0.1:8765/v1), server.log er alle modtagne kald, server.shutdown() stopper.
+    Fejlinjektion: andelen fail_rate af kaldene får fail_status (med Retry-After, hvis givet),
+    andelen slow_rate forsinkes slow_ms ekstra. Udvalget er reproducerbart (seed).
+    Attributterne kan ændres, mens serveren kører.
+    """
+    srv = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+    srv.daemon_threads = True
+    srv.latency = latency
+    srv.record = record
+    srv.upstream = upstream.rstrip("/")
+    srv.log = []
+    srv.lock = threading.Lock()
+    srv.fail_rate, srv.fail_status, srv.retry_after = fail_rate, fail_status, retry_after
+    srv.slow_rate, srv.slow_ms = slow_rate, slow_ms
+    srv.faults = random.Random(seed)
+    srv.url = f"http://127.0.0.1:{srv.server_address[1]}/v1"
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Lokal StatBank-stand-in med optagne fixtures.")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency", type=float, default=0.0, help="ekstra svartid pr. kald i ms")
+    ap.add_argument("--record", action="store_true", help="proxy mod det rigtige API og gem svarene")
+    ap.add_argument("--upstream", default=UPSTREAM)
+    ap.add_argument("--fail-rate", type=float, default=0.0, help="andel af kald der fejler (0-1)")
+    ap.add_argument("--fail-status", type=int, default=503, help="status for injicerede fejl (fx 429, 500, 503)")
+    ap.add_argument("--retry-after", type=int, default=None, help="Retry-After (sek.) på injicerede fejl")
+    ap.add_argument("--slow-rate", type=float, default=0.0, help="andel af kald med ekstra svartid (0-1)")
+    ap.add_argument("--slow-ms", type=float, default=2000.0, help="ekstra svartid for de langsomme kald")
+    args = ap.parse_args()
+    srv = start(args.port, latency=args.latency / 1000, record=args.record, upstream=args.upstream,
+                fail_rate=args.fail_rate, fail_status=args.fail_status, retry_after=args.retry_after,
+                slow_rate=args.slow_rate, slow_ms=args.slow_ms)
+    mode = f"optager fra {args.upstream}" if args.record else f"tabeller: {', '.join(fixture_tables())} (+{XL_SUFFIX})"
+    print(f"[mock] {srv.url} – {mode}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        srv.shutdown()
@@ -0,0 +1,168 @@
+# Typede perioder: StatBanks tids-id'er som heltal i sorterede lister
+#
+# Tids-id'er (2024, 2024H1, 2024K1/2024Q1, 2024M01) parses én gang til ordinaler
+# (år * perioder pr. år + delperiode - 1), så perioder kan sammenlignes, slices med binær
+# søgning (bisect, O(log n)), forskydes og omregnes til en lavere frekvens uden strengsammen-
+# ligninger. Grænser i en anden frekvens end indekset fortolkes korrekt: since("2024") i et
+# månedsindeks er 2024M01, until("2024K2") er 2024M06, og since("2024M05") i et kvartalsindeks
+# er 2024K2 (kvartalet, der indeholder maj). Vektoriserede varianter (convert, shift, align)
+# arbejder på NumPy-arrays og importerer først NumPy, når de kaldes.
+import bisect
+import re
+
+PER_YEAR = {"M": 12, "K": 4, "H": 2, "Y": 1}
+_PERIOD = re.compile(r"^(\d{4})(?:([MKQH])(\d{1,2}))?$")
+
+
+def parse(code):
+    """(frekvens, ordinal) for ét tids-id; ValueError for ukendte id'er. Q regnes som K."""
+    m = _PERIOD.match(str(code))
+    if not m:
+        raise ValueError(f"Ukendt periode-id '{code}'.")
+    year, letter, sub = m.groups()
+    freq = {"Q": "K"}.get(letter, letter) or "Y"
+    sub = int(sub) if sub else 1
+    if not 1 <= sub <= PER_YEAR[freq]:
+        raise ValueError(f"Ugyldig delperiode i '{code}'.")
+    return freq, int(year) * PER_YEAR[freq] + sub - 1
+
+
+def frequency(periods):
+    """'M', 'K', 'H' eller 'Y' for en liste af periode-id'er (ValueError ved blandet/ukendt)."""
+    freqs = {parse(p)[0] for p in periods}
+    if len(freqs) != 1:
+        raise ValueError(f"Blandede frekvenser i tidsaksen: {', '.join(sorted(freqs)) or 'ingen'}.")
+    return freqs.pop()
+
+
+def ordinals(periods):
+    """(frekvens, int64-array) for en liste af periode-id'er i én frekvens."""
+    import numpy as np
+
+    freq = frequency(periods)
+    return freq, np.fromiter((parse(p)[1] for p in periods), dtype=np.int64, count=len(periods))
+
+
+def label(freq, ordinal, letter=None):
+    """Tids-id for ordinal i frekvensen freq (letter='Q' giver engelske kvartals-id'er)."""
+    year, sub = divmod(int(ordinal), PER_YEAR[freq])
+    if freq == "Y":
+        return str(year)
+    return f"{year}M{sub + 1:02d}" if freq == "M" else f"{year}{letter or freq}{sub + 1}"
+
+
+def ratio(freq, to):
+    """Antal perioder i freq pr. periode i to (ValueError, hvis to ikke er en lavere frekvens)."""
+    to = {"Q": "K"}.get(to.upper(), to.upper())
+    if PER_YEAR[to] > PER_YEAR[freq] or PER_YEAR[freq] % PER_YEAR[to]:
+        raise ValueError(f"Kan ikke omregne {freq} til {to}.")
+    return PER_YEAR[freq] // PER_YEAR[to]
+
+
+def bounds(code, freq):
+    """(første, sidste) ordinal i frekvensen freq, som perioden code dækker eller ligger i."""
+    f, o = parse(code)
+    if PER_YEAR[f] <= PER_YEAR[freq]:          # grovere eller samme: alle delperioder
+        n = PER_YEAR[freq] // PER_YEAR[f]
+        return o * n, o * n + n - 1
+    n = ratio(f, freq)                          # finere: den periode, der indeholder code
+    return o // n, o // n
+
+
+class PeriodIndex:
+    """
+    Tids-id'er i én frekvens, sorteret kronologisk. freq=None: id'ernes eneste frekvens
+    (ValueError ved blandede); ellers beholdes kun id'erne i den frekvens (fx 'M').
+    """
+
+    def __init__(self, ids, freq=None):
+        parsed = []
+        for code in ids:
+            try:
+                f, o = parse(code)
+            except ValueError:   # fx ugedata eller andre id'er uden for Y/H/K/M
+                continue
+            parsed.append((f, o, str(code)))
+        if freq is None:
+            freqs = {f for f, _, _ in parsed}
+            if len(freqs) > 1:
+                raise ValueError(f"Blandede frekvenser ({', '.join(sorted(freqs))}) – angiv freq.")
+            freq = freqs.pop() if freqs else "Y"
+        self.freq = {"Q": "K"}.get(freq.upper(), freq.upper())
+        if self.freq not in PER_YEAR:
+            raise ValueError(f"Ukendt frekvens '{freq}' (Y, H, K/Q eller M).")
+        kept = sorted((o, code) for f, o, code in parsed if f == self.freq)
+        self.ordinals = [o for o, _ in kept]
+        self.ids = [code for _, code in kept]
+        self.letter = "Q" if any("Q" in c for c in self.ids) else None
+        self._pos = {code: i for i, code in enumerate(self.ids)}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __contains__(self, code):
+        return str(code) in self._pos
+
+    def __repr__(self):
+        span = f"{self.ids[0]}..{self.ids[-1]}" if self.ids else "tom"
+        return f"PeriodIndex({self.freq}: {span}, {len(self)} perioder)"
+
+    # --- udsnit (binær søgning) -----------------------------------------------------
+    def _range(self, start=None, end=None):
+        lo = 0 if start is None else bisect.bisect_left(self.ordinals, bounds(start, self.freq)[0])
+        hi = len(self.ordinals) if end is None else bisect.bisect_right(self.ordinals, bounds(end, self.freq)[1])
+        return lo, max(lo, hi)
+
+    def slice(self, start=None, end=None):
+        """Id'erne fra og med start til og med end (begge valgfri, i vilkårlig frekvens)."""
+        lo, hi = self._range(start, end)
+        return self.ids[lo:hi]
+
+    def since(self, start):
+        return self.slice(start, None)
+
+    def until(self, end):
+        return self.slice(None, end)
+
+    def last(self, n=1):
+        return self.ids[-n:] if n > 0 else []
+
+    def position(self, code):
+        """Position for code i den kronologiske rækkefølge (KeyError, hvis den mangler)."""
+        return self._pos[str(code)]
+
+    # --- vektoriseret aritmetik -----------------------------------------------------
+    def array(self):
+        import numpy as np
+
+        return np.asarray(self.ordinals, dtype=np.int64)
+
+    def labels(self, ordinals, freq=None):
+        freq = freq or self.freq
+        letter = self.letter if freq == "K" else None
+        return [label(freq, o, letter) for o in ordinals]
+
+    def shift(self, n):
+        """Id'erne forskudt n perioder (fx -12 for samme måned året før i et månedsindeks)."""
+        return self.labels(self.array() + int(n))
+
+    def convert(self, to):
+        """Ordinal i frekvensen to (Y, H, K/Q) for hver periode – grundlaget for aggregering."""
+        return self.array() // ratio(self.freq, to)
+
+    def align(self, other):
+        """
+        Position i other (samme eller lavere frekvens) for hver periode i dette indeks; -1,
+        hvor other ikke har perioden. Fx månedsværdier parret med kvartalstal fra en anden tabel.
+        """
+        import numpy as np
+
+        target = self.convert(other.freq)
+        theirs = other.array()
+        pos = np.searchsorted(theirs, target)
+        found = pos < len(theirs)
+        found[found] = theirs[pos[found]] == target[found]
+        return np.where(found, pos, -1)
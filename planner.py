@@ -0,0 +1,123 @@
+# Opdeling af store udvælgelser, så hvert kald holder sig under StatBanks cellegrænse
+#
+# Antal celler estimeres fra metadataens værdiantal (produktet af antal valgte værdier pr.
+# variabel, '*' = alle). Er udvælgelsen for stor, deles den langs tidsaksen (ellers den største
+# variabel), bidderne hentes samtidigt, og resultatet flettes til ét DataFrame i metadataens
+# rækkefølge.
+import os
+
+from metaindex import meta_index
+from spans import span
+
+CELL_LIMIT = int(os.environ.get("DST_CELL_LIMIT", 1_000_000))   # StatBanks grænse for ikke-streamede formater
+CONCURRENCY = int(os.environ.get("DST_CHUNK_CONCURRENCY", 4))
+
+
+def _values(meta, var):
+    vals = list(var["values"])
+    if "*" in vals and meta.var(var["code"]) is not None:
+        return meta.ids(var["code"])
+    return vals
+
+
+def estimate_cells(meta, variables):
+    """Antal celler et kald med `variables` giver (udeladte variabler elimineres og tæller 1)."""
+    n = 1
+    for var in variables:
+        n *= max(1, len(_values(meta, var)))
+    return n
+
+
+def plan(meta, variables, cell_limit=None):
+    """
+    Liste af udvælgelser (hver en payload-variabelliste) der tilsammen dækker `variables`,
+    og som hver holder sig under cell_limit celler.
+    """
+    cell_limit = CELL_LIMIT if cell_limit is None else cell_limit
+    variables = [dict(v, values=_values(meta, v)) for v in variables]
+    cells = estimate_cells(meta, variables)
+    if cells <= cell_limit:
+        return [variables]
+
+    splittable = [i for i, v in enumerate(variables) if len(v["values"]) > 1]
+    if not splittable:
+        return [variables]   # kan ikke deles mere – lad StatBank afgøre det
+    time_var = (meta.time_var or "").upper()
+    axis = next((i for i in splittable if str(variables[i]["code"]).upper() == time_var),
+                max(splittable, key=lambda i: len(variables[i]["values"])))
+
+    values = variables[axis]["values"]
+    per_value = cells // len(values)
+    size = max(1, cell_limit // max(1, per_value))
+    chunks = []
+    for start in range(0, len(values), size):
+        part = [dict(v) for v in variables]
+        part[axis] = dict(variables[axis], values=values[start:start + size])
+        chunks.extend(plan(meta, part, cell_limit))
+    return chunks
+
+
+def _order(meta, df):
+    """Sortér rækkerne efter metadataens værdirækkefølge for hver label-kolonne/-niveau."""
+    import numpy as np
+    import pandas as pd
+
+    keys = {}
+    for var in meta.variables:
+        pos = {}
+        for i, (id_, text) in enumerate(zip(meta.ids(var), meta.texts(var))):
+            pos.setdefault(id_, i)
+            pos.setdefault(text, i)
+        keys[var.upper()] = pos
+
+    cols = []
+    if isinstance(df.index, pd.RangeIndex):
+        for c in df.columns[:-1]:
+            pos = keys.get(str(c).upper())
+            if pos is not None:
+                cols.append(df[c].astype(str).map(pos).to_numpy())
+    else:
+        for i, name in enumerate(df.index.names):
+            pos = keys.get(str(name).upper())
+            if pos is not None:
+                cols.append(df.index.get_level_values(i).astype(str).map(pos).to_numpy())
+    if not cols:
+        return df
+    order = np.lexsort([np.nan_to_num(c.astype(float), nan=np.inf) for c in reversed(cols)])
+    return df.iloc[order]
+
+
+def fetch_planned(table, variables, fetch, lang="da", cell_limit=None, concurrency=None):
+    """
+    fetch(variables) -> DataFrame, men delt op efter plan(...) og udført samtidigt,
+    når udvælgelsen overstiger cellegrænsen. Returnerer ét samlet DataFrame.
+    """
+    meta = meta_index(table, lang=lang)
+    with span("plan", table=table.upper()) as sp:
+        chunks = plan(meta, variables, cell_limit)
+        sp["cells"] = estimate_cells(meta, variables)
+        sp["chunks"] = len(chunks)
+    if len(chunks) == 1:
+        return fetch(variables)
+
+    print(f"[planner] {table}: ~{estimate_cells(meta, variables):,} celler delt i {len(chunks)} kald")
+
+    # først her: asyncio og pandas er ikke gratis at importere for små udtræk
+    import asyncio
+
+    import pandas as pd
+    from statbank_async import AsyncStatBankClient
+
+    async def _main():
+        sb = AsyncStatBankClient(lang=lang, concurrency=concurrency or CONCURRENCY)
+        return await sb.gather(*(sb.run(fetch, c) for c in chunks))
+
+    frames = asyncio.run(_main())
+    if any(f is None for f in frames):
+        raise RuntimeError(f"Et eller flere delkald til {table} returnerede ingen data.")
+    first = frames[0]
+    frames = [first] + [f.set_axis(first.columns, axis=1) if len(f.columns) == len(first.columns) else f
+                        for f in frames[1:]]
+    df = pd.concat(frames)
+    df = _order(meta, df)
+    return df.reset_index(drop=True) if isinstance(first.index, pd.RangeIndex) else df
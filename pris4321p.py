@@ -1,149 +1,89 @@
-# pip install --upgrade denstatbank pandas
-from denstatbank import StatBankClient
-import pandas as pd
-import re
+# pip install requests pandas
+from lite import fetch_selection
+from sinks import emit
+from selection import resolve
+from spans import span, traced
+from statbank import data_jsonstat
 import warnings
 warnings.filterwarnings("ignore")
 
 TABLE_ID  = "PRIS4321"
 UNIT_MODE = "pct"   # vælg "pct" for år-til-år ændring i %, eller "indeks" for selve indeksværdien
 
-sbc = StatBankClient(lang='da')
-
-# 1) Metadata
-meta = sbc.tableinfo(TABLE_ID, variables_df=True).copy()
-if meta is None or meta.empty:
-    raise RuntimeError(f"Kunne ikke hente metadata for {TABLE_ID}.")
-
-meta['variable_u'] = meta['variable'].str.upper()
-meta['text'] = meta['text'].fillna("")
-
-def first_eq_or_contains(candidates):
-    """Find faktisk variabelnavn i meta for første kandidat (først exact, så contains)."""
-    u = meta['variable_u']
-    for c in candidates:
-        hits = u[u == c.upper()]
-        if not hits.empty:
-            return meta.loc[hits.index[0], 'variable']
-    for c in candidates:
-        hits = u[u.str.contains(re.escape(c), case=False)]
-        if not hits.empty:
-            return meta.loc[hits.index[0], 'variable']
-    return None
-
-def infer_time_variable():
-    cand = meta[meta['id'].str.match(r'^\d{4}M\d{2}$', na=False)]
-    if not cand.empty:
-        return cand['variable'].value_counts().idxmax()
-    return first_eq_or_contains(["TID","TIME"])
-
-def infer_market_variable():
-    rx = re.compile(r"\b(hjemmemarked|eksport|import|samlet|total)\b", re.I)
-    cand = meta.groupby('variable').filter(lambda df: df['text'].str.contains(rx).any())
-    if not cand.empty:
-        counts = cand.groupby('variable')['text'].apply(lambda s: s.str.contains(rx).sum())
-        return counts.sort_values(ascending=False).index[0]
-    return first_eq_or_contains(["MARKED","MARKET"])
-
-def infer_unit_variable():
+# Udvælgelse (kompileres mod metadata og caches, så længe metadata er uændret).
+# Variabler findes som den variabel med flest matchende værdier, ellers via navnet.
+SELECTION = {
+    "tid": {"time": True, "var": [["best_id", r"^\d{4}M\d{2}$"], ["name", ["TID", "TIME"]]]},
     # både indeks og pct.-tekster ligger under samme variabel
-    rx = re.compile(r"\bindeks\b|^100$|pct|\bpercent|\bpercentage|\bchange|\bændring", re.I)
-    cand = meta.groupby('variable').filter(lambda df: df['text'].str.contains(rx).any())
-    if not cand.empty:
-        counts = cand.groupby('variable')['text'].apply(lambda s: s.str.contains(rx).sum())
-        return counts.sort_values(ascending=False).index[0]
-    return first_eq_or_contains(["ENHED","UNIT"])
-
-def infer_industry_groups_variable():
-    rx_bcde = re.compile(r"^BCDE\b", re.I)
-    cand_bcde = meta[meta['text'].str.contains(rx_bcde)]
-    if not cand_bcde.empty:
-        return cand_bcde['variable'].value_counts().idxmax()
-    return first_eq_or_contains(["BRANCHEHOVEDGRUPPER","INDUSTRY (GROUPS)","INDUSTRY","BRANCHE"])
-
-# 2) Robust identifikation af variabler
-VN_TID   = infer_time_variable()
-VN_MARK  = infer_market_variable()
-VN_ENHED = infer_unit_variable()
-VN_BHG   = infer_industry_groups_variable()
-
-missing = [name for name in [("TID",VN_TID),("MARKED",VN_MARK),("ENHED",VN_ENHED),("BRANCHEHOVEDGRUPPER",VN_BHG)] if name[1] is None]
-if missing:
-    print("Tilgængelige variabler i metadata:", sorted(meta['variable'].unique()))
-    raise RuntimeError(f"Kunne ikke identificere disse variabler: {', '.join([m[0] for m in missing])}")
-
-# 3) Tidsfilter fra 2024M01
-all_times = meta.loc[meta['variable'] == VN_TID, 'id'].tolist()
-times_from_2024 = [t for t in all_times if re.match(r'^\d{4}M\d{2}$', t) and t >= '2024M01']
-if not times_from_2024:
-    raise RuntimeError("Ingen måneds-koder >= 2024M01 i tabellen.")
-
-## 4) ENHED efter UNIT_MODE
-if UNIT_MODE.lower() == "pct":
-    # Præcist dansk match (uden regex=)
-    exact = meta[
-        (meta['variable'] == VN_ENHED) &
-        (meta['text'].str.fullmatch(r"\s*Ændring i forhold til samme måned året før\s*\(pct\.\)\s*", case=False))
-    ]
-    if not exact.empty:
-        enhed_row = exact
-    else:
-        # Fallback: robust regex (dansk/engelsk nøgleord)
-        enhed_row = meta[
-            (meta['variable'] == VN_ENHED) &
-            (
-                meta['text'].str.contains(r"ændring\s*i\s*forhold\s*til\s*samme\s*måned\s*året\s*før.*pct", case=False, regex=True) |
-                meta['text'].str.contains(r"(y\s*/\s*y|yoy|change\s*.*same\s*month.*previous\s*year)", case=False, regex=True)
-            )
+    "enhed": {
+        "var": [["best", r"\bindeks\b|^100$|pct|\bpercent|\bpercentage|\bchange|\bændring"],
+                ["name", ["ENHED", "UNIT"]]],
+        "value": [
+            # Præcist dansk match
+            ["text", r"^\s*Ændring i forhold til samme måned året før\s*\(pct\.\)\s*$"],
+            # Fallback: robust regex (dansk/engelsk nøgleord)
+            ["text", r"ændring\s*i\s*forhold\s*til\s*samme\s*måned\s*året\s*før.*pct",
+                     r"(y\s*/\s*y|yoy|change\s*.*same\s*month.*previous\s*year)"],
+        ] if UNIT_MODE.lower() == "pct" else [
+            ["text", r"\bindeks\b"], ["first"],
+        ],
+        "error": "Kunne ikke finde enhed 'Ændring i forhold til samme måned året før (pct.)'.",
+    },
+    # Marked = 'Samlet' (eller 'Total' som alternativ)
+    "marked": {
+        "var": [["best", r"\b(hjemmemarked|eksport|import|samlet|total)\b"], ["name", ["MARKED", "MARKET"]]],
+        "value": [["text", r"\bsamlet\b|\btotal\b"], ["first"]],
+    },
+    # Branche = 'BCDE …'
+    "branche": {
+        "var": [["best", r"^BCDE\b"],
+                ["name", ["BRANCHEHOVEDGRUPPER", "INDUSTRY (GROUPS)", "INDUSTRY", "BRANCHE"]]],
+        "value": [["id_or_text", r"^BCDE$", r"^BCDE\b"]],
+        "error": "Kunne ikke finde branchegruppen 'BCDE'.",
+    },
+}
+
+@traced(TABLE_ID)
+def fetch_pris4321p_from_2024(lang="da"):
+    with span("resolve"):
+        # 1) Metadata + udvælgelse (heuristikkerne køres kun, når metadata er ændret)
+        meta, sel = resolve(TABLE_ID, SELECTION, lang=lang)
+        VN_TID = sel["time_var"]
+        VN_ENHED, enhed_id = sel["roles"]["enhed"]["var"], sel["roles"]["enhed"]["id"]
+        VN_MARK, marked_id = sel["roles"]["marked"]["var"], sel["roles"]["marked"]["id"]
+        VN_BHG, bcde_id = sel["roles"]["branche"]["var"], sel["roles"]["branche"]["id"]
+
+        # 2) Tidsfilter fra 2024M01
+        times_from_2024 = meta.periods(VN_TID, "M").since('2024M01')
+        if not times_from_2024:
+            raise RuntimeError("Ingen måneds-koder >= 2024M01 i tabellen.")
+
+    with span("payload"):
+        variables = [
+            {'code': VN_ENHED,  'values': [enhed_id]},
+            {'code': VN_MARK,   'values': [marked_id]},
+            {'code': VN_BHG,    'values': [bcde_id]},
+            {'code': VN_TID,    'values': times_from_2024},
         ]
-    if enhed_row.empty:
-        raise RuntimeError("Kunne ikke finde enhed 'Ændring i forhold til samme måned året før (pct.)'.")
-    enhed_id = enhed_row['id'].iloc[0]
-
-# 5) Marked = 'Samlet' (eller 'Total' som alternativ)
-mark_row = meta[
-    (meta['variable'] == VN_MARK) &
-    (meta['text'].str.contains(r"\bsamlet\b|\btotal\b", case=False, regex=True))
-]
-marked_id = mark_row['id'].iloc[0] if not mark_row.empty else meta[meta['variable']==VN_MARK]['id'].iloc[0]
-
-# 6) Branche = 'BCDE …'
-bcde_row = meta[
-    (meta['variable'] == VN_BHG) &
-    (meta['id'].str.fullmatch(r"BCDE", case=False) | meta['text'].str.contains(r"^BCDE\b", case=False, regex=True))
-]
-if bcde_row.empty:
-    raise RuntimeError("Kunne ikke finde branchegruppen 'BCDE'.")
-bcde_id = bcde_row['id'].iloc[0]
-
-# 7) Hent data
-variables = [
-    sbc.variable_dict(VN_ENHED,  [enhed_id]),
-    sbc.variable_dict(VN_MARK,   [marked_id]),
-    sbc.variable_dict(VN_BHG,    [bcde_id]),
-    sbc.variable_dict(VN_TID,    times_from_2024),
-]
-df = sbc.data(TABLE_ID, variables=variables)
-if df is None or df.empty:
-    raise RuntimeError("Ingen data returneret – tjek udvalg eller variabler.")
-
-# 8) Udskriv valg + serie
-def label_for(varname, id_):
-    r = meta[(meta['variable']==varname) & (meta['id']==id_)]
-    return r['text'].iloc[0] if not r.empty else id_
-
-print(f"Tabel: {TABLE_ID}")
-print("Valgte variabler:")
-print(f"  {VN_ENHED}: {enhed_id} ({label_for(VN_ENHED, enhed_id)})")
-print(f"  {VN_MARK}: {marked_id} ({label_for(VN_MARK, marked_id)})")
-print(f"  {VN_BHG}: {bcde_id} ({label_for(VN_BHG, bcde_id)})")
-print("  TID: fra 2024M01 til seneste")
 
-serie = df.iloc[:, 0]
-for tid, value in serie.items():
-    # pct. bør udskrives som tal med komma, ikke tusindtalsseparatorer
-    try:
-        val = float(value)
-        print(f"{tid}: {val:.2f}")
-    except Exception:
-        print(f"{tid}: {value}")
+    # 3) Hent data
+    df = fetch_selection(TABLE_ID, variables, VN_TID,
+                         lambda v: data_jsonstat(TABLE_ID, v, lang=lang), lang=lang)
+    if df is None or df.empty:
+        raise RuntimeError("Ingen data returneret – tjek udvalg eller variabler.")
+
+    with span("output"):
+        # 4) Udskriv valg + serie
+        print(f"Tabel: {TABLE_ID}")
+        print("Valgte variabler:")
+        print(f"  {VN_ENHED}: {enhed_id} ({meta.label(VN_ENHED, enhed_id)})")
+        print(f"  {VN_MARK}: {marked_id} ({meta.label(VN_MARK, marked_id)})")
+        print(f"  {VN_BHG}: {bcde_id} ({meta.label(VN_BHG, bcde_id)})")
+        print("  TID: fra 2024M01 til seneste")
+
+        # pct. udskrives med decimalkomma og to decimaler
+        emit(df, "PRIS4321P", decimals=2)   # filnavn pr. script (begge bruger PRIS4321)
+    return df
+
+if __name__ == "__main__":
+    fetch_pris4321p_from_2024(lang="da")
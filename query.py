@@ -0,0 +1,317 @@
+# Lazy forespørgsler: Table(...).where(...).since(...).select(...) -> plan -> collect()
+#
+# I stedet for at samle payload-lister i hånden beskrives udtrækket som en kæde af kald, der
+# ikke henter noget, før collect() (eller cube()) kaldes:
+#
+#   q = Table("PRIS4321").where(marked="samlet", enhed="yoy", branche="BCDE").since("2024M01")
+#   print(q.explain())          # variabler, værdier, elimination, celler og antal kald
+#   df = q.collect()
+#
+# Hele udvælgelsen skubbes ned i StatBank-payloaden, så der kun hentes de celler, der skal bruges:
+#   where(var=værdi)   filter pr. variabel. Værdien er et id, en præcis tekst, et regex over
+#                      teksterne (alle matchende værdier) eller et alias som 'yoy'/'total';
+#                      en liste giver flere værdier, '*' alle. Variablen findes ud fra id,
+#                      tekst eller et engelsk navn (unit, market, sector, ...).
+#   since/until/last   tidsfilter via periods.PeriodIndex (grænser i vilkårlig frekvens).
+#   select(var, ...)   projektion: kun disse variabler (+ filtrerede og tid) kommer med som
+#                      kolonner; øvrige udelades af payloaden og elimineres af StatBank (summeres
+#                      til 'i alt'). Variabler, der ikke kan elimineres, skal med i select/where.
+# Uden select() hentes alle værdier af ufiltrerede variabler ('*').
+#
+# Planen (payload, tidsvariabel, celleestimat, antal kald efter planner.py) er en almindelig dict,
+# der gemmes under DST_CACHE_DIR/query/ pr. forespørgsel og genbruges, så længe tabellens
+# 'updated' er uændret. collect() går den almindelige vej (lite.fetch_selection: datacache,
+# inkrementel hentning, cellegrænse, lager og årgange); cube() henter til en cube.Cube.
+#
+#   python3 query.py PRIS4321 marked=samlet enhed=yoy branche=BCDE --since 2024M01 --explain
+import json
+import os
+import re
+
+import statbank
+from metaindex import meta_index
+from selection import _hash
+
+# engelske (og korte) navne -> kandidater til variabel-id'er (delstreng, som MetaIndex.find_var)
+VAR_ALIASES = {
+    "unit": ["ENHED"], "market": ["MARKED"], "sector": ["SEKTOR"], "industry": ["BRANCHE"],
+    "area": ["OMRÅDE"], "region": ["OMRÅDE"], "sex": ["KØN"], "age": ["ALDER"],
+    "group": ["VAREGR", "GRUPPE"], "indicator": ["INDIKATOR"],
+}
+# korte navne for typiske værditekster (regex, uden hensyn til case)
+VALUE_ALIASES = {
+    "yoy": r"samme (måned|kvartal|periode) året før|same (month|quarter|period).*(previous|last) year",
+    "mom": r"måneden før|previous month",
+    "qoq": r"kvartalet før|previous quarter",
+    "index": r"^\s*ind(eks|ex)\b",
+    "total": r"\bi alt\b|\btotal\b|\bsamlet\b|\balle\b",
+}
+
+_plans = {}
+
+
+def _var(meta, name):
+    """Variabel-id for name: id, engelsk alias, delstreng af id eller variabeltekst; ellers ValueError."""
+    key = str(name)
+    if key.lower() == "time" and meta.time_var:
+        return meta.time_var
+    code = meta.var(key) or meta.find_var([key] + VAR_ALIASES.get(key.lower(), []))
+    if code is None:
+        code = next((v for v in meta.variables if key.lower() in meta.var_text[v].lower()), None)
+    if code is None:
+        raise ValueError(f"{meta.table} har ingen variabel '{name}'. "
+                         f"Tilgængelige variabler: {', '.join(meta.variables)}")
+    return code
+
+
+def _values(meta, var, wanted):
+    """Værdi-id'er (metadataens rækkefølge) for filteret; ['*'] for alle. ValueError uden match."""
+    ids = meta.ids(var)
+    by_id = {i.lower(): i for i in ids}
+    by_text = {t: i for i, t in zip(ids, meta.lower_texts(var))}
+    hits = set()
+    for w in wanted:
+        w = str(w)
+        if w == "*":
+            return ["*"]
+        hit = by_id.get(w.lower()) or by_text.get(w.strip().lower())
+        if hit is not None:
+            hits.add(hit)
+            continue
+        try:
+            found = meta.search(var, VALUE_ALIASES.get(w.lower(), w))
+        except re.error:
+            found = []
+        if not found:
+            raise ValueError(f"Ingen værdi under {var} matcher '{w}' "
+                             f"(fx {', '.join(ids[:5])}{' …' if len(ids) > 5 else ''}).")
+        hits.update(found)
+    return [i for i in ids if i in hits]
+
+
+def _time(meta, var, base, time):
+    """Tids-id'er efter since/until/last (kronologisk); base = filtrerede id'er eller None."""
+    if not time and base is None:
+        return meta.ids(var)
+    if base is None:
+        index = meta.periods(var, time.get("freq"))
+    else:
+        from periods import PeriodIndex
+
+        index = PeriodIndex(base, time.get("freq"))
+    ids = index.slice(time.get("start"), time.get("end"))
+    if time.get("last") is not None:
+        ids = ids[-time["last"]:] if time["last"] > 0 else []
+    return ids
+
+
+def compile_plan(meta, spec):
+    """
+    Omsæt en forespørgsel (Table.spec()) til en plan mod metadata (MetaIndex): {"variables"
+    (payload i metadataens rækkefølge), "time_var", "eliminated", "cells", "calls", ...}.
+    """
+    import planner
+
+    time_var = meta.time_var
+    filters = {}
+    for name, wanted in spec["where"]:
+        var = _var(meta, name)
+        if var in filters:
+            raise ValueError(f"{var} er filtreret to gange (via '{name}').")
+        filters[var] = _values(meta, var, wanted)
+    selected = None if spec["select"] is None else {_var(meta, n) for n in spec["select"]}
+
+    nonelim = {v["id"] for v in statbank.tableinfo(meta.table, lang=spec["lang"])["variables"]
+               if not v.get("elimination", True)}
+    variables, eliminated = [], []
+    for var in meta.variables:
+        if var == time_var:
+            base = None if filters.get(var) in (None, ["*"]) else filters[var]
+            values = _time(meta, var, base, spec["time"])
+            if not values:
+                raise ValueError(f"Ingen perioder i {meta.table} matcher tidsfilteret.")
+        elif var in filters:
+            values = filters[var]
+        elif selected is None or var in selected:
+            values = ["*"]
+        elif var in nonelim:
+            raise ValueError(f"{meta.table}: variablen {var} kan ikke elimineres – "
+                             f"tag den med i select() eller filtrér den med where().")
+        else:
+            eliminated.append(var)
+            continue
+        variables.append({"code": var, "values": values})
+    return {
+        "table": meta.table, "lang": spec["lang"], "updated": meta.updated, "time_var": time_var,
+        "variables": variables, "eliminated": eliminated,
+        "cells": planner.estimate_cells(meta, variables),
+        "calls": len(planner.plan(meta, variables)),
+    }
+
+
+def _cache_path(table, lang, spec_hash):
+    d = os.path.join(statbank.CACHE_DIR, "query")
+    os.makedirs(d, exist_ok=True)
+    return os.path.join(d, f"{table}-{lang}-{spec_hash}.json")
+
+
+class Table:
+    """
+    Lazy forespørgsel mod én tabel. Hvert kald returnerer en ny Table; intet hentes, før
+    plan(), explain(), collect() eller cube() kaldes.
+    """
+
+    def __init__(self, table, lang="da"):
+        self.table = table.upper()
+        self.lang = lang
+        self._where = ()
+        self._time = {}
+        self._select = None
+
+    def _copy(self, **changes):
+        new = Table(self.table, self.lang)
+        new._where, new._time, new._select = self._where, dict(self._time), self._select
+        for name, value in changes.items():
+            setattr(new, name, value)
+        return new
+
+    # --- opbygning ------------------------------------------------------------------
+    def where(self, filters=None, **kw):
+        """Filtre pr. variabel: where(enhed="yoy", marked=["IMP", "EKS"]) eller where({"SEKTOR": "1000"})."""
+        items = list((filters or {}).items()) + list(kw.items())
+        added = tuple((str(k), tuple(v) if isinstance(v, (list, tuple, set)) else (v,)) for k, v in items)
+        return self._copy(_where=self._where + added)
+
+    def since(self, start):
+        return self._copy(_time=dict(self._time, start=str(start)))
+
+    def until(self, end):
+        return self._copy(_time=dict(self._time, end=str(end)))
+
+    def between(self, start, end):
+        return self._copy(_time=dict(self._time, start=str(start), end=str(end)))
+
+    def last(self, n):
+        """De seneste n perioder (efter since/until)."""
+        return self._copy(_time=dict(self._time, last=int(n)))
+
+    def freq(self, freq):
+        """Kun perioder i frekvensen freq (Y, H, K/Q, M) – for tabeller med blandede tids-id'er."""
+        return self._copy(_time=dict(self._time, freq=freq))
+
+    def select(self, *names):
+        """Variabler, der skal med som kolonner; øvrige ufiltrerede variabler elimineres."""
+        return self._copy(_select=tuple(map(str, names)))
+
+    def spec(self):
+        """Forespørgslen som JSON-venlig dict (grundlag for plan-cachens nøgle)."""
+        return {"table": self.table, "lang": self.lang,
+                "where": [[k, [str(x) for x in v]] for k, v in self._where],
+                "time": self._time, "select": None if self._select is None else list(self._select)}
+
+    def __repr__(self):
+        parts = [f"Table({self.table!r})"]
+        if self._where:
+            parts.append("where(" + ", ".join(f"{k}={list(v) if len(v) > 1 else v[0]!r}"
+                                              for k, v in self._where) + ")")
+        names = {"start": "since", "end": "until"}
+        parts += [f"{names.get(k, k)}({v!r})" for k, v in self._time.items()]
+        if self._select is not None:
+            parts.append(f"select({', '.join(map(repr, self._select))})")
+        return ".".join(parts)
+
+    # --- plan -----------------------------------------------------------------------
+    def plan(self):
+        """
+        Planen for forespørgslen (se compile_plan) – fra hukommelsen eller DST_CACHE_DIR/query/,
+        så længe tabellens 'updated' er uændret; ellers kompileres den igen mod metadata.
+        """
+        spec = self.spec()
+        spec_hash = _hash(spec)
+        meta = meta_index(self.table, lang=self.lang)
+        key = (self.table, self.lang, spec_hash)
+        hit = _plans.get(key)
+        if hit is not None and hit["updated"] == meta.updated:
+            return hit
+
+        path = _cache_path(self.table, self.lang, spec_hash)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as fh:
+                cached = json.load(fh)
+            if cached.get("updated") == meta.updated:
+                _plans[key] = cached
+                return cached
+
+        plan = compile_plan(meta, spec)
+        _plans[key] = plan
+        statbank._write_json_atomic(path, plan)
+        return plan
+
+    def payload(self):
+        return self.plan()["variables"]
+
+    def explain(self):
+        """Planen som tekst: én linje pr. variabel (antal værdier og de første id'er)."""
+        plan = self.plan()
+        lines = [f"{self!r}", f"  tabel {plan['table']} ({plan['lang']}, updated {plan['updated']})"]
+        for v in plan["variables"]:
+            vals = v["values"]
+            shown = "alle (*)" if vals == ["*"] else (
+                ", ".join(vals) if len(vals) <= 4 else f"{vals[0]} … {vals[-1]} ({len(vals)})")
+            lines.append(f"  {v['code']:<20} {shown}{'  [tid]' if v['code'] == plan['time_var'] else ''}")
+        for var in plan["eliminated"]:
+            lines.append(f"  {var:<20} elimineres")
+        lines.append(f"  ~{plan['cells']:,} celler i {plan['calls']} kald".replace(",", "."))
+        return "\n".join(lines)
+
+    # --- udførelse ------------------------------------------------------------------
+    def collect(self):
+        """Hent planen: DataFrame (CSV-kolonner) eller lite.Rows i let tilstand."""
+        from lite import fetch_selection
+
+        plan = self.plan()
+        return fetch_selection(
+            self.table, plan["variables"], plan["time_var"],
+            lambda v: statbank.data_frame(self.table, v, lang=self.lang), lang=self.lang,
+        )
+
+    def cube(self, fmt=None):
+        """Hent planen til en cube.Cube (én akse pr. variabel i payloaden)."""
+        from cube import fetch_cube
+
+        return fetch_cube(self.table, self.plan()["variables"], lang=self.lang, fmt=fmt)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from sinks import emit
+
+    ap = argparse.ArgumentParser(description="Lazy forespørgsel: filtre og projektion skubbes ned i payloaden.")
+    ap.add_argument("table")
+    ap.add_argument("filters", nargs="*", help="var=værdi[,værdi...] (id, tekst, regex eller alias)")
+    ap.add_argument("--since")
+    ap.add_argument("--until")
+    ap.add_argument("--last", type=int)
+    ap.add_argument("--select", nargs="+", help="variabler der skal med; øvrige elimineres")
+    ap.add_argument("--explain", action="store_true", help="vis kun planen")
+    ap.add_argument("--lang", default="da")
+    args = ap.parse_args()
+
+    q = Table(args.table, lang=args.lang)
+    for f in args.filters:
+        name, sep, value = f.partition("=")
+        if not sep:
+            ap.error(f"Filter uden '=': {f}")
+        q = q.where({name: value.split(",")})
+    if args.since:
+        q = q.since(args.since)
+    if args.until:
+        q = q.until(args.until)
+    if args.last is not None:
+        q = q.last(args.last)
+    if args.select:
+        q = q.select(*args.select)
+    print(q.explain())
+    if not args.explain:
+        emit(q.collect(), q.table, view="table")
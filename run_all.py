@@ -0,0 +1,141 @@
+# Kør flere/alle tabeller i én proces med én fælles HTTP-session
+#   python3 run_all.py                     # alle tabeller, én ad gangen
+#   python3 run_all.py folk1am pris111     # kun udvalgte
+#   python3 run_all.py --jobs 4            # op til 4 tabeller samtidigt
+#   python3 run_all.py --lite              # små udtræk uden pandas/requests (se lite.py)
+import argparse
+import asyncio
+import importlib
+import io
+import sys
+import threading
+import time
+import traceback
+
+import incremental
+import scheduler
+import statbank
+from statbank_async import AsyncStatBankClient
+
+# navn -> (modul, funktion)
+TABLES = {
+    "folk1am":   ("folk1am",   "fetch_folk1am_from_2024"),
+    "forv1":     ("forv1",     "fetch_forv1_from_2024"),
+    "pris4321p": ("pris4321p", "fetch_pris4321p_from_2024"),
+    "pris4321i": ("pris4321i", "fetch_pris4321i_from_2024"),
+    "pris111":   ("pris111",   "fetch_pris111_from_2024"),
+    "sblon1":    ("sblon1",    "fetch_sblon1_yoy_pct_from_2024"),
+    "lbesk04":   ("lbesk04",   "fetch_lbesk04_from_2024"),
+}
+
+class _PerThreadStdout(io.TextIOBase):
+    """sys.stdout der skriver til en buffer pr. tråd (når sat), så samtidige tabeller ikke blandes."""
+
+    def __init__(self, fallback):
+        self._fallback = fallback
+        self._local = threading.local()
+
+    def capture(self, buf):
+        self._local.buf = buf
+
+    def write(self, s):
+        return (getattr(self._local, "buf", None) or self._fallback).write(s)
+
+    def flush(self):
+        self._fallback.flush()
+
+def _check_names(names):
+    names = list(names) if names else list(TABLES)
+    unknown = [n for n in names if n.lower() not in TABLES]
+    if unknown:
+        raise ValueError(f"Ukendte tabeller: {', '.join(unknown)} (vælg blandt {', '.join(TABLES)})")
+    return names
+
+def _run_one(name, lang):
+    module_name, func_name = TABLES[name.lower()]
+    t0 = time.perf_counter()
+    try:
+        func = getattr(importlib.import_module(module_name), func_name)
+        df = func(lang=lang)
+        rows = len(df) if df is not None else 0
+        return {"table": name, "ok": True, "rows": rows,
+                "seconds": time.perf_counter() - t0, "error": None}
+    except Exception as ex:
+        traceback.print_exc(file=sys.stdout)
+        return {"table": name, "ok": False, "rows": 0,
+                "seconds": time.perf_counter() - t0, "error": f"{type(ex).__name__}: {ex}"}
+
+def run_tables(names=None, lang="da"):
+    """Kør de valgte tabeller sekventielt; én fejl stopper ikke de øvrige."""
+    results = []
+    for name in _check_names(names):
+        print(f"\n===== {name} =====")
+        results.append(_run_one(name, lang))
+    return results
+
+def run_tables_concurrently(names=None, lang="da", jobs=4):
+    """
+    Kør de valgte tabeller samtidigt (højst `jobs` ad gangen), så metadata- og
+    datakald for forskellige tabeller overlapper. Output pr. tabel samles og
+    udskrives samlet, når tabellen er færdig.
+    """
+    names = _check_names(names)
+    stdout = _PerThreadStdout(sys.stdout)
+
+    def _captured(name):
+        buf = io.StringIO()
+        stdout.capture(buf)
+        try:
+            return _run_one(name, lang), buf.getvalue()
+        finally:
+            stdout.capture(None)
+
+    async def _main():
+        sb = AsyncStatBankClient(lang=lang, concurrency=jobs)
+        results = []
+        for fut in asyncio.as_completed([sb.run(_captured, n) for n in names]):
+            result, text = await fut
+            stdout._fallback.write(f"\n===== {result['table']} =====\n{text}")
+            results.append(result)
+        order = {n: i for i, n in enumerate(names)}
+        return sorted(results, key=lambda r: order[r["table"]])
+
+    # importér scriptene før trådene starter (import er ikke gratis at gøre parallelt)
+    for name in names:
+        importlib.import_module(TABLES[name.lower()][0])
+    sys.stdout = stdout
+    try:
+        return asyncio.run(_main())
+    finally:
+        sys.stdout = stdout._fallback
+
+def print_summary(results):
+    print("\n[run_all] Resultat pr. tabel")
+    for r in results:
+        status = "OK  " if r["ok"] else "FEJL"
+        extra = f"{r['rows']} rækker" if r["ok"] else r["error"]
+        print(f"  {status} {r['table']:<10} {r['seconds']:6.2f}s  {extra}")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Kør StatBank-tabeller i én proces.")
+    ap.add_argument("tables", nargs="*", help=f"tabeller (default: alle): {', '.join(TABLES)}")
+    ap.add_argument("--lang", default="da")
+    ap.add_argument("-j", "--jobs", type=int, default=1, help="antal tabeller der hentes samtidigt")
+    ap.add_argument("--incremental", action="store_true", help="hent kun perioder der ikke ligger lokalt")
+    ap.add_argument("--lite", action="store_true", help="let tilstand: små udtræk uden pandas/requests")
+    ap.add_argument("--priority", choices=list(scheduler.LEVELS), default=None,
+                    help="plads i det fælles kaldbudget (default DST_PRIORITY)")
+    args = ap.parse_args()
+    if args.priority:
+        scheduler.PRIORITY = args.priority
+    if args.incremental:
+        incremental.INCREMENTAL = True
+    if args.lite:
+        statbank.LITE = True
+
+    if args.jobs > 1:
+        results = run_tables_concurrently(args.tables, lang=args.lang, jobs=args.jobs)
+    else:
+        results = run_tables(args.tables, lang=args.lang)
+    print_summary(results)
+    sys.exit(0 if all(r["ok"] for r in results) else 1)
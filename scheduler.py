@@ -0,0 +1,178 @@
+# Fælles kaldbudget for alle processer: token bucket på disken + prioritetskø
+#
+# Cron-job, ad hoc-kørsler og service.py deler StatBanks rategrænse. Hvert HTTP-kald (via
+# transport.call) henter først et token fra en token bucket, der ligger i DST_CACHE_DIR/scheduler/
+# og er beskyttet af en fillås (fcntl), så alle processer på maskinen tilsammen holder sig til
+# DST_RATE kald pr. sek. (med spidser op til DST_BURST). Ventende kald står i en fælles kø sorteret
+# efter prioritet – interactive før normal før bulk – og derefter ankomsttid, så en interaktiv
+# forespørgsel springer foran en katalog-crawl. Et 429-svar sætter hele maskinen på pause
+# (Retry-After) og tømmer spanden, i stedet for at hver proces opdager droslingen for sig.
+#
+#   DST_RATE=5 DST_PRIORITY=bulk python3 catalog.py crawl      # baggrundsjob
+#   python3 run_all.py --priority interactive
+#   python3 scheduler.py                                         # vis spand, pause og kø
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import statbank
+
+RATE = float(os.environ.get("DST_RATE", 20))                  # kald pr. sek. i alt (0 = intet budget)
+BURST = float(os.environ.get("DST_BURST", max(RATE, 1)))      # højst så mange kald i træk
+PRIORITY = os.environ.get("DST_PRIORITY", "normal")
+LEVELS = {"interactive": 0, "normal": 1, "bulk": 2}
+TICKET_TTL = 5.0    # sek.: en plads i køen uden livstegn (fx død proces) fjernes
+POLL = 0.05         # sek. mellem forsøg, når andre står foran i køen
+
+try:
+    import fcntl
+except ImportError:   # fx Windows: budgettet deles kun mellem tråde i processen
+    fcntl = None
+
+_priority = contextvars.ContextVar("dst_priority", default=None)
+_thread_lock = threading.Lock()
+_seq = iter(range(1, 1 << 62))
+
+
+def level(name=None):
+    """Prioritet som tal (lavere = før); name=None: den aktuelle (priority() eller DST_PRIORITY)."""
+    name = name or _priority.get() or PRIORITY
+    if name not in LEVELS:
+        raise ValueError(f"Ukendt prioritet '{name}' (vælg blandt {', '.join(LEVELS)}).")
+    return LEVELS[name]
+
+
+@contextmanager
+def priority(name):
+    """Kald i blokken (også via asyncio.to_thread) står i køen med prioriteten name."""
+    level(name)
+    token = _priority.set(name)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def _dir():
+    path = os.path.join(statbank.CACHE_DIR, "scheduler")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+@contextmanager
+def _state():
+    """Spandens tilstand under eksklusiv lås (tråde og processer); skrives tilbage ved udgang."""
+    path = os.path.join(_dir(), "state.json")
+    with _thread_lock:
+        fd = os.open(os.path.join(_dir(), "state.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                with open(path, encoding="utf-8") as fh:
+                    st = json.load(fh)
+            except (FileNotFoundError, ValueError):
+                st = {"tokens": BURST, "ts": time.time(), "paused_until": 0.0, "queue": []}
+            yield st
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump(st, fh)
+            os.replace(tmp, path)
+        finally:
+            os.close(fd)   # frigiver også flock
+
+
+def _refill(st, now):
+    st["tokens"] = min(BURST, st["tokens"] + max(0.0, now - st["ts"]) * RATE)
+    st["ts"] = now
+
+
+def acquire(name=None, cost=1.0, timeout=None):
+    """
+    Vent på et token i det fælles budget. Returnerer ventetiden i sek. Med RATE=0 er der
+    intet budget (returnerer straks). TimeoutError, hvis timeout overskrides.
+    """
+    if RATE <= 0:
+        return 0.0
+    prio = level(name)
+    ticket = f"{os.getpid()}-{threading.get_ident()}-{next(_seq)}"
+    t0 = time.time()
+    while True:
+        with _state() as st:
+            now = time.time()
+            _refill(st, now)
+            queue = [t for t in st["queue"] if t["expires"] > now]
+            mine = next((t for t in queue if t["id"] == ticket), None)
+            if mine is None:
+                mine = {"id": ticket, "level": prio, "since": now}
+                queue.append(mine)
+            mine["expires"] = now + TICKET_TTL
+            head = min(queue, key=lambda t: (t["level"], t["since"], t["id"]))
+            ready = head is mine and now >= st["paused_until"] and st["tokens"] >= cost
+            if ready:
+                st["tokens"] -= cost
+                queue.remove(mine)
+            st["queue"] = queue
+            if head is mine:
+                wait = max(st["paused_until"] - now, (cost - st["tokens"]) / RATE, 0.0)
+            else:
+                wait = POLL
+        if ready:
+            return now - t0
+        if timeout is not None and now - t0 + wait > timeout:
+            with _state() as st:
+                st["queue"] = [t for t in st["queue"] if t["id"] != ticket]
+            raise TimeoutError(f"Intet token fra kaldbudgettet inden for {timeout:.1f} sek.")
+        time.sleep(min(wait, TICKET_TTL / 2))
+
+
+def try_acquire(name=None, cost=1.0):
+    """
+    Tag et token uden at vente (fx til et hedget ekstrakald): True, hvis der er et ledigt token,
+    ingen pause og ingen i køen; ellers False. Med RATE=0 altid True.
+    """
+    if RATE <= 0:
+        return True
+    level(name)
+    with _state() as st:
+        now = time.time()
+        _refill(st, now)
+        st["queue"] = [t for t in st["queue"] if t["expires"] > now]
+        if st["queue"] or now < st["paused_until"] or st["tokens"] < cost:
+            return False
+        st["tokens"] -= cost
+        return True
+
+
+def penalize(seconds):
+    """StatBank har droslet (429): pause for alle processer i seconds sek. og tøm spanden."""
+    if RATE <= 0:
+        return
+    with _state() as st:
+        now = time.time()
+        _refill(st, now)
+        st["paused_until"] = max(st["paused_until"], now + seconds)
+        st["tokens"] = 0.0
+
+
+def status():
+    """{'tokens', 'paused', 'queue': {prioritet: antal}} – til overvågning."""
+    names = {v: k for k, v in LEVELS.items()}
+    with _state() as st:
+        now = time.time()
+        _refill(st, now)
+        st["queue"] = [t for t in st["queue"] if t["expires"] > now]
+        queue = {}
+        for t in st["queue"]:
+            queue[names.get(t["level"], t["level"])] = queue.get(names.get(t["level"], t["level"]), 0) + 1
+        return {"tokens": round(st["tokens"], 2), "paused": round(max(0.0, st["paused_until"] - now), 2),
+                "queue": queue, "rate": RATE, "burst": BURST}
+
+
+if __name__ == "__main__":
+    s = status()
+    print(f"[scheduler] {s['rate']:g} kald/sek. (burst {s['burst']:g}) – {s['tokens']:g} tokens klar, "
+          f"pause {s['paused']:g} sek., kø: {s['queue'] or 'tom'}")
@@ -0,0 +1,193 @@
+# Deklarative udvælgelser, kompileret mod metadata og cachet pr. metadata-fingeraftryk
+#
+# En udvælgelse beskrives som data pr. rolle (fx "enhed = å/å pct", "marked = import"):
+#
+#   SELECTION = {
+#       "tid":    {"time": True, "var": [["name", ["TID", "TIME"]]]},
+#       "enhed":  {"var": [["name", ["ENHED", "UNIT"]]],
+#                  "value": [["text", r"ændring.*samme måned.*året før.*pct"]],
+#                  "error": "Kunne ikke finde enhed ..."},
+#       "*":      {"value": [["ids", ["TOT", "IALT"]], ["first"]]},   # alle øvrige variabler
+#   }
+#
+# Variabel-regler ("var"), prøves i rækkefølge – første variabel hvor værdi-reglerne giver et id, vinder:
+#   ["name", [kandidater]]  præcist variabel-id, ellers delstreng (MetaIndex.find_var)
+#   ["best", mønster]       variablen med flest værditekster der matcher
+#   ["best_id", mønster]    variablen med flest værdi-id'er der matcher
+#   ["has", mønster]        hver variabel (i rækkefølge) med mindst én matchende værditekst
+#   ["time"]                variablen markeret som tid i metadata
+# Værdi-regler ("value"), prøves i rækkefølge:
+#   ["text", m1, m2, ...]       første id hvis tekst matcher et af mønstrene (regex, uden case)
+#   ["id", m1, ...]             første id der matcher
+#   ["id_or_text", m1, ...]     første id hvor id eller tekst matcher
+#   ["contains", s1, s2, ...]   første id hvis tekst (lowercase) indeholder en af delstrengene
+#   ["ids", [id1, id2, ...]]    første værdi (i metadataens rækkefølge) med et af id'erne (uden case)
+#   ["first"]                   første værdi
+#
+# Resultatet (variabel + id pr. rolle) gemmes på disk under et fingeraftryk af tabellens
+# ikke-tids-variabler; så længe de er uændrede, springes heuristikkerne over. Tidsaksen indgår
+# ikke i fingeraftrykket, så en ny måned ikke udløser en ny opløsning.
+import hashlib
+import json
+import os
+
+import statbank
+from metaindex import meta_index
+
+
+def _hash(obj):
+    return hashlib.sha1(json.dumps(obj, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def fingerprint(meta):
+    """Fingeraftryk af alle ikke-tids-variabler (id, tekst, værdi-id'er og -tekster)."""
+    fp = getattr(meta, "_selection_fp", None)
+    if fp is None:
+        h = hashlib.sha1()
+        for var in meta.variables:
+            if var == meta.time_var:
+                continue
+            h.update(f"\x1e{var}\x1f{meta.var_text[var]}".encode("utf-8"))
+            for i, t in zip(meta.ids(var), meta.texts(var)):
+                h.update(f"\x1d{i}\x1f{t}".encode("utf-8"))
+        fp = meta._selection_fp = h.hexdigest()
+    return fp
+
+
+def _candidate_vars(meta, rules):
+    for rule in rules:
+        kind = rule[0]
+        if kind == "name":
+            v = meta.find_var(rule[1])
+            if v is not None:
+                yield v
+        elif kind == "best":
+            v = meta.best_var(rule[1])
+            if v is not None:
+                yield v
+        elif kind == "best_id":
+            v = meta.best_var(rule[1], field="id")
+            if v is not None:
+                yield v
+        elif kind == "has":
+            for v in meta.variables:
+                if meta.first(v, rule[1]) is not None:
+                    yield v
+        elif kind == "time":
+            if meta.time_var is not None:
+                yield meta.time_var
+        else:
+            raise ValueError(f"Ukendt variabel-regel: {rule!r}")
+
+
+def _pick_value(meta, var, rules):
+    for rule in rules:
+        kind, args = rule[0], rule[1:]
+        if kind == "text":
+            hit = meta.first(var, *args)
+        elif kind == "id":
+            hit = meta.first(var, *args, fields=("id",))
+        elif kind == "id_or_text":
+            hit = meta.first(var, *args, fields=("id", "text"))
+        elif kind == "contains":
+            needles = [a.lower() for a in args]
+            hit = next((i for i, t in zip(meta.ids(var), meta.lower_texts(var))
+                        if any(n in t for n in needles)), None)
+        elif kind == "ids":
+            wanted = {str(a).lower() for a in args[0]}
+            hit = next((i for i in meta.ids(var) if i.lower() in wanted), None)
+        elif kind == "first":
+            hit = meta.ids(var)[0] if meta.ids(var) else None
+        else:
+            raise ValueError(f"Ukendt værdi-regel: {rule!r}")
+        if hit is not None:
+            return hit
+    return None
+
+
+def compile_selection(meta, spec):
+    """
+    Kør spec'ens regler mod metadata (MetaIndex).
+    Returnerer {"time_var": ..., "roles": {rolle: {"var": ..., "id": ...}}, "rest": {var: id}}.
+    """
+    roles = {}
+    time_var = None
+    for role, rule in spec.items():
+        if role == "*":
+            continue
+        var_rules = rule.get("var") or [["name", [role]]]
+        if rule.get("time"):
+            time_var = next(_candidate_vars(meta, var_rules), None)
+            if time_var is None:
+                raise RuntimeError(f"Kunne ikke identificere tidsvariablen. Tilgængelige variabler: {', '.join(meta.variables)}")
+            continue
+        found = None
+        tried = False
+        for var in _candidate_vars(meta, var_rules):
+            tried = True
+            val = _pick_value(meta, var, rule.get("value", [["first"]]))
+            if val is not None:
+                found = {"var": var, "id": val}
+                break
+        if found is None:
+            if not tried:
+                raise RuntimeError(f"Kunne ikke identificere variablen for '{role}'. "
+                                   f"Tilgængelige variabler: {', '.join(meta.variables)}")
+            raise RuntimeError(rule.get("error") or f"Kunne ikke finde en værdi for '{role}'.")
+        roles[role] = found
+
+    rest = {}
+    if "*" in spec:
+        used = {r["var"] for r in roles.values()} | {time_var}
+        for var in meta.variables:
+            if var in used or var == meta.time_var:
+                continue
+            val = _pick_value(meta, var, spec["*"].get("value", [["first"]]))
+            rest[var] = val if val is not None else meta.ids(var)[0]
+    return {"time_var": time_var or meta.time_var, "roles": roles, "rest": rest}
+
+
+_compiled = {}
+
+
+def _cache_path(table, lang, spec_hash):
+    d = os.path.join(statbank.CACHE_DIR, "selection")
+    os.makedirs(d, exist_ok=True)
+    return os.path.join(d, f"{table.upper()}-{lang}-{spec_hash}.json")
+
+
+def resolve(table, spec, lang="da"):
+    """
+    (MetaIndex, kompileret udvælgelse) for tabellen. Genbruger den gemte kompilering,
+    så længe metadataens fingeraftryk er uændret; ellers køres reglerne igen.
+    """
+    meta = meta_index(table, lang=lang)
+    fp = fingerprint(meta)
+    spec_hash = _hash(spec)
+    key = (table.upper(), lang, spec_hash)
+
+    hit = _compiled.get(key)
+    if hit is not None and hit["fingerprint"] == fp:
+        return meta, hit["compiled"]
+
+    path = _cache_path(table, lang, spec_hash)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as fh:
+            cached = json.load(fh)
+        if cached.get("fingerprint") == fp:
+            _compiled[key] = cached
+            return meta, cached["compiled"]
+
+    compiled = compile_selection(meta, spec)
+    entry = {"fingerprint": fp, "compiled": compiled}
+    _compiled[key] = entry
+    statbank._write_json_atomic(path, entry)
+    return meta, compiled
+
+
+def payload(compiled, time_ids):
+    """Payload-variabler: rollerne i spec-rækkefølge, så øvrige variabler, tid sidst."""
+    out = [{"code": r["var"], "values": [r["id"]]} for r in compiled["roles"].values()]
+    out += [{"code": var, "values": [val]} for var, val in compiled["rest"].items()]
+    out.append({"code": compiled["time_var"], "values": list(time_ids)})
+    return out
@@ -0,0 +1,250 @@
+# Lokal HTTP-tjeneste: de færdige serier som JSON/CSV til dashboards – én hentning deles af alle
+#
+#   GET /series/<script>[?format=csv&lang=da]     scriptets resultat (fx /series/pris111)
+#   GET /data/<TABEL>?VAR=id1,id2&Tid=*[&format=csv]   vilkårlig udvælgelse (via cube.fetch_cube)
+#   GET /stats                                     forespørgsler, hits, samlede kald, hentninger
+#   GET /health
+#
+# Resultaterne holdes i en LRU i hukommelsen (DST_SERVICE_ENTRIES). Nøglen indeholder tabellens
+# 'updated'-stempel (fra metadata-cachen), så en ny udgivelse giver en ny nøgle. Samtidige ens
+# forespørgsler samles (single-flight): kun den første henter, de øvrige venter på samme resultat.
+#
+#   python3 service.py --port 8780
+#   curl 'http://127.0.0.1:8780/series/folk1am'
+#   curl 'http://127.0.0.1:8780/data/LBESK04?SEKTOR=*&Tid=2024M01,2024M02&format=csv'
+import importlib
+import io
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import run_all
+import scheduler
+import statbank
+from sinks import frame
+
+ENTRIES = int(os.environ.get("DST_SERVICE_ENTRIES", 256))
+
+
+class LRU:
+    """Trådsikker LRU med højst `size` elementer."""
+
+    def __init__(self, size=None):
+        self.size = ENTRIES if size is None else size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SingleFlight:
+    """do(key, fn): kører fn én gang pr. key ad gangen; samtidige kald med samme key får samme resultat."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        """(resultat, delt) – delt er True, hvis kaldet ventede på en anden tråds hentning."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {"done": threading.Event(), "value": None, "error": None}
+        if not leader:
+            call["done"].wait()
+        else:
+            try:
+                call["value"] = fn()
+            except BaseException as ex:
+                call["error"] = ex
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call["done"].set()
+        if call["error"] is not None:
+            raise call["error"]
+        return call["value"], not leader
+
+
+class Service:
+    """LRU + single-flight foran scripts og cube-udtræk. Bruges af HTTP-handleren, men kan kaldes direkte."""
+
+    def __init__(self, entries=None):
+        self.cache = LRU(entries)
+        self.flight = SingleFlight()
+        self.stats = {"requests": 0, "hits": 0, "coalesced": 0, "fetches": 0, "errors": 0}
+        self._lock = threading.Lock()
+        self._stdout = None
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _cached(self, key, fn):
+        self._count("requests")
+        hit = self.cache.get(key)
+        if hit is not None:
+            self._count("hits")
+            return hit
+
+        def _fetch():
+            hit = self.cache.get(key)   # en anden tråd kan lige have hentet den
+            if hit is not None:
+                self._count("hits")
+                return hit
+            self._count("fetches")
+            value = fn()
+            self.cache.put(key, value)
+            return value
+
+        try:
+            value, shared = self.flight.do(key, _fetch)
+        except Exception:
+            self._count("errors")
+            raise
+        if shared:
+            self._count("coalesced")
+        return value
+
+    def _quiet(self, fn, *args, **kwargs):
+        """Kør fn med stdout slugt for netop denne tråd (scripts printer deres resultat)."""
+        if self._stdout is None:
+            with self._lock:
+                if self._stdout is None:
+                    self._stdout = run_all._PerThreadStdout(sys.stdout)
+                    sys.stdout = self._stdout
+        self._stdout.capture(io.StringIO())
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self._stdout.capture(None)
+
+    def series(self, script, lang="da"):
+        """DataFrame med scriptets resultat (label-kolonner + værdi)."""
+        name = script.lower()
+        if name not in run_all.TABLES:
+            raise KeyError(f"Ukendt script '{script}' (vælg blandt {', '.join(run_all.TABLES)}).")
+        module_name, func_name = run_all.TABLES[name]
+        func = getattr(importlib.import_module(module_name), func_name)
+        table = getattr(func, "table", name).upper()
+        key = ("series", name, lang, statbank.updated_stamp(table, lang))
+        return self._cached(key, lambda: frame(self._quiet(func, lang=lang)))
+
+    def data(self, table, variables, lang="da"):
+        """DataFrame (lang form, id'er) for en vilkårlig udvælgelse via cube.fetch_cube."""
+        from cube import fetch_cube
+
+        sel = sorted((str(v["code"]).upper(), tuple(v["values"])) for v in variables)
+        key = ("data", table.upper(), lang, statbank.updated_stamp(table, lang), tuple(sel))
+        return self._cached(key, lambda: self._quiet(fetch_cube, table, variables, lang=lang).to_frame())
+
+
+def encode(df, fmt="json"):
+    """(bytes, content-type) for DataFrame'en som JSON (kolonner + rækker) eller CSV (sep=';')."""
+    if fmt == "csv":
+        return df.to_csv(sep=";", index=False).encode("utf-8"), "text/csv; charset=utf-8"
+    if fmt == "json":
+        body = df.to_json(orient="split", index=False, force_ascii=False)
+        return body.encode("utf-8"), "application/json; charset=utf-8"
+    raise ValueError(f"Ukendt format '{fmt}' (json eller csv).")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "DstService/1.0"
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, ctype="application/json; charset=utf-8"):
+        if not isinstance(body, bytes):
+            body = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        with scheduler.priority("interactive"):   # foran cron-job og crawls i det fælles budget
+            self._get()
+
+    def _get(self):
+        svc = self.server.service
+        url = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        parts = [unquote(p) for p in url.path.split("/") if p]
+        fmt = query.pop("format", "json").lower()
+        lang = query.pop("lang", "da")
+        try:
+            if parts == ["health"]:
+                return self._send(200, {"ok": True})
+            if parts == ["stats"]:
+                return self._send(200, dict(svc.stats, entries=len(svc.cache)))
+            if len(parts) == 2 and parts[0] == "series":
+                df = svc.series(parts[1], lang=lang)
+            elif len(parts) == 2 and parts[0] == "data":
+                if not query:
+                    raise ValueError("Angiv udvælgelsen som VAR=id1,id2 (brug * for alle).")
+                variables = [{"code": k, "values": v.split(",")} for k, v in query.items()]
+                df = svc.data(parts[1], variables, lang=lang)
+            else:
+                return self._send(404, {"error": f"Ukendt sti: {url.path}"})
+            body, ctype = encode(df, fmt)
+        except KeyError as ex:
+            return self._send(404, {"error": str(ex.args[0] if ex.args else ex)})
+        except ValueError as ex:
+            return self._send(400, {"error": str(ex)})
+        except Exception as ex:
+            return self._send(502, {"error": f"{type(ex).__name__}: {ex}"})
+        self._send(200, body, ctype)
+
+
+def start(port=0, host="127.0.0.1", entries=None):
+    """Start tjenesten i en baggrundstråd. server.url er roden, server.service er cachen/statistikken."""
+    srv = ThreadingHTTPServer((host, port), _Handler)
+    srv.daemon_threads = True
+    srv.service = Service(entries)
+    srv.url = f"http://{host}:{srv.server_address[1]}"
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Lokal JSON/CSV-tjeneste for StatBank-serierne.")
+    ap.add_argument("--port", type=int, default=8780)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--entries", type=int, default=None, help=f"LRU-størrelse (default {ENTRIES})")
+    ap.add_argument("--lite", action="store_true", help="let tilstand for scripts (se lite.py)")
+    args = ap.parse_args()
+    if args.lite:
+        statbank.LITE = True
+    srv = start(args.port, args.host, args.entries)
+    print(f"[service] {srv.url} – scripts: {', '.join(run_all.TABLES)}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        srv.shutdown()
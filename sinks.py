@@ -0,0 +1,195 @@
+# Output-sinks: scripts afleverer deres resultat ét sted, og DST_OUTPUT bestemmer hvorhen
+#
+#   text     (default) udskrift med danske tal (1.234.567 og 12,5; manglende = '..')
+#   csv      DST_OUTPUT_DIR/<NAVN>.csv  (sep=';', decimal=',' – som StatBanks egen CSV)
+#   json     DST_OUTPUT_DIR/<NAVN>.json (pandas 'split': kolonner + rækker)
+#   parquet  DST_OUTPUT_DIR/<NAVN>.parquet  (pyarrow)
+#   arrow    DST_OUTPUT_DIR/<NAVN>.arrow    (Arrow IPC-fil; talkolonner overføres uden kopi)
+#
+# Flere sinks adskilles med komma (DST_OUTPUT=text,parquet). Tekstudskriften skrives som én
+# blok: hvert tal formateres med str.format (ét kald pr. værdi via map), og de danske
+# skilletegn byttes med ét translate over hele blokken i stedet for pr. tal. NAVN er tabel-id'et
+# (eller scriptets navn, når flere scripts deler tabel).
+# Nye sinks tilføjes med @sink("navn").
+#
+#   DST_OUTPUT=csv,arrow python3 pris111.py
+import os
+import sys
+
+OUTPUT = os.environ.get("DST_OUTPUT", "text")
+OUTPUT_DIR = os.environ.get("DST_OUTPUT_DIR", "output")
+MISSING = ".."   # DST's tegn for manglende/fortrolige værdier
+
+_DK = str.maketrans(",.", ".,")
+SINKS = {}
+
+
+def sink(name):
+    """Registrér en sink: func(result, name, view, decimals) – result er DataFrame eller lite.Rows."""
+    def register(func):
+        SINKS[name] = func
+        return func
+    return register
+
+
+# --- dansk talformat -----------------------------------------------------------------
+
+def danish(values, decimals=None):
+    """
+    Liste af strenge med dansk tusind- og decimalskilletegn. decimals=None: heltal uden
+    decimaler, hvis alle værdier er hele tal, ellers Pythons korteste repræsentation.
+    NumPy importeres kun for arrays/Series; lister (fx lite.Rows.values) klares med ren Python.
+    """
+    if hasattr(values, "dtype"):   # NumPy-array eller pandas-objekt
+        import numpy as np
+
+        values = np.asarray(values, dtype=np.float64)
+        nan = np.isnan(values)
+        finite = np.where(nan, 0.0, values)
+        whole = bool(np.all(np.mod(finite, 1) == 0))
+        finite, missing = finite.tolist(), np.flatnonzero(nan).tolist()
+    else:
+        finite = [float(v) for v in values]
+        missing = [i for i, v in enumerate(finite) if v != v]
+        for i in missing:
+            finite[i] = 0.0
+        whole = all(v.is_integer() for v in finite)
+    if not finite:
+        return []
+    if decimals is None and whole:
+        decimals = 0
+    fmt = "{:,}" if decimals is None else f"{{:,.{decimals}f}}"
+    # str.format pr. værdi (map), derefter ét translate over hele blokken (',' <-> '.')
+    out = "\x1f".join(map(fmt.format, finite)).translate(_DK).split("\x1f")
+    for i in missing:
+        out[i] = MISSING
+    return out
+
+
+def labels(keys):
+    """
+    Række-labels: 'a | b' for MultiIndex-tupler. Niveauer, der er ens i alle rækker (de faste
+    valg, som scripts udskriver ovenover), udelades; det sidste niveau (typisk tid) bevares altid.
+    """
+    keys = list(keys)
+    if not keys or not isinstance(keys[0], tuple):
+        return list(map(str, keys))
+    levels = list(zip(*keys))
+    keep = [lv for i, lv in enumerate(levels) if i == len(levels) - 1 or len(set(lv)) > 1]
+    return list(map(" | ".join, zip(*[map(str, lv) for lv in keep])))
+
+
+# --- resultatformer ------------------------------------------------------------------
+
+def frame(result):
+    """Et scripts resultat (DataFrame med label-indeks, CSV-DataFrame eller lite.Rows) som flad DataFrame."""
+    import pandas as pd
+
+    from lite import Rows
+
+    if result is None:
+        raise RuntimeError("Scriptet returnerede ingen data.")
+    if isinstance(result, Rows):
+        result = result.to_frame()
+    if not isinstance(result.index, pd.RangeIndex):
+        result = result.reset_index()
+    return result
+
+
+def _series(result):
+    """(labels, værdier) for første værdikolonne – uden pandas for lite.Rows."""
+    from lite import Rows
+
+    if isinstance(result, Rows):
+        return result.labels, result.values
+    s = result.iloc[:, 0]
+    return s.index.tolist(), s.to_numpy()
+
+
+def _columns(result):
+    """(kolonnenavne, [kolonner som str-lister], værdier) – sidste kolonne er værdien."""
+    from lite import Rows
+
+    if isinstance(result, Rows):
+        cols = [list(c) for c in zip(*result.labels)] or [[] for _ in result.columns[:-1]]
+        return list(result.columns), cols, result.values
+    df = frame(result)
+    return ([str(c) for c in df.columns], [df[c].astype(str).tolist() for c in df.columns[:-1]],
+            df.iloc[:, -1].to_numpy())
+
+
+def _path(name, ext):
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    return os.path.join(OUTPUT_DIR, f"{name.upper()}.{ext}")
+
+
+# --- sinks ---------------------------------------------------------------------------
+
+@sink("text")
+def text(result, name, view="series", decimals=None, out=None):
+    """view='series': 'label: værdi' pr. række; view='table': alle kolonner, venstre-/højrestillet."""
+    out = out or sys.stdout
+    if view == "series":
+        keys, values = _series(result)
+        lines = map("{}: {}".format, labels(keys), danish(values, decimals))
+    else:
+        names, cols, values = _columns(result)
+        cols = cols + [danish(values, decimals)]
+        widths = [max(map(len, [n] + c)) for n, c in zip(names, cols)]
+        head = "  ".join(n.ljust(w) for n, w in zip(names, widths))
+        fmt = "  ".join([f"{{:<{w}}}" for w in widths[:-1]] + [f"{{:>{widths[-1]}}}"])
+        lines = [head.rstrip()] + list(map(fmt.format, *cols))
+    out.write("\n".join(lines) + "\n")
+
+
+@sink("csv")
+def csv_file(result, name, view="series", decimals=None):
+    path = _path(name, "csv")
+    float_format = None if decimals is None else f"%.{decimals}f"
+    frame(result).to_csv(path, sep=";", decimal=",", index=False, float_format=float_format)
+    print(f"[output] {path}")
+
+
+@sink("json")
+def json_file(result, name, view="series", decimals=None):
+    path = _path(name, "json")
+    frame(result).to_json(path, orient="split", index=False, force_ascii=False)
+    print(f"[output] {path}")
+
+
+def _arrow_table(result):
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise RuntimeError("Parquet/Arrow-output kræver pyarrow (pip install pyarrow).") from None
+    # talkolonner deler buffer med NumPy (ingen kopi); tekstkolonner konverteres én gang
+    return pa, pa.Table.from_pandas(frame(result), preserve_index=False)
+
+
+@sink("parquet")
+def parquet_file(result, name, view="series", decimals=None):
+    _, tbl = _arrow_table(result)
+    import pyarrow.parquet as pq
+
+    path = _path(name, "parquet")
+    pq.write_table(tbl, path)
+    print(f"[output] {path}")
+
+
+@sink("arrow")
+def arrow_file(result, name, view="series", decimals=None):
+    pa, tbl = _arrow_table(result)
+    path = _path(name, "arrow")
+    with pa.OSFile(path, "wb") as fh, pa.ipc.new_file(fh, tbl.schema) as writer:
+        writer.write_table(tbl)
+    print(f"[output] {path}")
+
+
+def emit(result, name, view="series", decimals=None, sinks=None):
+    """Send resultatet til sinks (default DST_OUTPUT). view/decimals bruges af tekst-sinken."""
+    names = [n.strip().lower() for n in (sinks or OUTPUT).split(",") if n.strip()]
+    unknown = [n for n in names if n not in SINKS]
+    if unknown:
+        raise ValueError(f"Ukendt output '{', '.join(unknown)}' (vælg blandt {', '.join(SINKS)}).")
+    for sink_name in names:
+        SINKS[sink_name](result, name, view=view, decimals=decimals)
@@ -0,0 +1,147 @@
+# Strukturerede tidsmålinger: én JSON-linje pr. fase (span) + valgfri cProfile/tracemalloc
+#
+#   DST_TRACE=spans.jsonl python3 folk1am.py        # skriv spans til filen (tilføjes)
+#   DST_TRACE=- python3 run_all.py                  # skriv spans til stderr
+#   DST_PROFILE=cprofile,tracemalloc DST_TRACE=- python3 pris111.py
+#
+# Faser: fetch (hele tabellen) > metadata, resolve, payload, http, parse, output (+ plan, store).
+# Hver linje har ts (start, epoch), ms, phase, table, span/parent (id'er), thread og fasens egne
+# felter (fx bytes og status for http, rows for parse). Fejl giver "error".
+# Med DST_PROFILE profileres de varme sektioner (http og parse): cProfile-stats gemmes som
+# .prof-filer i DST_PROFILE_DIR (default DST_CACHE_DIR/profiles), tracemalloc giver peak_kb.
+# Uden DST_TRACE koster en span kun et perf_counter-kald.
+import contextlib
+import contextvars
+import functools
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+
+TRACE = os.environ.get("DST_TRACE", "")
+PROFILE = {p.strip().lower() for p in os.environ.get("DST_PROFILE", "").split(",") if p.strip()}
+PROFILE_DIR = os.environ.get("DST_PROFILE_DIR", "")
+
+_current = contextvars.ContextVar("dst_span", default=None)   # (span-id, tabel)
+_ids = itertools.count(1)
+_lock = threading.Lock()
+_out = None
+
+
+def enabled():
+    return bool(TRACE)
+
+
+def _emit(record):
+    global _out
+    line = json.dumps(record, ensure_ascii=False, default=str)
+    with _lock:
+        if TRACE == "-":
+            sys.stderr.write(line + "\n")
+            return
+        if _out is None or _out.name != TRACE:
+            _out = open(TRACE, "a", encoding="utf-8", buffering=1)
+        _out.write(line + "\n")
+
+
+def _profile_path(phase, table):
+    import statbank
+
+    d = PROFILE_DIR or os.path.join(statbank.CACHE_DIR, "profiles")
+    os.makedirs(d, exist_ok=True)
+    return os.path.join(d, f"{table or 'ukendt'}-{phase}-{os.getpid()}-{next(_ids)}.prof")
+
+
+@contextlib.contextmanager
+def span(phase, table=None, profile=False, **fields):
+    """
+    Mål blokken som fasen `phase`. Yield'er en dict, hvor blokken kan tilføje felter
+    (fx sp["bytes"] = len(body)). table arves fra den omsluttende span, hvis den ikke er givet.
+    profile=True: blokken profileres, når DST_PROFILE er sat.
+    """
+    if not TRACE:
+        yield fields
+        return
+    parent = _current.get()
+    table = table or (parent[1] if parent else None)
+    span_id = next(_ids)
+    token = _current.set((span_id, table))
+
+    prof = None
+    if profile and "cprofile" in PROFILE:
+        import cProfile
+
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+        except ValueError:   # en anden profiler kører allerede (fx i en anden span)
+            prof = None
+    traced = profile and "tracemalloc" in PROFILE
+    if traced:
+        import tracemalloc
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        mem0 = tracemalloc.get_traced_memory()[0]
+
+    ts = time.time()
+    t0 = time.perf_counter()
+    error = None
+    try:
+        yield fields
+    except BaseException as ex:
+        error = f"{type(ex).__name__}: {ex}"
+        raise
+    finally:
+        ms = (time.perf_counter() - t0) * 1000
+        _current.reset(token)
+        record = {"ts": round(ts, 6), "ms": round(ms, 3), "phase": phase, "table": table,
+                  "span": span_id, "parent": parent[0] if parent else None,
+                  "pid": os.getpid(), "thread": threading.current_thread().name}
+        if traced:
+            current, peak = tracemalloc.get_traced_memory()
+            record["alloc_kb"] = round((current - mem0) / 1024, 1)
+            record["peak_kb"] = round((peak - mem0) / 1024, 1)
+        if prof is not None:
+            prof.disable()
+            record["profile"] = _profile_path(phase, table)
+            prof.dump_stats(record["profile"])
+        record.update(fields)
+        if error:
+            record["error"] = error
+        _emit(record)
+
+
+def traced(table):
+    """Dekorator: hele funktionen som én 'fetch'-span for tabellen (de indre faser arver tabellen)."""
+    def deco(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span("fetch", table=table, func=func.__name__):
+                return func(*args, **kwargs)
+        wrapper.table = table   # bruges af watch.py til at se, hvilken tabel et script henter
+        return wrapper
+    return deco
+
+
+def summary(path):
+    """{(tabel, fase): {"n", "ms", "bytes"}} summeret fra en spans-fil – til hurtige overblik."""
+    out = {}
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            rec = json.loads(line)
+            agg = out.setdefault((rec.get("table"), rec["phase"]), {"n": 0, "ms": 0.0, "bytes": 0})
+            agg["n"] += 1
+            agg["ms"] += rec["ms"]
+            agg["bytes"] += rec.get("bytes") or 0
+    return out
+
+
+if __name__ == "__main__":
+    # python3 spans.py spans.jsonl  -> tid pr. tabel og fase
+    for (table, phase), agg in sorted(summary(sys.argv[1]).items(), key=lambda kv: (str(kv[0][0]), kv[0][1])):
+        extra = f"  {agg['bytes']:,} bytes" if agg["bytes"] else ""
+        print(f"{str(table):<12} {phase:<10} {agg['n']:5d} x {agg['ms']:10.1f} ms{extra}")
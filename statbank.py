@@ -0,0 +1,397 @@
+# Fælles hjælpere til StatBank-API'et (api.statbank.dk/v1)
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+from urllib.parse import urlencode, urlsplit
+
+import transport
+from spans import span
+
+BASE = os.environ.get("DST_BASE", "https://api.statbank.dk/v1")   # fx mockserver.py lokalt
+
+# Metadata-cache på disk. Nøgle = tabel + sprog + tabellens 'updated'-stempel.
+CACHE_DIR = os.environ.get(
+    "DST_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "danmarksstatistik")
+)
+META_TTL = float(os.environ.get("DST_META_TTL", 6 * 3600))   # sek. før vi spørger om tabellen er ændret
+META_MAX_BYTES = int(os.environ.get("DST_META_MAX_BYTES", 64 * 1024 * 1024))
+
+# Let tilstand: metadata og små udtræk hentes med http.client (stdlib) i stedet for requests,
+# så korte kørsler slipper for at importere requests/pandas (se lite.py).
+LITE = os.environ.get("DST_LITE", "0").lower() in ("1", "true", "ja", "yes")
+
+
+_session = None
+
+
+def session():
+    """
+    Fælles keep-alive session til api.statbank.dk, så alle tabeller i samme proces
+    deler TLS-forbindelse og connection pool.
+    """
+    global _session
+    if _session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        _session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+        _session.mount("https://", adapter)
+        _session.mount("http://", adapter)
+    return _session
+
+
+def _kind(path):
+    """Slags kald til latens-statistikken: '/data', '/tableinfo', '/tables' ..."""
+    return "/" + path.strip("/").split("/")[0]
+
+
+def request(method, path, sp=None, stream=False, timeout=60, **kwargs):
+    """
+    session().request mod BASE + path gennem transport.call: genforsøg med backoff, Retry-After,
+    kredsløbsbryder og (DST_HEDGE) hedging. Streams hedges ikke.
+    """
+    s = session()
+    url = f"{BASE}{path}"
+    return transport.call(
+        lambda: s.request(method, url, timeout=(transport.CONNECT_TIMEOUT, timeout), stream=stream, **kwargs),
+        urlsplit(BASE).netloc, f"{method} {_kind(path)}", hedge=not stream, sp=sp,
+    )
+
+
+_light = threading.local()
+LightResponse = namedtuple("LightResponse", "status_code headers content url")
+
+
+def light_request(method, path, params=None, body=None, timeout=60, sp=None):
+    """
+    Kald API'et med http.client (ingen tredjepartsimport). Én keep-alive forbindelse pr. tråd.
+    Går gennem transport.call som request(). Returnerer (status, krop som bytes, url).
+    """
+    r = transport.call(
+        lambda: _light_send(method, path, params, body, timeout),
+        urlsplit(BASE).netloc, f"{method} {_kind(path)}", sp=sp,
+    )
+    return r.status_code, r.content, r.url
+
+
+def _light_send(method, path, params, body, timeout):
+    import http.client
+
+    base = urlsplit(BASE)
+    query = f"?{urlencode(params)}" if params else ""
+    headers = {"Accept-Encoding": "identity"}
+    data = None
+    if body is not None:
+        data = json.dumps(body).encode("utf-8")
+        headers["Content-Type"] = "application/json"
+    for attempt in (1, 2):
+        conn = getattr(_light, "conn", None)
+        if conn is None or getattr(_light, "netloc", None) != base.netloc:
+            cls = http.client.HTTPSConnection if base.scheme == "https" else http.client.HTTPConnection
+            conn = _light.conn = cls(base.netloc, timeout=timeout)
+            _light.netloc = base.netloc
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        try:
+            conn.request(method, f"{base.path}{path}{query}", body=data, headers=headers)
+            r = conn.getresponse()
+            return LightResponse(r.status, r.headers, r.read(), f"{BASE}{path}{query}")
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            # genbrugt forbindelse lukket af serveren – prøv én gang med en ny
+            conn.close()
+            _light.conn = None
+            if attempt == 2:
+                raise
+        except (OSError, http.client.HTTPException) as ex:
+            # fx timeout eller afkortet svar: forbindelsen kan ikke genbruges
+            conn.close()
+            _light.conn = None
+            if isinstance(ex, OSError):
+                raise
+            raise ConnectionError(f"{type(ex).__name__}: {ex}") from ex
+
+
+def _json(method, path, params=None, body=None, timeout=30):
+    """JSON-kald til API'et – via den fælles session, eller via light_request i let tilstand."""
+    if LITE:
+        status, content, url = light_request(method, path, params=params, body=body, timeout=timeout)
+        if status >= 400:
+            raise RuntimeError(f"StatBank svarede {status} for {url}: {content[:300].decode('utf-8', 'replace')}")
+        return json.loads(content)
+    r = request(method, path, params=params, json=body, timeout=timeout)
+    r.raise_for_status()
+    return r.json()
+
+
+def _meta_dir():
+    path = os.path.join(CACHE_DIR, "tableinfo")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _stamp(updated):
+    """Gør 'updated' (fx '2025-02-11T08:00:00') filnavnssikkert."""
+    return re.sub(r"[^0-9A-Za-z]", "", str(updated or "ukendt"))
+
+
+def _cached_entries(table, lang):
+    prefix = f"{table.upper()}-{lang}-"
+    d = _meta_dir()
+    return [os.path.join(d, f) for f in os.listdir(d) if f.startswith(prefix) and f.endswith(".json")]
+
+
+def _write_json_atomic(path, obj):
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(obj, fh, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _evict(max_bytes=None, d=None, suffixes=(".json",)):
+    """Slet mindst nyligt brugte filer (atime) i d (default metadata-cachen) til den er under max_bytes."""
+    max_bytes = META_MAX_BYTES if max_bytes is None else max_bytes
+    d = _meta_dir() if d is None else d
+    entries = []
+    for f in os.listdir(d):
+        if not f.endswith(suffixes):
+            continue
+        st = os.stat(os.path.join(d, f))
+        entries.append((st.st_atime, st.st_size, os.path.join(d, f)))
+    total = sum(e[1] for e in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def tables_updated(tables, lang="da"):
+    """{TABEL: 'updated'} for flere tabeller i ét let /tables-kald (uden værdilister)."""
+    listing = _json(
+        "POST", "/tables",
+        body={"lang": lang, "tablesId": list(tables), "includeInactive": True, "format": "JSON"},
+    )
+    return {str(t.get("id", "")).upper(): t.get("updated") for t in listing}
+
+
+def table_updated(table, lang="da"):
+    """Hent tabellens 'updated'-stempel via det lette /tables-kald (uden værdilister)."""
+    return tables_updated([table], lang).get(table.upper())
+
+
+def note_updated(table, lang, updated):
+    """
+    Et frisk 'updated' for tabellen (fx fra watch.py): har metadata-cachen samme stempel,
+    regnes den som revalideret nu; ellers slettes den, så næste tableinfo henter på ny.
+    """
+    now = time.time()
+    prefix = f"{table.upper()}-{lang}-"
+    for path in _cached_entries(table, lang):
+        if os.path.basename(path)[len(prefix):-len(".json")] == _stamp(updated):
+            os.utime(path, (os.stat(path).st_atime, now))
+        else:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def tableinfo(table, lang="da", ttl=None):
+    """
+    Hent /tableinfo for tabellen via disk-cachen.
+
+    Inden for ttl sekunder genbruges cachen uden netværkskald. Derefter spørges
+    /tables om tabellens 'updated'-stempel; er det uændret, genbruges cachen,
+    ellers hentes metadata på ny og gamle versioner slettes.
+    """
+    with span("metadata", table=table.upper(), lang=lang) as sp:
+        return _tableinfo(table, lang, META_TTL if ttl is None else ttl, sp)
+
+
+def _tableinfo(table, lang, ttl, sp):
+    now = time.time()
+
+    entries = sorted(_cached_entries(table, lang), key=os.path.getmtime, reverse=True)
+    if entries:
+        path = entries[0]
+        # mtime = sidst valideret mod StatBank, atime = sidst brugt
+        if now - os.path.getmtime(path) > ttl:
+            with open(path, encoding="utf-8") as fh:
+                cached_updated = json.load(fh).get("updated")
+            if _stamp(table_updated(table, lang)) != _stamp(cached_updated):
+                entries = []
+            else:
+                os.utime(path, (now, now))
+                sp["cache"] = "revalideret"
+        if entries:
+            with open(path, encoding="utf-8") as fh:
+                meta = json.load(fh)
+            os.utime(path, (now, os.path.getmtime(path)))
+            sp.setdefault("cache", "hit")
+            return meta
+
+    sp["cache"] = "miss"
+    meta = _json("GET", f"/tableinfo/{table}", params={"contentType": "JSON", "lang": lang})
+
+    path = os.path.join(_meta_dir(), f"{table.upper()}-{lang}-{_stamp(meta.get('updated'))}.json")
+    for old in _cached_entries(table, lang):
+        if old == path:   # samme stempel: erstattes atomisk nedenfor (samtidige læsere ser altid en fil)
+            continue
+        try:
+            os.remove(old)
+        except FileNotFoundError:
+            pass
+    _write_json_atomic(path, meta)
+    _evict()
+    return meta
+
+
+def updated_stamp(table, lang="da", ttl=None):
+    """
+    Tabellens 'updated' som filnavnsstempel. Inden for ttl læses det direkte af metadata-cachens
+    filnavn (uden at åbne filen); ellers revalideres metadata via tableinfo.
+    """
+    ttl = META_TTL if ttl is None else ttl
+    entries = sorted(_cached_entries(table, lang), key=os.path.getmtime, reverse=True)
+    if entries and time.time() - os.path.getmtime(entries[0]) <= ttl:
+        name = os.path.basename(entries[0])
+        return name[len(f"{table.upper()}-{lang}-"):-len(".json")]
+    return _stamp(tableinfo(table, lang=lang, ttl=ttl).get("updated"))
+
+
+def selection_key(table, variables, time_code, lang="da"):
+    """Kanonisk nøgle (til lokale kopier) for tabel + sprog + udvælgelse uden tidsvariablen."""
+    sel = sorted(
+        (str(v["code"]).upper(), sorted(map(str, v["values"])))
+        for v in variables
+        if str(v["code"]).upper() != time_code.upper()
+    )
+    raw = json.dumps([table.upper(), lang, sel], ensure_ascii=False)
+    return f"{table.upper()}-{hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]}"
+
+
+def cached_data(table, variables, lang="da", fmt="CSV"):
+    """(sti, svar) fra datacache.lookup, målt som en 'cache'-span."""
+    import datacache
+
+    with span("cache", table=table.upper(), fmt=fmt) as sp:
+        path, r = datacache.lookup(table, variables, lang=lang, fmt=fmt)
+        sp["hit"] = r is not None
+    return path, r
+
+
+def post_data(table, variables, lang="da", fmt="CSV", timeout=60):
+    """
+    POST til /data/{table}/{fmt} med den fælles session. Returnerer response (tjekket for fejl).
+    Et svar for samme udvælgelse og uændret tabel ('updated') kommer fra datacache.py.
+    """
+    import datacache
+
+    path, r = cached_data(table, variables, lang, fmt)
+    if r is not None:
+        print("[data] URL:", r.url, "(lokal cache)")
+        return r
+    with span("http", table=table.upper(), fmt=fmt, profile=True) as sp:
+        r = request(
+            "POST", f"/data/{table}/{fmt}", sp=sp,
+            params={"lang": lang},
+            json={"table": table, "format": fmt, "variables": variables},
+            timeout=timeout,
+        )
+        sp["status"] = r.status_code
+        sp["bytes"] = len(r.content)
+    print("[data] URL:", r.url)
+    if r.status_code == 200:
+        datacache.store(path, r.content, r.url, r.encoding)
+    if r.status_code >= 400:
+        print("[data] Fejltekst:", r.text[:1000])
+    r.raise_for_status()
+    return r
+
+
+def data_frame(table, variables, lang="da", timeout=60):
+    """CSV fra post_data læst med pandas (sep=';') – pandas importeres først her."""
+    from io import StringIO
+
+    import pandas as pd
+
+    text = post_data(table, variables, lang=lang, fmt="CSV", timeout=timeout).text
+    with span("parse", fmt="CSV", profile=True) as sp:
+        df = pd.read_csv(StringIO(text), sep=";")
+        sp["rows"] = len(df)
+    return df
+
+
+def data_jsonstat(table, variables, lang="da", timeout=60):
+    """
+    Som StatBankClient.data (denstatbank): JSONSTAT via den fælles session -> DataFrame med
+    label-indeks, men med HTTP og parsing målt hver for sig, og med værdierne læst direkte
+    til NumPy (jsonstat.py). Fejlbesked udskrives, og None returneres ved fejl (som denstatbank).
+    """
+    import datacache
+    import jsonstat
+
+    path, r = cached_data(table, variables, lang, "JSONSTAT")
+    if r is None:
+        with span("http", table=table.upper(), fmt="JSONSTAT", profile=True) as sp:
+            r = request(
+                "POST", "/data", sp=sp,
+                json={"format": "JSONSTAT", "table": table, "variables": variables, "lang": lang},
+                timeout=timeout,
+            )
+            sp["status"] = r.status_code
+            sp["bytes"] = len(r.content)
+        if r.status_code == 200:
+            datacache.store(path, r.content, r.url, r.encoding)
+    if r.status_code != 200:
+        print(r.json()["message"])
+        return None
+    with span("parse", fmt="JSONSTAT", profile=True) as sp:
+        df = jsonstat.to_frame(r.content, [v["code"] for v in variables])
+        sp["rows"] = len(df)
+    return df
+
+
+def stream_data(table, variables, lang="da", fmt="BULK", timeout=60):
+    """
+    Som post_data, men med stream=True: kroppen læses ikke ind i hukommelsen.
+    Brug response.raw (dekomprimeret) som fil-objekt og luk response bagefter.
+    """
+    r = request(
+        "POST", f"/data/{table}/{fmt}",
+        params={"lang": lang},
+        json={"table": table, "format": fmt, "variables": variables},
+        timeout=timeout,
+        stream=True,
+    )
+    print("[data] URL:", r.url)
+    if r.status_code >= 400:
+        print("[data] Fejltekst:", r.text[:1000])
+        r.raise_for_status()
+    r.raw.decode_content = True
+    return r
+
+
+def tableinfo_df(table, lang="da", ttl=None):
+    """
+    Metadata som DataFrame i samme form som StatBankClient.tableinfo(..., variables_df=True):
+    kolonnerne id, text, variable (variabel-id på dansk, variabel-tekst på engelsk).
+    """
+    import pandas as pd
+
+    meta = tableinfo(table, lang=lang, ttl=ttl)
+    frames = []
+    for var in meta["variables"]:
+        df = pd.DataFrame(var["values"])
+        df["variable"] = var["text"] if lang == "en" else var["id"]
+        frames.append(df)
+    return pd.concat(frames)
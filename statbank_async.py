@@ -0,0 +1,62 @@
+# Asyncio-klient til /tableinfo og /data med begrænset samtidighed
+#
+# Kaldene kører på den fælles keep-alive session fra statbank.py (i trådpuljen via
+# asyncio.to_thread), så metadata-cachen og connection pool deles med de øvrige scripts.
+import asyncio
+
+import statbank
+
+DEFAULT_CONCURRENCY = 4
+
+
+class AsyncStatBankClient:
+    """
+    Eksempel:
+        async def main():
+            sb = AsyncStatBankClient(lang="da", concurrency=4)
+            metas = await sb.gather(*(sb.tableinfo(t) for t in ["FOLK1AM", "SBLON1"]))
+    """
+
+    def __init__(self, lang="da", concurrency=DEFAULT_CONCURRENCY):
+        if concurrency < 1:
+            raise ValueError("concurrency skal være mindst 1.")
+        self.lang = lang
+        self.concurrency = concurrency
+        self._sem = asyncio.Semaphore(concurrency)
+
+    async def run(self, func, *args, **kwargs):
+        """Kør et blokerende kald i trådpuljen, højst `concurrency` ad gangen."""
+        async with self._sem:
+            return await asyncio.to_thread(func, *args, **kwargs)
+
+    async def tableinfo(self, table):
+        return await self.run(statbank.tableinfo, table, lang=self.lang)
+
+    async def data(self, table, variables, fmt="CSV"):
+        """Rå svartekst fra /data (CSV/BULK/JSONSTAT ...)."""
+        r = await self.run(statbank.post_data, table, variables, lang=self.lang, fmt=fmt)
+        return r.text
+
+    async def pipeline(self, table, build_variables, fmt="CSV"):
+        """Metadata -> build_variables(meta) -> data for én tabel."""
+        meta = await self.tableinfo(table)
+        return await self.data(table, build_variables(meta), fmt=fmt)
+
+    async def gather(self, *coros):
+        return await asyncio.gather(*coros)
+
+    async def pipelines(self, specs, fmt="CSV"):
+        """
+        Kør flere metadata->data-forløb samtidigt.
+        specs: {tabel: build_variables}. Returnerer {tabel: svartekst}.
+        """
+        tables = list(specs)
+        texts = await self.gather(*(self.pipeline(t, specs[t], fmt=fmt) for t in tables))
+        return dict(zip(tables, texts))
+
+
+def fetch_pipelines(specs, lang="da", concurrency=DEFAULT_CONCURRENCY, fmt="CSV"):
+    """Synkron indgang til AsyncStatBankClient.pipelines."""
+    async def _main():
+        return await AsyncStatBankClient(lang=lang, concurrency=concurrency).pipelines(specs, fmt=fmt)
+    return asyncio.run(_main())
@@ -0,0 +1,174 @@
+# Lokalt kolonnelager for hentede serier (NumPy .npy + lille JSON-labelindeks)
+#
+# Én mappe pr. tabel + sprog + udvælgelse (samme nøgle som incremental.py):
+#   DST_CACHE_DIR/store/<nøgle>/index.json    tabel, udvælgelse, serie-labels, perioder
+#   DST_CACHE_DIR/store/<nøgle>/values-N.npy  float64-matrix [serie x periode], NaN = mangler
+# Læsning sker med memory-map og uden pandas/CSV, så mange serier kan læses på millisekunder.
+import bisect
+import json
+import os
+
+import statbank
+import vintages
+from spans import span
+
+STORE = os.environ.get("DST_STORE", "1").lower() not in ("0", "false", "nej", "no")
+
+
+def _store_dir():
+    path = os.path.join(statbank.CACHE_DIR, "store")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _read_index(key):
+    path = os.path.join(_store_dir(), key, "index.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def write_series(table, variables, time_code, series, periods, values, lang="da"):
+    """
+    Gem/flet en matrix values[len(series), len(periods)] ind i lageret.
+    Eksisterende celler overskrives af nye; perioder og serier foreninges.
+    """
+    import numpy as np
+
+    key = statbank.selection_key(table, variables, time_code, lang)
+    values = np.asarray(values, dtype=np.float64).reshape(len(series), len(periods))
+    series = [list(map(str, s)) for s in series]
+    periods = [str(p) for p in periods]
+
+    idx = _read_index(key)
+    if idx is not None:
+        old = np.load(os.path.join(_store_dir(), key, idx["values_file"]))
+        all_series = idx["series"] + [s for s in series if s not in idx["series"]]
+        all_periods = sorted(set(idx["periods"]) | set(periods))
+        merged = np.full((len(all_series), len(all_periods)), np.nan)
+        s_pos = {tuple(s): i for i, s in enumerate(all_series)}
+        p_pos = {p: i for i, p in enumerate(all_periods)}
+        rows = [s_pos[tuple(s)] for s in idx["series"]]
+        cols = [p_pos[p] for p in idx["periods"]]
+        merged[np.ix_(rows, cols)] = old
+        rows = [s_pos[tuple(s)] for s in series]
+        cols = [p_pos[p] for p in periods]
+        merged[np.ix_(rows, cols)] = values
+        series, periods, values = all_series, all_periods, merged
+        version = idx["version"] + 1
+    else:
+        order = np.argsort(periods, kind="stable")
+        periods = [periods[i] for i in order]
+        values = values[:, order]
+        version = 1
+
+    d = os.path.join(_store_dir(), key)
+    os.makedirs(d, exist_ok=True)
+    values_file = f"values-{version}.npy"
+    np.save(os.path.join(d, values_file), values)
+    statbank._write_json_atomic(os.path.join(d, "index.json"), {
+        "table": table.upper(),
+        "lang": lang,
+        "time_code": time_code,
+        "selection": [v for v in variables if str(v["code"]).upper() != time_code.upper()],
+        "series": series,
+        "periods": periods,
+        "values_file": values_file,
+        "version": version,
+    })
+    # ryd ældre versioner (læsere der allerede har åbnet dem via mmap påvirkes ikke på POSIX)
+    for f in os.listdir(d):
+        if f.startswith("values-") and f != values_file:
+            try:
+                os.remove(os.path.join(d, f))
+            except OSError:
+                pass
+    return key
+
+
+def save_frame(table, variables, time_code, df, lang="da"):
+    """
+    Gem et hentet DataFrame i lageret – både CSV-formen (label-kolonner + værdi sidst)
+    og denstatbank-formen (label-indeks + én værdikolonne).
+    Overvågede tabeller registreres også som årgang i vintages.py.
+    """
+    if df is None or df.empty or not (STORE or vintages.tracked(table)):
+        return None
+    with span("store", table=table.upper()) as sp:
+        key = _save_frame(table, variables, time_code, df, lang)
+        sp["rows"] = len(df)
+    return key
+
+
+def _save_frame(table, variables, time_code, df, lang):
+    import numpy as np
+    import pandas as pd
+    from incremental import period_column
+
+    periods = period_column(df, time_code).to_numpy()
+    values = pd.to_numeric(df.iloc[:, -1], errors="coerce").to_numpy(dtype=np.float64)
+    if isinstance(df.index, pd.RangeIndex):
+        label_cols = [c for c in df.columns[:-1] if str(c).upper() != time_code.upper()]
+        labels = df[label_cols].astype(str).to_numpy()
+    else:
+        keep = [i for i, n in enumerate(df.index.names) if str(n).upper() != time_code.upper()]
+        labels = (np.column_stack([df.index.get_level_values(i).astype(str).to_numpy() for i in keep])
+                  if keep else np.empty((len(df), 0), dtype=object))
+
+    series = list(dict.fromkeys(map(tuple, labels)))
+    uniq_periods = list(dict.fromkeys(periods))
+    s_pos = {s: i for i, s in enumerate(series)}
+    p_pos = {p: i for i, p in enumerate(uniq_periods)}
+    matrix = np.full((len(series), len(uniq_periods)), np.nan)
+    matrix[[s_pos[tuple(l)] for l in labels], [p_pos[p] for p in periods]] = values
+    vintages.record(table, variables, time_code, series, uniq_periods, matrix, lang=lang)
+    if not STORE:
+        return None
+    return write_series(table, variables, time_code, series, uniq_periods, matrix, lang=lang)
+
+
+def list_series(table=None):
+    """Alle gemte nøgler (evt. kun for én tabel) med tabel, udvælgelse og periodespænd."""
+    out = []
+    for key in sorted(os.listdir(_store_dir())):
+        if table and not key.startswith(table.upper() + "-"):
+            continue
+        idx = _read_index(key)
+        if idx is None:
+            continue
+        out.append({"key": key, "table": idx["table"], "selection": idx["selection"],
+                    "series": len(idx["series"]), "first": idx["periods"][0] if idx["periods"] else None,
+                    "last": idx["periods"][-1] if idx["periods"] else None})
+    return out
+
+
+def read_series(table=None, variables=None, time_code="Tid", lang="da", start=None, end=None, key=None):
+    """
+    Læs (evt. et periodeudsnit af) en gemt udvælgelse uden netværk og uden CSV-parsing.
+    Angiv enten key (fra list_series) eller table + variables (som i payloaden).
+    Returnerer {"series": [...], "periods": [...], "values": ndarray[serie, periode]}.
+    """
+    import numpy as np
+
+    if key is None:
+        key = statbank.selection_key(table, variables, time_code, lang)
+    idx = _read_index(key)
+    if idx is None:
+        raise KeyError(f"Ingen lokal serie for {key}.")
+    periods = idx["periods"]
+    lo = 0 if start is None else bisect.bisect_left(periods, start)
+    hi = len(periods) if end is None else bisect.bisect_right(periods, end)
+    values = np.load(os.path.join(_store_dir(), key, idx["values_file"]), mmap_mode="r")
+    return {"series": idx["series"], "periods": periods[lo:hi], "values": values[:, lo:hi]}
+
+
+def read_frame(table=None, variables=None, time_code="Tid", lang="da", start=None, end=None, key=None):
+    """Som read_series, men som DataFrame (perioder som indeks, én kolonne pr. serie)."""
+    import numpy as np
+
+    import pandas as pd
+
+    res = read_series(table, variables, time_code, lang, start, end, key)
+    cols = [" | ".join(s) if s else "værdi" for s in res["series"]]
+    return pd.DataFrame(np.asarray(res["values"]).T, index=res["periods"], columns=cols)
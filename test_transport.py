@@ -0,0 +1,55 @@
+# Regressionstest for transport.call og kredsløbsbryderen (kør: python -m pytest -q)
+import time
+
+import pytest
+
+import scheduler
+import transport
+
+
+class _Resp:
+    def __init__(self, status, headers=None):
+        self.status_code = status
+        self.headers = headers or {}
+
+    def close(self):
+        pass
+
+
+def _refused():
+    raise ConnectionRefusedError("mock")
+
+
+@pytest.fixture
+def breaker_host(monkeypatch):
+    """Et frisk værtsnavn med åben bryder, klar til prøvekaldet (halvåben), uden kaldbudget."""
+    monkeypatch.setattr(scheduler, "RATE", 0)
+    monkeypatch.setattr(transport, "BACKOFF_BASE", 0.001)
+    name = f"test-{time.monotonic_ns()}"
+    breaker = transport.host(name).breaker
+    breaker.reset = 0.01
+    for _ in range(breaker.failures):
+        with pytest.raises(ConnectionRefusedError):
+            transport.call(_refused, name, "k", hedge=False, retries=0)
+    assert breaker.state == "åben"
+    time.sleep(0.02)
+    assert breaker.state == "halvåben"
+    return name, breaker
+
+
+@pytest.mark.parametrize("retries", [0, 1])
+def test_429_during_half_open_trial_releases_the_trial(breaker_host, retries):
+    name, breaker = breaker_host
+    calls = []
+
+    def throttled():
+        calls.append(1)
+        return _Resp(429, {"Retry-After": "0"})
+
+    resp = transport.call(throttled, name, "k", hedge=False, retries=retries)
+    assert resp.status_code == 429
+    assert len(calls) == retries + 1
+    assert not breaker._trial
+    # næste kald må sendes (nyt prøvekald) og lukker bryderen
+    assert transport.call(lambda: _Resp(200), name, "k", hedge=False, retries=0).status_code == 200
+    assert breaker.state == "lukket"
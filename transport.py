@@ -0,0 +1,273 @@
+# Robust transport under alle kald til StatBank: genforsøg, 429-pauser, kredsløbsbryder og hedging
+#
+# Et kald (send) gentages ved netværksfejl og ved svar med status i RETRY_STATUS, med
+# eksponentiel backoff og fuld jitter (tilfældig ventetid i [0, min(BACKOFF_MAX, BACKOFF_BASE * 2^n)]).
+# Et Retry-After-hoved (sekunder eller HTTP-dato) respekteres; ved 429 holder hele processen
+# pause mod den vært, så samtidige delkald (planner) ikke fortsætter med at hamre løs.
+# Kredsløbsbryderen åbner efter BREAKER_FAILURES fejl i træk mod samme vært: så fejler kald
+# med det samme i BREAKER_RESET sek., hvorefter ét prøvekald slipper igennem.
+# Hedging (DST_HEDGE=0.95): tager et kald længere end den 95. percentil af de seneste svartider
+# for samme slags kald, sendes et identisk kald mere, og det første brugbare svar vinder.
+#
+# Før hvert forsøg hentes et token fra det fælles kaldbudget i scheduler.py (alle processer).
+#
+#   DST_RETRIES=4 DST_BACKOFF_BASE=0.5 DST_HEDGE=0.95 python3 run_all.py
+import os
+import random
+import threading
+import time
+from collections import deque
+
+RETRIES = int(os.environ.get("DST_RETRIES", 4))                     # genforsøg ud over første kald
+BACKOFF_BASE = float(os.environ.get("DST_BACKOFF_BASE", 0.5))       # sek.
+BACKOFF_MAX = float(os.environ.get("DST_BACKOFF_MAX", 30.0))        # sek.
+RETRY_AFTER_MAX = float(os.environ.get("DST_RETRY_AFTER_MAX", 120.0))   # længere Retry-After = giv op
+CONNECT_TIMEOUT = float(os.environ.get("DST_CONNECT_TIMEOUT", 5.0))
+BREAKER_FAILURES = int(os.environ.get("DST_BREAKER_FAILURES", 5))
+BREAKER_RESET = float(os.environ.get("DST_BREAKER_RESET", 30.0))
+HEDGE = float(os.environ.get("DST_HEDGE", 0) or 0)                  # percentil (0 = ingen hedging)
+HEDGE_MIN_MS = float(os.environ.get("DST_HEDGE_MIN_MS", 50.0))      # hedg aldrig hurtigere end dette
+HEDGE_SAMPLES = 20                                                  # svartider før percentilen bruges
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class CircuitOpen(RuntimeError):
+    """Kredsløbsbryderen er åben: StatBank har fejlet for mange gange i træk."""
+
+
+def backoff(attempt, base=None, cap=None):
+    """Ventetid før genforsøg nr. attempt (0-baseret): fuld jitter over eksponentiel vækst."""
+    base = BACKOFF_BASE if base is None else base
+    cap = BACKOFF_MAX if cap is None else cap
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def retry_after(value):
+    """Retry-After som sekunder (tal eller HTTP-dato). None hvis hovedet mangler/er ugyldigt."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """Lukket -> åben efter `failures` fejl i træk -> halvåben (ét prøvekald) efter `reset` sek."""
+
+    def __init__(self, failures=None, reset=None):
+        self.failures = BREAKER_FAILURES if failures is None else failures
+        self.reset = BREAKER_RESET if reset is None else reset
+        self._lock = threading.Lock()
+        self._count = 0
+        self._opened = None
+        self._trial = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened is None:
+                return "lukket"
+            return "halvåben" if time.monotonic() - self._opened >= self.reset else "åben"
+
+    def before(self, name=""):
+        """Rejs CircuitOpen, hvis kaldet ikke må sendes nu."""
+        with self._lock:
+            if self._opened is None:
+                return
+            left = self.reset - (time.monotonic() - self._opened)
+            if left > 0 or self._trial:
+                raise CircuitOpen(f"StatBank-kredsløbet {name} er åbent efter {self._count} fejl i træk"
+                                  f" – prøver igen om {max(left, 0):.0f} sek.")
+            self._trial = True   # halvåben: dette kald er prøvekaldet
+
+    def success(self):
+        with self._lock:
+            self._count, self._opened, self._trial = 0, None, False
+
+    def failure(self):
+        with self._lock:
+            self._count += 1
+            if self._trial or self._count >= self.failures:
+                self._opened = time.monotonic()
+            self._trial = False
+
+    def release(self):
+        """Kaldet gav intet svar om StatBank (fx ugyldig URL): frigiv prøvekaldet uden at tælle en fejl."""
+        with self._lock:
+            self._trial = False
+
+
+class Latencies:
+    """De seneste svartider (ms) pr. slags kald, til hedging-tærsklen."""
+
+    def __init__(self, size=200):
+        self._lock = threading.Lock()
+        self._samples = {}
+        self.size = size
+
+    def add(self, key, ms):
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.size)).append(ms)
+
+    def percentile(self, key, q):
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < HEDGE_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+class _Host:
+    def __init__(self):
+        self.breaker = CircuitBreaker()
+        self.lock = threading.Lock()
+        self.paused_until = 0.0   # fælles 429-pause (time.monotonic)
+
+
+_hosts = {}
+_hosts_lock = threading.Lock()
+latencies = Latencies()
+_pool = None
+
+
+def host(name):
+    with _hosts_lock:
+        if name not in _hosts:
+            _hosts[name] = _Host()
+        return _hosts[name]
+
+
+def _executor():
+    global _pool
+    if _pool is None:
+        from concurrent.futures import ThreadPoolExecutor
+
+        with _hosts_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="dst-hedge")
+    return _pool
+
+
+def _discard(resp):
+    close = getattr(resp, "close", None)
+    if close is not None:
+        close()
+
+
+def _wait_paused(h):
+    with h.lock:
+        wait = h.paused_until - time.monotonic()
+    if wait > 0:
+        time.sleep(wait)
+
+
+def _timed_send(send, key):
+    t0 = time.perf_counter()
+    resp = send()
+    if resp.status_code < 400:
+        latencies.add(key, (time.perf_counter() - t0) * 1000)
+    return resp
+
+
+def _send_hedged(send, key, q, sp):
+    """Send; er svaret ikke kommet inden percentilen q, send et ekstra kald. Første brugbare svar vinder."""
+    from concurrent.futures import FIRST_COMPLETED, wait
+
+    import scheduler
+
+    threshold = latencies.percentile(key, q)
+    if threshold is None:
+        return _timed_send(send, key)
+    pool = _executor()
+    pending = {pool.submit(_timed_send, send, key)}
+    done, _ = wait(pending, timeout=max(threshold, HEDGE_MIN_MS) / 1000)
+    if not done and scheduler.try_acquire():   # ekstrakaldet tæller i budgettet; intet token = ingen hedge
+        pending.add(pool.submit(_timed_send, send, key))
+        if sp is not None:
+            sp["hedged"] = True
+    error = None
+    result = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for fut in done:
+            try:
+                resp = fut.result()
+            except OSError as ex:
+                error = ex
+                continue
+            if result is None and (resp.status_code not in RETRY_STATUS or not pending):
+                result = resp
+            else:
+                _discard(resp)
+        if result is not None:
+            # taberen kører færdig i baggrunden; svaret lukkes, når det kommer
+            for fut in pending:
+                fut.add_done_callback(lambda f: f.exception() is None and _discard(f.result()))
+            return result
+    raise error
+
+
+def call(send, host_name, key, hedge=True, retries=None, sp=None):
+    """
+    Kør send() -> response (med .status_code og .headers) med genforsøg, 429-pause,
+    kredsløbsbryder og (hvis DST_HEDGE er sat og hedge=True) hedging. Netværksfejl
+    (OSError, herunder requests' undtagelser) gentages; er forsøgene opbrugt, rejses den sidste.
+    Et svar med fejlstatus returneres efter sidste forsøg, så kalderen viser fejlteksten som før.
+    """
+    import scheduler   # (importeres her: scheduler -> statbank -> transport)
+
+    retries = RETRIES if retries is None else retries
+    h = host(host_name)
+    for attempt in range(retries + 1):
+        _wait_paused(h)
+        queued = scheduler.acquire()
+        if sp is not None and queued >= 0.001:
+            sp["queued_ms"] = round(sp.get("queued_ms", 0) + queued * 1000, 1)
+        if sp is not None and attempt:
+            sp["attempts"] = attempt + 1
+        h.breaker.before(host_name)   # lige før afsendelsen: herfra skal bryderen altid have besked
+        try:
+            resp = _send_hedged(send, key, HEDGE, sp) if hedge and HEDGE > 0 else _timed_send(send, key)
+        except OSError as ex:
+            if isinstance(ex, ValueError):   # fx requests' InvalidURL – nytter ikke at gentage
+                h.breaker.release()
+                raise
+            h.breaker.failure()
+            if attempt == retries:
+                raise
+            delay = backoff(attempt)
+            print(f"[transport] {key}: {type(ex).__name__} – nyt forsøg om {delay:.1f} sek.")
+            time.sleep(delay)
+            continue
+        except BaseException:   # andre fejl fra send() (og KeyboardInterrupt) er ikke netværksfejl
+            h.breaker.release()
+            raise
+
+        status = resp.status_code
+        if status not in RETRY_STATUS:
+            h.breaker.success()
+            return resp
+        if status != 429:
+            h.breaker.failure()
+        else:
+            h.breaker.release()   # 429 er drosling, ikke et tegn på at StatBank er nede
+        wait = retry_after(resp.headers.get("Retry-After"))
+        if attempt == retries or (wait is not None and wait > RETRY_AFTER_MAX):
+            return resp
+        delay = max(wait or 0.0, backoff(attempt))
+        if status == 429:
+            with h.lock:
+                h.paused_until = max(h.paused_until, time.monotonic() + delay)
+            scheduler.penalize(delay)   # også andre processer holder pause
+        print(f"[transport] {key}: status {status} – nyt forsøg om {delay:.1f} sek.")
+        _discard(resp)
+        time.sleep(delay)
@@ -0,0 +1,274 @@
+# Revisionshistorik: hver hentning gemmes som en årgang (vintage) – kun de ændrede celler
+#
+# Pris- og lønindeks revideres, og lageret i store.py holder kun seneste udgave. Her gemmes hver
+# hentning af de overvågede tabeller (DST_VINTAGES, default PRIS111, PRIS4321, SBLON1 og
+# LBESK04; '*' = alle) som en delta mod forrige årgang:
+#   DST_CACHE_DIR/vintages/<nøgle>/log.json          serier, perioder og årgangene (tid, 'updated')
+#   DST_CACHE_DIR/vintages/<nøgle>/delta-NNNN.npz    ændrede celler: serie-, periodenr. og ny værdi
+#   DST_CACHE_DIR/vintages/<nøgle>/latest-NNNN.npy   seneste fulde matrix (til næste sammenligning)
+# Serier og perioder tilføjes kun bagest i log.json, så ældre deltaer forbliver gyldige. En
+# årgang genskabes ved at lægge deltaerne oven på hinanden (as_of), og diff/history sammenligner
+# årgange lokalt. log.json er sandheden: delta skrives før log og latest sidst, og passer
+# latest-filens nummer ikke med log'en (fx efter en afbrudt kørsel), genopbygges den af deltaerne. Celler, der ikke er med i en hentning, regnes som uændrede, ikke slettede.
+#
+#   python3 vintages.py list PRIS111
+#   python3 vintages.py diff <nøgle> 3 4
+#   python3 vintages.py asof <nøgle> 2025-03-01
+import json
+import os
+import time
+from collections import namedtuple
+
+import statbank
+
+VINTAGES = os.environ.get("DST_VINTAGES", "PRIS111,PRIS4321,SBLON1,LBESK04")
+
+Revision = namedtuple("Revision", "series period before after")
+
+
+def tracked(table):
+    names = {t.strip().upper() for t in VINTAGES.split(",") if t.strip()}
+    return "*" in names or table.upper() in names
+
+
+def _dir(key):
+    path = os.path.join(statbank.CACHE_DIR, "vintages", key)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _read_log(key):
+    path = os.path.join(statbank.CACHE_DIR, "vintages", key, "log.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _latest(key, log):
+    """
+    Seneste fulde matrix, udvidet med NaN til log'ens nuværende antal serier og perioder.
+    Genopbygges af deltaerne, hvis latest-filen ikke hører til log'ens seneste årgang.
+    """
+    import numpy as np
+
+    n = len(log["vintages"])
+    path = os.path.join(_dir(key), f"latest-{n:04d}.npy")
+    if n and not os.path.exists(path):
+        return _matrix(key, log, n)
+    out = np.full((len(log["series"]), len(log["periods"])), np.nan)
+    if n:
+        old = np.load(path)
+        out[:old.shape[0], :old.shape[1]] = old
+    return out
+
+
+def record(table, variables, time_code, series, periods, values, lang="da"):
+    """
+    Gem en hentning (matrix values[serie, periode]) som ny årgang, hvis mindst én celle er
+    ændret i forhold til forrige årgang. Returnerer årgangens nummer eller None.
+    """
+    import numpy as np
+
+    if not tracked(table):
+        return None
+    key = statbank.selection_key(table, variables, time_code, lang)
+    log = _read_log(key) or {
+        "table": table.upper(), "lang": lang, "time_code": time_code,
+        "selection": [v for v in variables if str(v["code"]).upper() != time_code.upper()],
+        "series": [], "periods": [], "vintages": [],
+    }
+    series = [list(map(str, s)) for s in series]
+    periods = [str(p) for p in periods]
+    s_pos = {tuple(s): i for i, s in enumerate(log["series"])}
+    p_pos = {p: i for i, p in enumerate(log["periods"])}
+    for s in series:
+        if tuple(s) not in s_pos:
+            s_pos[tuple(s)] = len(log["series"])
+            log["series"].append(s)
+    for p in periods:
+        if p not in p_pos:
+            p_pos[p] = len(log["periods"])
+            log["periods"].append(p)
+
+    rows = np.array([s_pos[tuple(s)] for s in series], dtype=np.int64)
+    cols = np.array([p_pos[p] for p in periods], dtype=np.int64)
+    current = _latest(key, log)
+    new = np.asarray(values, dtype=np.float64).reshape(len(series), len(periods))
+    old = current[np.ix_(rows, cols)]
+    changed = ~((old == new) | (np.isnan(old) & np.isnan(new)))
+    if not changed.any():
+        print(f"[vintage] {table.upper()}: uændret siden årgang {len(log['vintages'])}")
+        return None
+
+    si, pi = np.nonzero(changed)
+    s_idx, p_idx, v = rows[si], cols[pi], new[si, pi]
+    n = len(log["vintages"]) + 1
+    updated = statbank.updated_stamp(table, lang)   # kan gå på nettet: før der skrives noget
+    d = _dir(key)
+    # rækkefølge: delta, log, latest – en afbrudt kørsel efterlader højst en forældreløs delta
+    # (overskrives af næste årgang) eller en forældet latest (genopbygges af _latest)
+    delta = f"delta-{n:04d}.npz"
+    tmp = os.path.join(d, f"delta.{os.getpid()}.tmp.npz")
+    np.savez_compressed(tmp, s=s_idx.astype(np.int32), p=p_idx.astype(np.int32), v=v)
+    os.replace(tmp, os.path.join(d, delta))
+    log["vintages"].append({
+        "n": n, "fetched": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "updated": updated, "cells": int(len(v)), "file": delta,
+    })
+    statbank._write_json_atomic(os.path.join(d, "log.json"), log)
+    current[s_idx, p_idx] = v
+    tmp = os.path.join(d, f"latest.{os.getpid()}.tmp.npy")
+    np.save(tmp, current)
+    os.replace(tmp, os.path.join(d, f"latest-{n:04d}.npy"))
+    for name in os.listdir(d):
+        if name.startswith("latest") and name.endswith(".npy") and name != f"latest-{n:04d}.npy" \
+                and ".tmp." not in name:
+            os.remove(os.path.join(d, name))
+    revised = int(np.count_nonzero(~np.isnan(old[changed])))
+    print(f"[vintage] {table.upper()}: årgang {n} – {len(v)} celler ændret ({revised} revideret)")
+    return n
+
+
+# --- læsning -------------------------------------------------------------------------
+
+def _log(table=None, variables=None, time_code="Tid", lang="da", key=None):
+    if key is None:
+        key = statbank.selection_key(table, variables, time_code, lang)
+    log = _read_log(key)
+    if log is None or not log["vintages"]:
+        raise KeyError(f"Ingen årgange for {key}.")
+    return key, log
+
+
+def _resolve(log, when):
+    """Årgangsnummer for when: None = seneste, int = nummer, str = seneste hentet til og med tidspunktet."""
+    vintages = log["vintages"]
+    if when is None:
+        return len(vintages)
+    if isinstance(when, int):
+        if not 1 <= when <= len(vintages):
+            raise KeyError(f"Årgang {when} findes ikke (1-{len(vintages)}).")
+        return when
+    when = str(when)
+    if len(when) == 10:   # kun dato: hele dagen
+        when += "T23:59:59"
+    n = sum(1 for v in vintages if v["fetched"] <= when)
+    if n == 0:
+        raise KeyError(f"Ingen årgang hentet før {when}.")
+    return n
+
+
+def _matrix(key, log, n):
+    import numpy as np
+
+    m = np.full((len(log["series"]), len(log["periods"])), np.nan)
+    d = _dir(key)
+    for v in log["vintages"][:n]:
+        with np.load(os.path.join(d, v["file"])) as z:
+            m[z["s"], z["p"]] = z["v"]
+    return m
+
+
+def list_vintages(table=None):
+    """Alle nøgler med årgange (evt. kun for én tabel): tabel, udvælgelse og årgangene."""
+    root = os.path.join(statbank.CACHE_DIR, "vintages")
+    out = []
+    for key in sorted(os.listdir(root)) if os.path.isdir(root) else []:
+        if table and not key.startswith(table.upper() + "-"):
+            continue
+        log = _read_log(key)
+        if log:
+            out.append({"key": key, "table": log["table"], "selection": log["selection"],
+                        "vintages": log["vintages"]})
+    return out
+
+
+def as_of(table=None, variables=None, time_code="Tid", lang="da", when=None, key=None):
+    """
+    Udvælgelsen, som den så ud i årgang when (nummer, tidspunkt 'YYYY-MM-DD[THH:MM:SS]' eller
+    None = seneste). Returnerer {"series", "periods", "values", "vintage"} som store.read_series.
+    """
+    import numpy as np
+
+    key, log = _log(table, variables, time_code, lang, key)
+    n = _resolve(log, when)
+    m = _matrix(key, log, n)
+    order = sorted(range(len(log["periods"])), key=log["periods"].__getitem__)
+    return {"series": log["series"], "periods": [log["periods"][i] for i in order],
+            "values": m[:, np.asarray(order, dtype=np.int64)], "vintage": log["vintages"][n - 1]}
+
+
+def diff(table=None, variables=None, time_code="Tid", lang="da", a=None, b=None, key=None):
+    """
+    Celler der er forskellige mellem årgang a og b (default: forrige og seneste), som
+    Revision(serie, periode, før, efter) i serie- og periodeorden.
+    """
+    import numpy as np
+
+    key, log = _log(table, variables, time_code, lang, key)
+    nb = _resolve(log, b)
+    na = _resolve(log, a) if a is not None else max(nb - 1, 0)
+    before, after = _matrix(key, log, na), _matrix(key, log, nb)
+    changed = ~((before == after) | (np.isnan(before) & np.isnan(after)))
+    si, pi = np.nonzero(changed)
+    out = [Revision(tuple(log["series"][s]), log["periods"][p], float(before[s, p]), float(after[s, p]))
+           for s, p in zip(si.tolist(), pi.tolist())]
+    return sorted(out, key=lambda r: (r.series, r.period))
+
+
+def history(series, period, table=None, variables=None, time_code="Tid", lang="da", key=None):
+    """[(årgang, værdi)] for én celle – hver gang den blev sat eller revideret."""
+    import numpy as np
+
+    key, log = _log(table, variables, time_code, lang, key)
+    series = [str(x) for x in (series if isinstance(series, (list, tuple)) else [series])]
+    try:
+        s = log["series"].index(series)
+        p = log["periods"].index(str(period))
+    except ValueError:
+        raise KeyError(f"Ingen celle {series} / {period} i {key}.") from None
+    out = []
+    d = _dir(key)
+    for v in log["vintages"]:
+        with np.load(os.path.join(d, v["file"])) as z:
+            hit = np.flatnonzero((z["s"] == s) & (z["p"] == p))
+            if hit.size:
+                out.append((v, float(z["v"][hit[0]])))
+    return out
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Årgange (revisionshistorik) for gemte udvælgelser.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("list")
+    p.add_argument("table", nargs="?")
+    p = sub.add_parser("diff")
+    p.add_argument("key")
+    p.add_argument("a", nargs="?", type=int)
+    p.add_argument("b", nargs="?", type=int)
+    p = sub.add_parser("asof")
+    p.add_argument("key")
+    p.add_argument("when", nargs="?", help="årgangsnummer eller YYYY-MM-DD[THH:MM:SS]")
+    args = ap.parse_args()
+
+    if args.cmd == "list":
+        for e in list_vintages(args.table):
+            print(f"{e['key']}  {e['table']}")
+            for v in e["vintages"]:
+                print(f"  {v['n']:>4}  {v['fetched']}  updated {v['updated']}  {v['cells']} celler")
+    elif args.cmd == "diff":
+        revs = diff(key=args.key, a=args.a, b=args.b)
+        for r in revs:
+            print(f"{' | '.join(r.series) or '-':<40} {r.period}  {r.before:>10.2f} -> {r.after:>10.2f}")
+        print(f"[vintage] {len(revs)} ændrede celler")
+    else:
+        when = int(args.when) if args.when and args.when.isdigit() else args.when
+        res = as_of(key=args.key, when=when)
+        print(f"[vintage] årgang {res['vintage']['n']} ({res['vintage']['fetched']})")
+        for s, row in zip(res["series"], res["values"]):
+            print(f"  {' | '.join(s) or '-'}")
+            for period, value in zip(res["periods"], row):
+                print(f"    {period}: {value:.2f}")
@@ -0,0 +1,129 @@
+# Overvågning: kør kun de scripts, hvis tabel er opdateret siden sidste kørsel
+#
+# Hver runde spørger /tables om 'updated' for alle overvågede tabeller i ét kald og sammenligner
+# med stemplerne fra sidste vellykkede kørsel (DST_CACHE_DIR/watch/state-<sprog>.json).
+# Kun scripts med en ny udgivelse køres (via run_all); uændrede tabeller koster intet ud over
+# det ene /tables-kald. Det friske stempel skrives også ind i metadata-cachen, så en ændret
+# tabel straks får ny metadata (og nye /data-svar) i stedet for at vente på DST_META_TTL.
+#
+#   python3 watch.py                        # alle scripts, ny runde hvert 15. minut
+#   python3 watch.py folk1am pris111 --interval 300
+#   python3 watch.py --once                 # én runde (fx fra cron); exit 1 ved fejl
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+
+import metaindex
+import run_all
+import statbank
+from spans import span
+
+INTERVAL = float(os.environ.get("DST_WATCH_INTERVAL", 15 * 60))   # sek. mellem runder
+
+
+def _state_path(lang):
+    d = os.path.join(statbank.CACHE_DIR, "watch")
+    os.makedirs(d, exist_ok=True)
+    return os.path.join(d, f"state-{lang}.json")
+
+
+def load_state(lang="da"):
+    """{script: 'updated' ved sidste vellykkede kørsel}."""
+    try:
+        with open(_state_path(lang), encoding="utf-8") as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return {}
+
+
+def script_tables(names=None):
+    """{script: tabel-id} – fra @traced(...) på scriptets fetch-funktion."""
+    out = {}
+    for name in run_all._check_names(names):
+        module_name, func_name = run_all.TABLES[name.lower()]
+        func = getattr(importlib.import_module(module_name), func_name)
+        table = getattr(func, "table", None)
+        if table is None:
+            raise RuntimeError(f"{module_name}.{func_name} mangler @traced(<tabel>) – kan ikke overvåges.")
+        out[name.lower()] = table.upper()
+    return out
+
+
+def changed(tables, state, stamps):
+    """Scripts hvis tabel har et andet 'updated' end ved sidste vellykkede kørsel."""
+    return [name for name, table in tables.items()
+            if table in stamps and state.get(name) != stamps[table]]
+
+
+def poll_once(tables, lang="da", jobs=1, state=None):
+    """
+    Én runde: ét /tables-kald, kør de ændrede scripts, gem stemplerne for dem der lykkedes.
+    Returnerer run_all-resultaterne (tom liste, hvis intet er ændret).
+    """
+    state = load_state(lang) if state is None else state
+    ids = sorted(set(tables.values()))
+    with span("poll", tables=len(ids)) as sp:
+        stamps = {t: u for t, u in statbank.tables_updated(ids, lang).items() if t in ids}
+        sp["changed"] = len(changed(tables, state, stamps))
+    missing = [t for t in ids if t not in stamps]
+    if missing:
+        print(f"[watch] Ikke i /tables-listen: {', '.join(missing)}")
+    for table, updated in stamps.items():
+        statbank.note_updated(table, lang, updated)
+        metaindex.forget(table, lang, keep=updated)
+
+    due = changed(tables, state, stamps)
+    if not due:
+        print(f"[watch] {time.strftime('%H:%M:%S')} ingen ændringer ({len(ids)} tabeller)")
+        return []
+    print(f"[watch] {time.strftime('%H:%M:%S')} opdateret: "
+          + ", ".join(f"{n} ({tables[n]} {stamps[tables[n]]})" for n in due))
+    if jobs > 1:
+        results = run_all.run_tables_concurrently(due, lang=lang, jobs=jobs)
+    else:
+        results = run_all.run_tables(due, lang=lang)
+    for r in results:
+        if r["ok"]:
+            state[r["table"].lower()] = stamps[tables[r["table"].lower()]]
+    statbank._write_json_atomic(_state_path(lang), state)
+    run_all.print_summary(results)
+    return results
+
+
+def watch(names=None, lang="da", interval=None, jobs=1):
+    """Kør poll_once hvert `interval` sek., indtil processen stoppes (Ctrl-C)."""
+    interval = INTERVAL if interval is None else interval
+    tables = script_tables(names)
+    state = load_state(lang)
+    print(f"[watch] overvåger {', '.join(sorted(set(tables.values())))} hvert {interval:.0f}. sek.")
+    while True:
+        t0 = time.monotonic()
+        try:
+            poll_once(tables, lang=lang, jobs=jobs, state=state)
+        except Exception as ex:   # fx kredsløbsbryderen åben – prøv igen næste runde
+            print(f"[watch] runden fejlede: {type(ex).__name__}: {ex}")
+        time.sleep(max(0.0, interval - (time.monotonic() - t0)))
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Kør kun scripts, hvis tabel er opdateret i StatBank.")
+    ap.add_argument("tables", nargs="*", help=f"scripts (default: alle): {', '.join(run_all.TABLES)}")
+    ap.add_argument("--lang", default="da")
+    ap.add_argument("--interval", type=float, default=None, help=f"sek. mellem runder (default {INTERVAL:.0f})")
+    ap.add_argument("--once", action="store_true", help="kun én runde")
+    ap.add_argument("-j", "--jobs", type=int, default=1, help="antal scripts der køres samtidigt")
+    ap.add_argument("--lite", action="store_true", help="let tilstand (se lite.py)")
+    args = ap.parse_args()
+    if args.lite:
+        statbank.LITE = True
+
+    if args.once:
+        results = poll_once(script_tables(args.tables), lang=args.lang, jobs=args.jobs)
+        sys.exit(0 if all(r["ok"] for r in results) else 1)
+    try:
+        watch(args.tables, lang=args.lang, interval=args.interval, jobs=args.jobs)
+    except KeyboardInterrupt:
+        print("\n[watch] stoppet")